@@ -0,0 +1,80 @@
+"""
+Agent Pool - Shared chatbot agents for concurrent sessions
+
+This module hands out stateless chatbot agents to many sessions at once.
+Agents (and the LLM clients inside them) are created once and shared;
+conversation state travels with each request. Turns of the same session
+run one after another so their history stays ordered, while different
+sessions run concurrently up to a configurable limit.
+"""
+
+from typing import List, Dict, Any, Callable, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+import itertools
+import logging
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class AgentPool:
+    """
+    Pool of shared agents with per-session ordering.
+
+    Args:
+        factory: Callable creating one agent
+        size: Number of agents to create and rotate between
+        max_concurrency: Maximum turns running at once across all sessions
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 1, max_concurrency: int = 64):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+
+        self.agents: List[Any] = [factory() for _ in range(size)]
+        self.max_concurrency = max_concurrency
+        self._next_agent = itertools.cycle(self.agents)
+        self._slots = asyncio.Semaphore(max_concurrency)
+        # Locks disappear with the last waiter, so idle sessions cost nothing
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._active = 0
+
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        return lock
+
+    @asynccontextmanager
+    async def session(self, session_id: str) -> AsyncIterator[Any]:
+        """
+        Lease an agent for one turn of a session.
+
+        Waits for earlier turns of the same session and for a free
+        concurrency slot.
+
+        Args:
+            session_id: Session the turn belongs to
+
+        Yields:
+            A shared agent
+        """
+        lock = self._session_lock(session_id)
+        async with lock:
+            async with self._slots:
+                self._active += 1
+                try:
+                    yield next(self._next_agent)
+                finally:
+                    self._active -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics."""
+        return {
+            "agents": len(self.agents),
+            "max_concurrency": self.max_concurrency,
+            "active_turns": self._active,
+            "sessions_waiting_or_active": len(self._session_locks)
+        }
@@ -5,36 +5,58 @@ This module implements a sophisticated chatbot agent with memory,
 context awareness, and tool integration.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain.memory import ConversationBufferWindowMemory
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain.tools import Tool
 from langchain_core.runnables import RunnablePassthrough
+import asyncio
+import hashlib
 import logging
 from datetime import datetime
 
 from src.utils.config import Settings
 from src.models.conversation import Message
+from src.agents.streaming import to_stream_frame, final_output
+from src.agents.session_memory import SessionMemory, to_chat_messages
+from src.agents.intent_router import IntentRouter
+from src.agents.safe_math import safe_eval
+from src.services.knowledge_base import KnowledgeBase
 
 logger = logging.getLogger(__name__)
 
 class ChatbotAgent:
     """
     Advanced chatbot agent with LangChain integration.
+    
+    The agent holds no conversation state. Each call receives the memory
+    (or history) of its own session, so one agent can serve many sessions
+    at once.
     """
     
-    def __init__(self, settings: Settings):
+    # Tools whose results go stale, so answers using them are not cached
+    volatile_tools = frozenset({"get_current_time"})
+    
+    def __init__(
+        self,
+        settings: Settings,
+        history_window: int = 10,
+        knowledge_base: Optional[KnowledgeBase] = None
+    ):
         self.settings = settings
+        self.history_window = history_window  # Keep last 10 messages
+        # Shared by every agent of a pool; None when no knowledge base is configured
+        self.knowledge_base = knowledge_base
+        self.knowledge_timeout = getattr(settings, "knowledge_search_timeout", 2.0)
         self.llm = self._initialize_llm()
-        self.memory = ConversationBufferWindowMemory(
-            k=10,  # Keep last 10 exchanges
-            return_messages=True
-        )
+        # Changes whenever the system prompt does, for cache keys
+        self.prompt_version = hashlib.sha1(self._get_system_prompt().encode("utf-8")).hexdigest()[:12]
         self.tools = self._initialize_tools()
         self.agent = self._create_agent()
+        # Answers plain time and arithmetic requests without the LLM
+        self.router = IntentRouter(self._evaluate) if getattr(settings, "enable_fast_path", True) else None
         
     def _initialize_llm(self) -> ChatOpenAI:
         """Initialize the language model."""
@@ -55,18 +77,22 @@ class ChatbotAgent:
             ),
             Tool(
                 name="calculate",
-                description="Perform basic mathematical calculations",
+                description=(
+                    "Perform basic mathematical calculations. Input is an arithmetic "
+                    "expression using + - * / // % ** and math functions such as sqrt, log, sin"
+                ),
                 func=self._calculate
             ),
             Tool(
                 name="search_knowledge",
                 description="Search the knowledge base for information",
-                func=self._search_knowledge
+                func=self._search_knowledge,
+                coroutine=self._asearch_knowledge
             )
         ]
     
     def _create_agent(self) -> AgentExecutor:
-        """Create the agent with tools and memory."""
+        """Create the agent with tools."""
         prompt = ChatPromptTemplate.from_messages([
             ("system", self._get_system_prompt()),
             MessagesPlaceholder(variable_name="chat_history"),
@@ -78,9 +104,9 @@ class ChatbotAgent:
         return AgentExecutor(
             agent=agent,
             tools=self.tools,
-            memory=self.memory,
             verbose=True,
-            handle_parsing_errors=True
+            handle_parsing_errors=True,
+            return_intermediate_steps=True
         )
     
     def _get_system_prompt(self) -> str:
@@ -107,7 +133,8 @@ class ChatbotAgent:
     async def generate_response(
         self, 
         message: str, 
-        conversation_history: List[Message]
+        conversation_history: Optional[List[Message]] = None,
+        memory: Optional[SessionMemory] = None
     ) -> str:
         """
         Generate a response to a user message.
@@ -115,34 +142,157 @@ class ChatbotAgent:
         Args:
             message: The user's message
             conversation_history: Previous messages in the conversation
+            memory: Session memory, used instead of conversation_history
             
         Returns:
             The AI's response
         """
+        turn = await self.run_turn(message, conversation_history, memory)
+        return turn["output"]
+    
+    async def run_turn(
+        self,
+        message: str,
+        conversation_history: Optional[List[Message]] = None,
+        memory: Optional[SessionMemory] = None
+    ) -> Dict[str, Any]:
+        """
+        Answer a user message and report how the answer was produced.
+        
+        Args:
+            message: The user's message
+            conversation_history: Previous messages in the conversation
+            memory: Session memory, used instead of conversation_history
+            
+        Returns:
+            Dictionary with the ``output``, the names of the ``tools`` used
+            and whether an ``error`` replaced the answer
+        """
+        routed = self.router.route(message) if self.router else None
+        if routed is not None:
+            return {"output": routed.output, "tools": [routed.tool], "error": False}
+        
         try:
-            # Update memory with conversation history
-            self._update_memory(conversation_history)
+            # Pass this session's history with the request
+            chat_history = self._chat_history(conversation_history, memory)
             
             # Generate response using the agent
-            response = await self.agent.ainvoke({"input": message})
+            response = await self.agent.ainvoke({
+                "input": message,
+                "chat_history": chat_history
+            })
             
-            return response.get("output", "I'm sorry, I couldn't generate a response.")
+            return {
+                "output": response.get("output", "I'm sorry, I couldn't generate a response."),
+                "tools": [action.tool for action, _ in response.get("intermediate_steps", [])],
+                "error": False
+            }
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
-            return "I'm sorry, I encountered an error while processing your message. Please try again."
+            return {
+                "output": "I'm sorry, I encountered an error while processing your message. Please try again.",
+                "tools": [],
+                "error": True
+            }
     
-    def _update_memory(self, conversation_history: List[Message]):
-        """Update the agent's memory with conversation history."""
-        # Clear existing memory
-        self.memory.clear()
+    async def astream_response(
+        self,
+        message: str,
+        conversation_history: Optional[List[Message]] = None,
+        memory: Optional[SessionMemory] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a response to a user message as it is generated.
+        
+        Args:
+            message: The user's message
+            conversation_history: Previous messages in the conversation
+            memory: Session memory, used instead of conversation_history
+            
+        Yields:
+            ``token``, ``tool_start`` and ``tool_end`` frames, then one
+            ``done`` frame holding the full response
+        """
+        routed = self.router.route(message) if self.router else None
+        if routed is not None:
+            yield {"type": "token", "content": routed.output}
+            yield {"type": "done", "response": routed.output}
+            return
+        
+        tokens: List[str] = []
+        answer = None
+        try:
+            chat_history = self._chat_history(conversation_history, memory)
+            
+            async for event in self.agent.astream_events(
+                {"input": message, "chat_history": chat_history},
+                version="v2"
+            ):
+                frame = to_stream_frame(event)
+                if frame is not None:
+                    if frame["type"] == "token":
+                        tokens.append(frame["content"])
+                    elif frame["type"] == "tool_start":
+                        # Text streamed before a tool call is not the answer
+                        tokens.clear()
+                    yield frame
+                answer = final_output(event) or answer
+            
+            answer = answer or "".join(tokens) or "I'm sorry, I couldn't generate a response."
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            answer = "I'm sorry, I encountered an error while processing your message. Please try again."
+            yield {"type": "error", "message": answer}
         
-        # Add recent messages to memory
-        for msg in conversation_history[-10:]:  # Keep last 10 messages
-            if msg.role == "user":
-                self.memory.chat_memory.add_user_message(msg.content)
-            elif msg.role == "assistant":
-                self.memory.chat_memory.add_ai_message(msg.content)
+        yield {"type": "done", "response": answer}
+    
+    def _chat_history(
+        self,
+        conversation_history: Optional[List[Message]],
+        memory: Optional[SessionMemory]
+    ) -> List[BaseMessage]:
+        if memory is not None:
+            return memory.history()
+        return self.build_chat_history(conversation_history or [])
+    
+    def build_chat_history(self, conversation_history: List[Message]) -> List[BaseMessage]:
+        """
+        Convert the recent part of a conversation into chat messages.
+        
+        Args:
+            conversation_history: Previous messages in the conversation
+            
+        Returns:
+            The last ``history_window`` user and assistant messages
+        """
+        return to_chat_messages(conversation_history[-self.history_window:])
+    
+    async def summarize_history(self, summary: Optional[str], messages: List[BaseMessage]) -> str:
+        """
+        Fold messages that left the memory window into a running summary.
+        
+        Args:
+            summary: The summary so far, if any
+            messages: Messages to add to it
+            
+        Returns:
+            The updated summary
+        """
+        transcript = "\n".join(
+            f"{'User' if isinstance(msg, HumanMessage) else 'Assistant'}: {msg.content}"
+            for msg in messages
+        )
+        prompt = [
+            SystemMessage(content=(
+                "Summarize the conversation so far in a few sentences. Keep facts, "
+                "names, numbers and open questions the assistant may need later."
+            )),
+            HumanMessage(content=f"Summary so far: {summary or 'none'}\n\nNew messages:\n{transcript}")
+        ]
+        response = await self.llm.ainvoke(prompt)
+        return response.content.strip()
     
     # Tool implementations
     def _get_current_time(self, query: str) -> str:
@@ -150,30 +300,45 @@ class ChatbotAgent:
         now = datetime.now()
         return f"Current time: {now.strftime('%Y-%m-%d %H:%M:%S')}"
     
+    def _evaluate(self, expression: str) -> Any:
+        """Evaluate an arithmetic expression within fixed size and time limits."""
+        return safe_eval(expression)
+    
     def _calculate(self, expression: str) -> str:
         """Perform basic mathematical calculations."""
         try:
-            # Simple evaluation for basic math (be careful with this in production)
-            result = eval(expression)
+            result = self._evaluate(expression)
             return f"Result: {result}"
         except Exception as e:
             return f"Error calculating '{expression}': {str(e)}"
     
+    async def _asearch_knowledge(self, query: str) -> str:
+        """Search the knowledge base without blocking the event loop."""
+        if self.knowledge_base is None:
+            return "No knowledge base is configured."
+        try:
+            results = await asyncio.wait_for(self.knowledge_base.aquery(query), self.knowledge_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Knowledge search for '{query}' timed out")
+            return f"Knowledge search for '{query}' timed out."
+        except Exception as e:
+            logger.error(f"Error searching knowledge base: {e}")
+            return f"Error searching knowledge base for '{query}': {str(e)}"
+        return self.knowledge_base.format_results(query, results)
+    
     def _search_knowledge(self, query: str) -> str:
         """Search the knowledge base."""
-        # This is a placeholder - in a real implementation, you would
-        # integrate with a vector database or knowledge base
-        return f"Knowledge search for '{query}': This is a placeholder response. In a real implementation, this would search your knowledge base."
-    
-    def reset_memory(self):
-        """Reset the agent's memory."""
-        self.memory.clear()
-        logger.info("Agent memory reset")
+        if self.knowledge_base is None:
+            return "No knowledge base is configured."
+        try:
+            return self.knowledge_base.format_results(query, self.knowledge_base.query(query))
+        except Exception as e:
+            logger.error(f"Error searching knowledge base: {e}")
+            return f"Error searching knowledge base for '{query}': {str(e)}"
     
     def get_memory_summary(self) -> Dict[str, Any]:
-        """Get a summary of the agent's memory."""
+        """Get a summary of how the agent uses conversation memory."""
         return {
-            "memory_type": "ConversationBufferWindowMemory",
-            "buffer_size": self.memory.k,
-            "current_messages": len(self.memory.chat_memory.messages)
+            "memory_type": "per_session_window",
+            "buffer_size": self.history_window
         }
@@ -0,0 +1,130 @@
+"""
+Intent Router - Local answers for tool-only messages
+
+This module recognizes messages that only need a tool, such as "what time
+is it" or "2+2*3", and answers them directly instead of sending them
+through the LLM agent. Rules are deliberately narrow: anything they do
+not match exactly goes to the agent.
+"""
+
+from typing import Dict, Any, Optional, Callable
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+MAX_ROUTED_LENGTH = 200
+
+_TIME_PATTERNS = [
+    re.compile(pattern) for pattern in (
+        r"^(what|wat)( i|')?s the (current )?(time|date)( now| today| right now)?$",
+        r"^what (time|day|date) is it( now| today| right now)?$",
+        r"^what('?s| is) (today'?s date|the day today|the date today)$",
+        r"^(tell me |give me )?the (current )?(time|date)( now| today)?$",
+        r"^(current )?(time|date)( now| today)?$",
+    )
+]
+
+_ARITHMETIC_PREFIX = re.compile(
+    r"^(?:what(?:'s| is)|calculate|compute|evaluate|how much is|solve)\s+", re.IGNORECASE
+)
+_ARITHMETIC_EXPRESSION = re.compile(r"^[\d\s.+\-*/%()]+$")
+_ARITHMETIC_OPERATOR = re.compile(r"\d\s*(?:[+\-*/%]|\*\*)\s*[\d(]|\)\s*[+\-*/%]")
+_OPERATOR_WORDS = {"×": "*", "x": "*", "÷": "/"}
+# Dates, phone numbers and fractions like 2024-10-15, 555-1234 or 12/25
+# read as arithmetic only when the user asks for a calculation
+_AMBIGUOUS_EXPRESSION = re.compile(r"^\d+(?:[-/]\d+)+$")
+
+
+@dataclass
+class RoutedAnswer:
+    """An answer produced without the agent, and the tool that produced it."""
+    tool: str
+    output: str
+
+
+def _normalize(message: str) -> str:
+    text = " ".join(message.strip().lower().split())
+    text = re.sub(r"^(hey|hi|hello)[,!]?\s+", "", text)
+    text = re.sub(r"\s*(,?\s*please)$", "", text)
+    return text.rstrip("?!. ")
+
+
+def _format_number(value: Any) -> str:
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e16:
+            return str(int(value))
+        return f"{value:.10g}"
+    return str(value)
+
+
+class IntentRouter:
+    """
+    Rule-based router for time and arithmetic requests.
+
+    Args:
+        calculate: Function evaluating an arithmetic expression to a number
+        now: Function returning the current time
+    """
+
+    def __init__(self, calculate: Callable[[str], Any], now: Callable[[], datetime] = datetime.now):
+        self.calculate = calculate
+        self.now = now
+        self._routed: Dict[str, int] = {"get_current_time": 0, "calculate": 0}
+        self._passed = 0
+
+    def route(self, message: str) -> Optional[RoutedAnswer]:
+        """
+        Answer a message locally if it is a plain time or arithmetic request.
+
+        Args:
+            message: The user's message
+
+        Returns:
+            The answer, or None if the message should go to the agent
+        """
+        answer = None
+        if len(message) <= MAX_ROUTED_LENGTH:
+            text = _normalize(message)
+            answer = self._route_time(text) or self._route_arithmetic(text)
+
+        if answer is None:
+            self._passed += 1
+        else:
+            self._routed[answer.tool] += 1
+        return answer
+
+    def _route_time(self, text: str) -> Optional[RoutedAnswer]:
+        if not any(pattern.match(text) for pattern in _TIME_PATTERNS):
+            return None
+        now = self.now()
+        return RoutedAnswer(
+            tool="get_current_time",
+            output=f"It's {now.strftime('%H:%M')} on {now.strftime('%A, %B')} {now.day}, {now.year}."
+        )
+
+    def _route_arithmetic(self, text: str) -> Optional[RoutedAnswer]:
+        expression = _ARITHMETIC_PREFIX.sub("", text)
+        explicit = expression != text or expression.endswith("=")
+        expression = expression.rstrip("= ")
+        if not explicit and _AMBIGUOUS_EXPRESSION.match(expression):
+            return None
+        for word, operator in _OPERATOR_WORDS.items():
+            expression = re.sub(rf"(?<=[\d)\s]){word}(?=[\d(\s])", operator, expression)
+
+        if not _ARITHMETIC_EXPRESSION.match(expression) or not _ARITHMETIC_OPERATOR.search(expression):
+            return None
+
+        try:
+            value = self.calculate(expression)
+        except Exception as e:
+            # Let the agent explain what is wrong with the expression
+            logger.debug(f"Not routing '{expression}': {e}")
+            return None
+
+        return RoutedAnswer(tool="calculate", output=f"{expression.strip()} = {_format_number(value)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"routed": dict(self._routed), "sent_to_agent": self._passed}
@@ -0,0 +1,234 @@
+"""
+Safe Math - Bounded arithmetic evaluation for the calculate tool
+
+This module evaluates arithmetic expressions without ``eval``. Expressions
+are parsed into a Python AST, checked against a whitelist of numbers,
+operators and math functions, and cached. Every evaluation is bounded:
+expressions have a maximum size, exponents and integer results are
+capped before they are computed, and a step and time budget stops
+anything that still runs long, so no expression can block a worker.
+"""
+
+from typing import List, Dict, Any, Callable, Union
+from functools import lru_cache
+import ast
+import math
+import operator
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+Number = Union[int, float]
+
+MAX_EXPRESSION_LENGTH = 500
+MAX_NODES = 200
+MAX_ROUND_DIGITS = 100
+
+
+class CalculationError(ValueError):
+    """Raised when an expression is not allowed or exceeds a limit."""
+
+
+_BINARY_OPERATORS: Dict[type, Callable[[Number, Number], Number]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+_UNARY_OPERATORS: Dict[type, Callable[[Number], Number]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+_FUNCTIONS: Dict[str, Callable[..., Number]] = {
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+    "sqrt": math.sqrt,
+    "exp": math.exp,
+    "log": math.log,
+    "log10": math.log10,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+
+_CONSTANTS: Dict[str, float] = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+
+def _validate(node: ast.AST):
+    """Reject anything but numbers, whitelisted operators, names and calls."""
+    if isinstance(node, ast.Expression):
+        _validate(node.body)
+    elif isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise CalculationError(f"Unsupported value: {node.value!r}")
+    elif isinstance(node, ast.BinOp):
+        if type(node.op) not in _BINARY_OPERATORS:
+            raise CalculationError(f"Unsupported operator: {type(node.op).__name__}")
+        _validate(node.left)
+        _validate(node.right)
+    elif isinstance(node, ast.UnaryOp):
+        if type(node.op) not in _UNARY_OPERATORS:
+            raise CalculationError(f"Unsupported operator: {type(node.op).__name__}")
+        _validate(node.operand)
+    elif isinstance(node, ast.Name):
+        if node.id not in _CONSTANTS:
+            raise CalculationError(f"Unknown name: {node.id}")
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+            raise CalculationError("Only plain calls of math functions are allowed")
+        for argument in node.args:
+            _validate(argument)
+    else:
+        raise CalculationError(f"Unsupported syntax: {type(node).__name__}")
+
+
+@lru_cache(maxsize=1024)
+def parse_expression(expression: str) -> ast.Expression:
+    """
+    Parse and validate an expression, caching the result.
+
+    Args:
+        expression: Arithmetic expression
+
+    Returns:
+        The validated syntax tree
+
+    Raises:
+        CalculationError: If the expression is too long, malformed or not arithmetic
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalculationError(f"Expression longer than {MAX_EXPRESSION_LENGTH} characters")
+
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except (SyntaxError, ValueError) as e:
+        raise CalculationError(f"Invalid expression: {e}") from None
+
+    if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+        raise CalculationError(f"Expression has more than {MAX_NODES} parts")
+    _validate(tree)
+    return tree
+
+
+class SafeEvaluator:
+    """
+    Bounded evaluator of validated arithmetic expressions.
+
+    Args:
+        max_exponent: Largest allowed exponent
+        max_bits: Largest allowed integer result, in bits
+        max_steps: Operations allowed per evaluation
+        time_budget: Seconds allowed per evaluation
+    """
+
+    def __init__(
+        self,
+        max_exponent: int = 10000,
+        max_bits: int = 10000,
+        max_steps: int = 1000,
+        time_budget: float = 0.05
+    ):
+        self.max_exponent = max_exponent
+        self.max_bits = max_bits
+        self.max_steps = max_steps
+        self.time_budget = time_budget
+
+    def evaluate(self, expression: str) -> Number:
+        """
+        Evaluate an arithmetic expression.
+
+        Args:
+            expression: Expression such as ``"2 + 2 * 3"`` or ``"sqrt(2) ** 2"``
+
+        Returns:
+            The value
+
+        Raises:
+            CalculationError: If the expression is not allowed, exceeds a
+                limit or fails to evaluate
+        """
+        tree = parse_expression(expression)
+        budget = {"steps": self.max_steps, "deadline": time.perf_counter() + self.time_budget}
+        try:
+            return self._eval(tree.body, budget)
+        except CalculationError:
+            raise
+        except (ArithmeticError, ValueError, TypeError) as e:
+            raise CalculationError(str(e) or type(e).__name__) from None
+
+    def _spend(self, budget: Dict[str, Any]):
+        budget["steps"] -= 1
+        if budget["steps"] < 0:
+            raise CalculationError("Expression needs too many steps")
+        if time.perf_counter() > budget["deadline"]:
+            raise CalculationError("Expression takes too long to evaluate")
+
+    def _eval(self, node: ast.AST, budget: Dict[str, Any]) -> Number:
+        self._spend(budget)
+
+        if isinstance(node, ast.Constant):
+            return self._check(node.value)
+
+        if isinstance(node, ast.Name):
+            return _CONSTANTS[node.id]
+
+        if isinstance(node, ast.UnaryOp):
+            return _UNARY_OPERATORS[type(node.op)](self._eval(node.operand, budget))
+
+        if isinstance(node, ast.BinOp):
+            left = self._eval(node.left, budget)
+            right = self._eval(node.right, budget)
+            self._check_operation(type(node.op), left, right)
+            return self._check(_BINARY_OPERATORS[type(node.op)](left, right))
+
+        if isinstance(node, ast.Call):
+            arguments = [self._eval(argument, budget) for argument in node.args]
+            self._check_call(node.func.id, arguments)
+            return self._check(_FUNCTIONS[node.func.id](*arguments))
+
+        raise CalculationError(f"Unsupported syntax: {type(node).__name__}")
+
+    def _check_operation(self, op: type, left: Number, right: Number):
+        """Refuse operations whose result would be too large to compute cheaply."""
+        if op is ast.Pow:
+            if abs(right) > self.max_exponent:
+                raise CalculationError(f"Exponent larger than {self.max_exponent}")
+            if isinstance(left, int) and isinstance(right, int) and right > 0:
+                if max(left.bit_length(), 1) * right > self.max_bits:
+                    raise CalculationError("Result too large")
+        elif op is ast.Mult and isinstance(left, int) and isinstance(right, int):
+            if left.bit_length() + right.bit_length() > self.max_bits:
+                raise CalculationError("Result too large")
+
+    def _check_call(self, name: str, arguments: List[Number]):
+        """Refuse function arguments that would make the call slow."""
+        # round(5, -10 ** 7) takes seconds to build the power of ten it divides by
+        if name == "round" and len(arguments) > 1 and abs(arguments[1]) > MAX_ROUND_DIGITS:
+            raise CalculationError(f"round() takes at most {MAX_ROUND_DIGITS} digits")
+
+    def _check(self, value: Any) -> Number:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise CalculationError(f"Result is not a real number: {value!r}")
+        if isinstance(value, int) and value.bit_length() > self.max_bits:
+            raise CalculationError("Result too large")
+        if isinstance(value, float) and not math.isfinite(value):
+            raise CalculationError("Result is not finite")
+        return value
+
+
+_default_evaluator = SafeEvaluator()
+
+
+def safe_eval(expression: str) -> Number:
+    """Evaluate an arithmetic expression with the default limits."""
+    return _default_evaluator.evaluate(expression)
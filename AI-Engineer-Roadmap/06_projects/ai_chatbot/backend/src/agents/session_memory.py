@@ -0,0 +1,272 @@
+"""
+Session Memory - Incremental, token-bounded conversation memory
+
+This module keeps the prompt history of each chat session. Messages are
+appended one at a time and the window of recent messages is bounded by a
+token budget rather than a message count. Messages that slide out of the
+window can be folded into a running summary in the background; the
+summary is cached and reused until more messages slide out.
+"""
+
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Iterable, Tuple
+from collections import OrderedDict
+import asyncio
+import logging
+
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+
+logger = logging.getLogger(__name__)
+
+# Called with the previous summary (or None) and the messages to fold in
+Summarizer = Callable[[Optional[str], List[BaseMessage]], Awaitable[str]]
+
+
+def to_chat_messages(messages: Iterable[Any]) -> List[BaseMessage]:
+    """
+    Convert stored conversation messages into chat messages.
+
+    Args:
+        messages: Objects with ``role`` and ``content``
+
+    Returns:
+        Human and AI messages; other roles are skipped
+    """
+    chat_messages: List[BaseMessage] = []
+    for msg in messages:
+        if msg.role == "user":
+            chat_messages.append(HumanMessage(content=msg.content))
+        elif msg.role == "assistant":
+            chat_messages.append(AIMessage(content=msg.content))
+    return chat_messages
+
+
+def _load_token_counter() -> Callable[[str], int]:
+    """Return a token counter, exact when tiktoken is installed."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken not installed, estimating tokens from characters")
+        return lambda text: len(text) // 4 + 1
+
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+class SessionMemory:
+    """
+    Append-only memory of one session.
+
+    Args:
+        max_tokens: Token budget of the recent-message window
+        token_counter: Function counting the tokens of a text
+        summarizer: Coroutine function folding evicted messages into the summary
+        summary_batch_tokens: Evicted tokens collected before a summary is refreshed
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        token_counter: Optional[Callable[[str], int]] = None,
+        summarizer: Optional[Summarizer] = None,
+        summary_batch_tokens: int = 500
+    ):
+        self.max_tokens = max_tokens
+        self.count_tokens = token_counter or _load_token_counter()
+        self.summarizer = summarizer
+        self.summary_batch_tokens = summary_batch_tokens
+        self.summary: Optional[str] = None
+
+        self._window: List[BaseMessage] = []
+        self._window_costs: List[int] = []
+        self._window_tokens = 0
+        # Evicted messages not yet folded into the summary
+        self._pending: List[Tuple[BaseMessage, int]] = []
+        self._pending_tokens = 0
+        self._summary_task: Optional[asyncio.Task] = None
+        # Set when another worker wrote to the session; the window is then reloaded
+        self.stale = False
+
+    @property
+    def window_tokens(self) -> int:
+        return self._window_tokens
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+    def add_user_message(self, content: str):
+        self.append(HumanMessage(content=content))
+
+    def add_ai_message(self, content: str):
+        self.append(AIMessage(content=content))
+
+    def append(self, message: BaseMessage):
+        """
+        Add one message and evict the oldest ones over the token budget.
+
+        The newest message is always kept, even when it alone exceeds the
+        budget.
+
+        Args:
+            message: Message to add
+        """
+        cost = self.count_tokens(message.content) + 4  # Per-message overhead
+        self._window.append(message)
+        self._window_costs.append(cost)
+        self._window_tokens += cost
+
+        evict = 0
+        while self._window_tokens > self.max_tokens and evict < len(self._window) - 1:
+            self._window_tokens -= self._window_costs[evict]
+            evict += 1
+
+        if evict:
+            evicted = list(zip(self._window[:evict], self._window_costs[:evict]))
+            del self._window[:evict]
+            del self._window_costs[:evict]
+            self._evicted(evicted)
+
+    def extend(self, messages: Iterable[BaseMessage]):
+        for message in messages:
+            self.append(message)
+
+    def replace_window(self, messages: Iterable[BaseMessage]):
+        """
+        Replace the recent-message window, keeping the summary.
+
+        The newest messages that fit the token budget become the window.
+        Older ones are dropped rather than summarized, so reloading a
+        session never summarizes it again; turns another worker pushed out
+        of the window may be missing from this worker's summary.
+
+        Args:
+            messages: The session's messages, oldest first
+        """
+        messages = list(messages)
+        costs = [self.count_tokens(message.content) + 4 for message in messages]
+        start = len(messages)
+        tokens = 0
+        while start > 0 and (start == len(messages) or tokens + costs[start - 1] <= self.max_tokens):
+            start -= 1
+            tokens += costs[start]
+
+        self._window = messages[start:]
+        self._window_costs = costs[start:]
+        self._window_tokens = tokens
+
+    def _evicted(self, evicted: List[Tuple[BaseMessage, int]]):
+        if self.summarizer is None:
+            return
+
+        self._pending.extend(evicted)
+        self._pending_tokens += sum(cost for _, cost in evicted)
+        if self._pending_tokens >= self.summary_batch_tokens:
+            self._schedule_summary()
+
+    def _schedule_summary(self):
+        if self._summary_task is not None and not self._summary_task.done():
+            return  # The running refresh picks up the new messages
+        try:
+            self._summary_task = asyncio.get_running_loop().create_task(self._refresh_summary())
+        except RuntimeError:
+            logger.debug("No running event loop, summary refresh deferred")
+
+    async def _refresh_summary(self):
+        while self._pending_tokens >= self.summary_batch_tokens:
+            batch = list(self._pending)
+            try:
+                self.summary = await self.summarizer(self.summary, [message for message, _ in batch])
+            except Exception as e:
+                logger.error(f"Error summarizing conversation: {e}")
+                return
+
+            del self._pending[:len(batch)]
+            self._pending_tokens -= sum(cost for _, cost in batch)
+
+    async def wait_for_summary(self):
+        """Wait for a running summary refresh to finish."""
+        if self._summary_task is not None:
+            await asyncio.gather(self._summary_task, return_exceptions=True)
+
+    def history(self) -> List[BaseMessage]:
+        """
+        Get the prompt history: the cached summary, then the recent window.
+
+        Returns:
+            Messages to pass as ``chat_history``
+        """
+        if self.summary:
+            return [SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")] + self._window
+        return list(self._window)
+
+    def close(self):
+        """Stop a running summary refresh."""
+        if self._summary_task is not None:
+            self._summary_task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window_messages": len(self._window),
+            "window_tokens": self._window_tokens,
+            "max_tokens": self.max_tokens,
+            "has_summary": self.summary is not None,
+            "pending_summary_messages": len(self._pending)
+        }
+
+
+class SessionMemoryStore:
+    """
+    LRU of session memories, seeded once from stored history.
+
+    Args:
+        max_sessions: Memories kept before the least recently used is dropped
+        memory_options: Keyword arguments for each ``SessionMemory``
+    """
+
+    def __init__(self, max_sessions: int = 10000, **memory_options: Any):
+        self.max_sessions = max_sessions
+        self.memory_options = memory_options
+        self._memories: "OrderedDict[str, SessionMemory]" = OrderedDict()
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._memories
+
+    def get(self, session_id: str, seed: Optional[Callable[[], Iterable[BaseMessage]]] = None) -> SessionMemory:
+        """
+        Get the memory of a session, creating it on first use.
+
+        Args:
+            session_id: Session id
+            seed: Called once when the memory is created to replay earlier messages
+
+        Returns:
+            The session's memory
+        """
+        memory = self._memories.get(session_id)
+        if memory is not None:
+            self._memories.move_to_end(session_id)
+            return memory
+
+        memory = SessionMemory(**self.memory_options)
+        if seed is not None:
+            memory.extend(seed())
+        self._memories[session_id] = memory
+
+        while len(self._memories) > self.max_sessions:
+            _, dropped = self._memories.popitem(last=False)
+            dropped.close()
+        return memory
+
+    def mark_stale(self, session_id: str):
+        """Flag a session's window for reloading, keeping its summary."""
+        memory = self._memories.get(session_id)
+        if memory is not None:
+            memory.stale = True
+
+    def discard(self, session_id: str):
+        """Forget a session's memory."""
+        memory = self._memories.pop(session_id, None)
+        if memory is not None:
+            memory.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"sessions": len(self._memories), "max_sessions": self.max_sessions}
@@ -0,0 +1,87 @@
+"""
+Agent Streaming - Incremental frames from agent runs
+
+This module turns the LangChain ``astream_events`` feed of an agent run
+into small frames a client can render as they arrive: answer tokens,
+tool calls and tool results. It also encodes frames as Server-Sent Events.
+"""
+
+from typing import Dict, Any, Optional
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Longest tool input or output forwarded to the client
+MAX_TOOL_TEXT = 500
+
+
+def _truncate(value: Any) -> str:
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= MAX_TOOL_TEXT else text[:MAX_TOOL_TEXT] + "..."
+
+
+def _chunk_text(chunk: Any) -> str:
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    # Content blocks, as some providers stream them
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def to_stream_frame(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convert one ``astream_events`` (v2) event into a client frame.
+
+    Args:
+        event: Event emitted by the agent run
+
+    Returns:
+        A ``token``, ``tool_start`` or ``tool_end`` frame, or None for
+        events the client does not need
+    """
+    kind = event.get("event")
+    data = event.get("data", {})
+
+    if kind == "on_chat_model_stream":
+        # Tool-calling steps stream arguments, not text, and are skipped here
+        text = _chunk_text(data.get("chunk"))
+        return {"type": "token", "content": text} if text else None
+
+    if kind == "on_tool_start":
+        return {"type": "tool_start", "tool": event.get("name"), "input": _truncate(data.get("input", ""))}
+
+    if kind == "on_tool_end":
+        output = data.get("output", "")
+        return {"type": "tool_end", "tool": event.get("name"), "output": _truncate(getattr(output, "content", output))}
+
+    return None
+
+
+def final_output(event: Dict[str, Any]) -> Optional[str]:
+    """
+    Read the final answer from the end event of the top-level run.
+
+    Args:
+        event: Event emitted by the agent run
+
+    Returns:
+        The answer, or None if this is not the end of the top-level run
+    """
+    if event.get("event") != "on_chain_end" or event.get("parent_ids"):
+        return None
+    output = event.get("data", {}).get("output")
+    return output.get("output") if isinstance(output, dict) else None
+
+
+def sse_format(frame: Dict[str, Any]) -> str:
+    """
+    Encode a frame as a Server-Sent Event named after its type.
+
+    Args:
+        frame: Frame with a ``type`` key
+
+    Returns:
+        The event text, including the blank line that terminates it
+    """
+    return f"event: {frame['type']}\ndata: {json.dumps(frame)}\n\n"
@@ -7,9 +7,9 @@ memory management, and real-time communication.
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 import json
 import asyncio
 import logging
@@ -17,8 +17,16 @@ from datetime import datetime
 import uuid
 
 from src.agents.chatbot_agent import ChatbotAgent
+from src.agents.agent_pool import AgentPool
+from src.agents.streaming import sse_format
+from src.agents.session_memory import SessionMemory, SessionMemoryStore, to_chat_messages
 from src.models.conversation import Conversation, Message
-from src.services.memory_service import MemoryService
+from src.services.memory_service import MemoryService, create_memory_backend
+from src.services.connection_tasks import ConnectionTasks
+from src.services.connection_manager import ConnectionManager
+from src.services.pubsub import SessionBus, create_pubsub_backend
+from src.services.response_cache import ResponseCache, cache_key
+from src.services.knowledge_base import create_knowledge_base
 from src.utils.config import Settings
 
 # Configure logging
@@ -45,41 +53,57 @@ app.add_middleware(
 )
 
 # Initialize services
-memory_service = MemoryService()
-chatbot_agent = ChatbotAgent(settings)
+# Shared with the other workers serving the same sessions
+session_bus = SessionBus(create_pubsub_backend(settings))
+SESSIONS_CHANNEL = "sessions"
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.user_sessions: Dict[str, str] = {}  # websocket_id -> user_id
+async def announce_sessions(session_ids: List[str], deleted: bool = False):
+    await session_bus.publish(SESSIONS_CHANNEL, {"session_ids": session_ids, "deleted": deleted})
 
-    async def connect(self, websocket: WebSocket, user_id: str):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        self.user_sessions[id(websocket)] = user_id
-        logger.info(f"User {user_id} connected")
+memory_service = MemoryService(
+    create_memory_backend(settings),
+    cache_size=getattr(settings, "memory_cache_size", 1000),
+    on_write=announce_sessions
+)
+# Indexed once and searched by every agent
+knowledge_base = create_knowledge_base(settings)
+# Agents are stateless and shared; sessions only queue behind themselves.
+# That queue is per worker: two workers can run turns of one session at
+# once, so deploy with sticky sessions when turn order must be strict.
+agent_pool = AgentPool(
+    lambda: ChatbotAgent(settings, knowledge_base=knowledge_base),
+    size=getattr(settings, "agent_pool_size", 1),
+    max_concurrency=getattr(settings, "max_concurrent_turns", 64)
+)
+# Prompt history per session, appended to as turns finish
+session_memories = SessionMemoryStore(
+    max_sessions=getattr(settings, "memory_max_sessions", 10000),
+    max_tokens=getattr(settings, "memory_max_tokens", 2000),
+    summarizer=agent_pool.agents[0].summarize_history if getattr(settings, "summarize_history", False) else None
+)
 
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            user_id = self.user_sessions.pop(id(websocket), None)
-            logger.info(f"User {user_id} disconnected")
+# Answers to repeated messages, keyed on message, model, prompt and recent history
+response_cache = ResponseCache(
+    max_entries=getattr(settings, "response_cache_size", 1000),
+    ttl=getattr(settings, "response_cache_ttl", 300)
+) if getattr(settings, "enable_response_cache", True) else None
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        try:
-            await websocket.send_text(message)
-        except Exception as e:
-            logger.error(f"Error sending message: {e}")
+# WebSocket connections, reachable from every worker through the session bus
+manager = ConnectionManager(session_bus)
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting message: {e}")
-
-manager = ConnectionManager()
+async def on_sessions_changed(payload: Dict[str, Any]):
+    """
+    Drop cached state of sessions another worker wrote to or deleted.
+    
+    Written sessions keep their summary and only reload their recent
+    messages on next use; deleted sessions are forgotten.
+    """
+    for session_id in payload["session_ids"]:
+        memory_service.invalidate(session_id)
+        if payload.get("deleted"):
+            session_memories.discard(session_id)
+        else:
+            session_memories.mark_stale(session_id)
 
 # Pydantic models
 class ChatMessage(BaseModel):
@@ -97,6 +121,80 @@ class ConversationHistory(BaseModel):
     session_id: str
     messages: List[Dict[str, Any]]
 
+async def load_session_memory(session_id: str) -> SessionMemory:
+    """Get a session's prompt memory, reading stored history on first use or after a remote write."""
+    if session_id in session_memories:
+        memory = session_memories.get(session_id)
+        if memory.stale:
+            # Cleared first, so a write announced during the read marks it again
+            memory.stale = False
+            conversation = await memory_service.get_conversation(session_id)
+            memory.replace_window(to_chat_messages(conversation.get_messages()))
+        return memory
+    conversation = await memory_service.get_conversation(session_id)
+    return session_memories.get(session_id, lambda: to_chat_messages(conversation.get_messages()))
+
+async def cached_response(chatbot_agent: ChatbotAgent, message: str, memory: SessionMemory) -> str:
+    """Answer from the response cache, or run the agent once for all identical requests."""
+    if response_cache is None:
+        return await chatbot_agent.generate_response(message=message, memory=memory)
+    
+    async def answer():
+        turn = await chatbot_agent.run_turn(message, memory=memory)
+        cacheable = not turn["error"] and not chatbot_agent.volatile_tools.intersection(turn["tools"])
+        return turn["output"], cacheable
+    
+    model = f"{settings.openai_model}:{settings.temperature}"
+    key = cache_key(message, model, chatbot_agent.prompt_version, memory.history())
+    return await response_cache.get_or_compute(key, answer)
+
+async def stream_turn(
+    session_id: str,
+    message: str,
+    message_id: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run one chat turn and yield its frames as they are generated.
+    
+    The conversation is saved before the final ``done`` frame, which also
+    carries the session id, timestamp and message id of the response.
+    """
+    message_id = message_id or str(uuid.uuid4())
+    async with agent_pool.session(session_id) as chatbot_agent:
+        # Get conversation history
+        memory = await load_session_memory(session_id)
+        
+        # Add user message
+        user_message = Message(
+            role="user",
+            content=message,
+            timestamp=datetime.now()
+        )
+        
+        async for frame in chatbot_agent.astream_response(message=message, memory=memory):
+            if frame["type"] != "done":
+                yield {**frame, "session_id": session_id, "message_id": message_id}
+                continue
+            
+            # Add AI response
+            ai_message = Message(
+                role="assistant",
+                content=frame["response"],
+                timestamp=datetime.now()
+            )
+            memory.add_user_message(message)
+            memory.add_ai_message(frame["response"])
+            
+            # Save the new messages
+            await memory_service.append_messages(session_id, [user_message, ai_message])
+            
+            yield {
+                **frame,
+                "session_id": session_id,
+                "timestamp": datetime.now().isoformat(),
+                "message_id": message_id
+            }
+
 # API Endpoints
 @app.get("/")
 async def root():
@@ -115,33 +213,31 @@ async def chat_endpoint(chat_message: ChatMessage):
         # Generate session ID if not provided
         session_id = chat_message.session_id or str(uuid.uuid4())
         
-        # Get conversation history
-        conversation = await memory_service.get_conversation(session_id)
-        
-        # Add user message
-        user_message = Message(
-            role="user",
-            content=chat_message.message,
-            timestamp=datetime.now()
-        )
-        conversation.add_message(user_message)
-        
-        # Get AI response
-        ai_response = await chatbot_agent.generate_response(
-            message=chat_message.message,
-            conversation_history=conversation.get_messages()
-        )
-        
-        # Add AI response
-        ai_message = Message(
-            role="assistant",
-            content=ai_response,
-            timestamp=datetime.now()
-        )
-        conversation.add_message(ai_message)
-        
-        # Save conversation
-        await memory_service.save_conversation(session_id, conversation)
+        async with agent_pool.session(session_id) as chatbot_agent:
+            # Get conversation history
+            memory = await load_session_memory(session_id)
+            
+            # Add user message
+            user_message = Message(
+                role="user",
+                content=chat_message.message,
+                timestamp=datetime.now()
+            )
+            
+            # Get AI response, shared with identical requests
+            ai_response = await cached_response(chatbot_agent, chat_message.message, memory)
+            
+            # Add AI response
+            ai_message = Message(
+                role="assistant",
+                content=ai_response,
+                timestamp=datetime.now()
+            )
+            memory.add_user_message(chat_message.message)
+            memory.add_ai_message(ai_response)
+            
+            # Save the new messages
+            await memory_service.append_messages(session_id, [user_message, ai_message])
         
         return ChatResponse(
             response=ai_response,
@@ -154,6 +250,23 @@ async def chat_endpoint(chat_message: ChatMessage):
         logger.error(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(chat_message: ChatMessage):
+    """
+    Send a message to the chatbot and stream the response as Server-Sent Events.
+    """
+    session_id = chat_message.session_id or str(uuid.uuid4())
+    
+    async def events():
+        async for frame in stream_turn(session_id, chat_message.message):
+            yield sse_format(frame)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/conversation/{session_id}", response_model=ConversationHistory)
 async def get_conversation(session_id: str):
     """
@@ -176,83 +289,104 @@ async def delete_conversation(session_id: str):
     """
     try:
         await memory_service.delete_conversation(session_id)
+        session_memories.discard(session_id)
+        await announce_sessions([session_id], deleted=True)
         return {"message": "Conversation deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting conversation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/conversations")
-async def list_conversations():
+async def list_conversations(limit: int = 50, cursor: Optional[str] = None):
     """
-    List all conversation sessions.
+    List conversation sessions, most recently updated first.
+    
+    Pass the returned ``next_cursor`` to get the next page.
     """
     try:
-        conversations = await memory_service.list_conversations()
-        return {"conversations": conversations}
+        return await memory_service.list_conversations(limit=min(limit, 500), cursor=cursor)
     except Exception as e:
         logger.error(f"Error listing conversations: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.on_event("startup")
+async def startup():
+    if knowledge_base is not None:
+        # Embedding the files may call a remote API, so keep it off the event loop
+        await asyncio.to_thread(knowledge_base.load_directory, settings.knowledge_base_path)
+    await manager.start()
+    await session_bus.subscribe(SESSIONS_CHANNEL, on_sessions_changed, include_own=False)
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Write messages still queued in the memory service
+    await memory_service.close()
+    await session_bus.close()
+
 # WebSocket endpoint for real-time chat
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
+    """
+    Real-time chat over a WebSocket.
+    
+    Each message runs as its own task so the connection keeps receiving
+    while answers stream. Send ``{"type": "cancel", "message_id": ...}`` to
+    stop a request; requests still running when the client disconnects are
+    cancelled.
+    """
     await manager.connect(websocket, user_id)
+    tasks = ConnectionTasks(max_in_flight=getattr(settings, "max_requests_per_connection", 4))
+    
+    async def send(frame: Dict[str, Any]):
+        await manager.send_personal_message(json.dumps(frame), websocket)
+    
+    async def handle(session_id: str, message: str, message_id: str):
+        try:
+            # Stream tokens and tool events as they are generated
+            async for frame in stream_turn(session_id, message, message_id):
+                await send(frame)
+        except asyncio.CancelledError:
+            await send({"type": "cancelled", "session_id": session_id, "message_id": message_id})
+            raise
+    
     try:
         while True:
             # Receive message from client
             data = await websocket.receive_text()
             message_data = json.loads(data)
+            message_id = message_data.get("message_id") or str(uuid.uuid4())
+            
+            if message_data.get("type") == "cancel":
+                if not tasks.cancel(message_id):
+                    await send({"type": "error", "message_id": message_id, "message": "No such request in flight"})
+                continue
             
             # Process message
             session_id = message_data.get("session_id", str(uuid.uuid4()))
             message = message_data.get("message", "")
             
-            # Get conversation history
-            conversation = await memory_service.get_conversation(session_id)
-            
-            # Add user message
-            user_message = Message(
-                role="user",
-                content=message,
-                timestamp=datetime.now()
-            )
-            conversation.add_message(user_message)
-            
-            # Get AI response
-            ai_response = await chatbot_agent.generate_response(
-                message=message,
-                conversation_history=conversation.get_messages()
-            )
-            
-            # Add AI response
-            ai_message = Message(
-                role="assistant",
-                content=ai_response,
-                timestamp=datetime.now()
-            )
-            conversation.add_message(ai_message)
-            
-            # Save conversation
-            await memory_service.save_conversation(session_id, conversation)
-            
-            # Send response back to client
-            response_data = {
-                "response": ai_response,
-                "session_id": session_id,
-                "timestamp": datetime.now().isoformat(),
-                "message_id": str(uuid.uuid4())
-            }
-            
-            await manager.send_personal_message(
-                json.dumps(response_data), 
-                websocket
+            started = tasks.start(
+                message_id,
+                lambda: handle(session_id, message, message_id)
             )
+            if not started:
+                await send({
+                    "type": "error",
+                    "session_id": session_id,
+                    "message_id": message_id,
+                    "message": "Duplicate message_id" if message_id in tasks else "Too many requests in flight"
+                })
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        await manager.disconnect(websocket)
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-        manager.disconnect(websocket)
+        await manager.disconnect(websocket)
+    finally:
+        # Nobody is left to read these answers
+        cancelled = await tasks.cancel_all()
+        if cancelled:
+            logger.info(f"Cancelled {len(cancelled)} requests of user {user_id}")
 
 # Serve HTML page for testing
 @app.get("/test", response_class=HTMLResponse)
@@ -281,11 +415,26 @@ async def test_page():
             const input = document.getElementById("input");
             const send = document.getElementById("send");
             
+            let current = null;
+            
             ws.onmessage = function(event) {
                 const data = JSON.parse(event.data);
-                const messageDiv = document.createElement("div");
-                messageDiv.innerHTML = `<strong>AI:</strong> ${data.response}`;
-                chat.appendChild(messageDiv);
+                if (!current) {
+                    current = document.createElement("div");
+                    current.innerHTML = "<strong>AI:</strong> <span></span>";
+                    chat.appendChild(current);
+                }
+                const text = current.querySelector("span");
+                if (data.type === "token") {
+                    text.textContent += data.content;
+                } else if (data.type === "tool_start") {
+                    text.textContent = `[using ${data.tool}...]`;
+                } else if (data.type === "tool_end") {
+                    text.textContent = "";
+                } else if (data.type === "done") {
+                    text.textContent = data.response;
+                    current = null;
+                }
                 chat.scrollTop = chat.scrollHeight;
             };
             
@@ -0,0 +1,121 @@
+"""
+Connection Manager - WebSocket connections across workers
+
+This module tracks the WebSocket connections of one worker and, through
+the session bus, reaches users connected to any worker. Broadcasts and
+messages to a user are published once and delivered by every worker to
+its own sockets, concurrently.
+"""
+
+from typing import List, Dict, Any, Optional, Set, TYPE_CHECKING
+from collections import defaultdict
+import asyncio
+import logging
+
+from src.services.pubsub import SessionBus
+
+if TYPE_CHECKING:
+    from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_CHANNEL = "broadcast"
+
+
+def user_channel(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+class ConnectionManager:
+    """
+    WebSocket connections of this worker.
+
+    Args:
+        bus: Session bus shared with the other workers; without one,
+            messages only reach this worker's connections
+    """
+
+    def __init__(self, bus: Optional[SessionBus] = None):
+        self.bus = bus
+        self.active_connections: List["WebSocket"] = []
+        self.user_sessions: Dict[int, str] = {}  # websocket_id -> user_id
+        self._user_sockets: Dict[str, Set["WebSocket"]] = defaultdict(set)
+
+    async def start(self):
+        """Start receiving broadcasts published by any worker."""
+        if self.bus is not None:
+            await self.bus.subscribe(BROADCAST_CHANNEL, self._deliver_broadcast)
+
+    async def connect(self, websocket: "WebSocket", user_id: str):
+        await websocket.accept()
+        self.active_connections.append(websocket)
+        self.user_sessions[id(websocket)] = user_id
+
+        sockets = self._user_sockets[user_id]
+        sockets.add(websocket)
+        if len(sockets) == 1 and self.bus is not None:
+            await self.bus.subscribe(user_channel(user_id), self._deliver_to_user)
+        logger.info(f"User {user_id} connected")
+
+    async def disconnect(self, websocket: "WebSocket"):
+        if websocket not in self.active_connections:
+            return
+        self.active_connections.remove(websocket)
+        user_id = self.user_sessions.pop(id(websocket), None)
+
+        sockets = self._user_sockets.get(user_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self._user_sockets[user_id]
+                if self.bus is not None:
+                    await self.bus.unsubscribe(user_channel(user_id))
+        logger.info(f"User {user_id} disconnected")
+
+    async def send_personal_message(self, message: str, websocket: "WebSocket"):
+        try:
+            await websocket.send_text(message)
+        except Exception as e:
+            logger.error(f"Error sending message: {e}")
+
+    async def _send_all(self, message: str, connections: List["WebSocket"]):
+        # One slow client must not hold up the others
+        await asyncio.gather(*(self.send_personal_message(message, ws) for ws in connections))
+
+    async def send_to_user(self, user_id: str, message: str):
+        """
+        Send a message to every connection of a user, on any worker.
+
+        Args:
+            user_id: User id
+            message: Text to send
+        """
+        if self.bus is None:
+            await self._send_all(message, list(self._user_sockets.get(user_id, ())))
+        else:
+            await self.bus.publish(user_channel(user_id), {"user_id": user_id, "message": message})
+
+    async def broadcast(self, message: str):
+        """
+        Send a message to every connection, on every worker.
+
+        Args:
+            message: Text to send
+        """
+        if self.bus is None:
+            await self._send_all(message, list(self.active_connections))
+        else:
+            await self.bus.publish(BROADCAST_CHANNEL, {"message": message})
+
+    async def _deliver_broadcast(self, payload: Dict[str, Any]):
+        await self._send_all(payload["message"], list(self.active_connections))
+
+    async def _deliver_to_user(self, payload: Dict[str, Any]):
+        await self._send_all(payload["message"], list(self._user_sockets.get(payload["user_id"], ())))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.active_connections),
+            "users": len(self._user_sockets),
+            "worker_id": self.bus.worker_id if self.bus is not None else None
+        }
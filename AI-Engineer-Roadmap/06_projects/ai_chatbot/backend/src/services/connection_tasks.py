@@ -0,0 +1,89 @@
+"""
+Connection Tasks - Concurrent, cancellable requests on one connection
+
+This module tracks the requests a single WebSocket connection has in
+flight. Each request runs as its own task keyed by message id, so the
+connection keeps receiving while answers are generated, a request can be
+cancelled by id and everything still running is cancelled when the
+client goes away.
+"""
+
+from typing import Dict, Any, Awaitable, Callable, List
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionTasks:
+    """
+    Bounded set of running requests for one connection.
+
+    Args:
+        max_in_flight: Maximum requests running at once
+    """
+
+    def __init__(self, max_in_flight: int = 4):
+        self.max_in_flight = max_in_flight
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._tasks
+
+    def start(self, message_id: str, run: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        Start a request unless the connection is at its limit.
+
+        Args:
+            message_id: Id the client can cancel the request by
+            run: Coroutine function handling the request
+
+        Returns:
+            True if the request was started, False if it was rejected
+            because the limit is reached or the id is already running
+        """
+        if message_id in self._tasks or len(self._tasks) >= self.max_in_flight:
+            return False
+
+        task = asyncio.create_task(run())
+        self._tasks[message_id] = task
+        task.add_done_callback(lambda finished: self._finished(message_id, finished))
+        return True
+
+    def _finished(self, message_id: str, task: asyncio.Task):
+        if self._tasks.get(message_id) is task:
+            del self._tasks[message_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Request {message_id} failed: {task.exception()}")
+
+    def cancel(self, message_id: str) -> bool:
+        """
+        Cancel one running request.
+
+        Args:
+            message_id: Id the request was started with
+
+        Returns:
+            True if a running request was cancelled
+        """
+        task = self._tasks.get(message_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def cancel_all(self) -> List[str]:
+        """
+        Cancel every running request and wait for them to stop.
+
+        Returns:
+            Ids of the requests that were cancelled
+        """
+        tasks = dict(self._tasks)
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return list(tasks)
@@ -0,0 +1,397 @@
+"""
+Knowledge Base - In-process vector retrieval for the search_knowledge tool
+
+This module indexes text chunks as normalized embeddings in a numpy
+matrix and answers queries by cosine similarity, using the same result
+format as the document-intelligence vector store. Queries are embedded
+asynchronously, large scans run off the event loop, results are cached
+per query and the text handed to the agent is bounded. A feature-hashing
+embedder allows offline use and tests.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+from collections import Counter, OrderedDict
+from pathlib import Path
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+import uuid
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+TEXT_SUFFIXES = (".md", ".txt")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Offline embeddings from hashed words and character trigrams.
+
+    Queries the agent sends to the knowledge base are short and often use
+    another form of a word than the documents do ("refund" for "refunds").
+    Besides whole words, the trigrams of each word, with boundary markers,
+    are hashed into signed buckets, so such queries still share features
+    with the chunks they are about. Vectors are L2-normalized.
+
+    Args:
+        dimensions: Output vector size
+        trigram_weight: Weight of a trigram relative to a whole word
+    """
+
+    def __init__(self, dimensions: int = 384, trigram_weight: float = 0.5):
+        self.dimensions = dimensions
+        self.trigram_weight = trigram_weight
+
+    def _features(self, text: str) -> Counter:
+        features: Counter = Counter()
+        for word in _TOKEN_PATTERN.findall(text.lower()):
+            features[("w", word)] += 1.0
+            marked = f"<{word}>"
+            for start in range(len(marked) - 2):
+                features[("t", marked[start:start + 3])] += self.trigram_weight
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for (kind, feature), weight in self._features(text).items():
+            digest = int.from_bytes(
+                hashlib.blake2b(f"{kind}:{feature}".encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            sign = 1.0 if digest >> 63 else -1.0
+            vector[digest % self.dimensions] += sign * weight
+
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+def split_text(text: str, chunk_size: int = 800) -> List[str]:
+    """
+    Pack paragraphs into chunks of at most ``chunk_size`` characters.
+
+    Paragraphs longer than a chunk are cut.
+
+    Args:
+        text: Text to split
+        chunk_size: Maximum chunk size in characters
+
+    Returns:
+        Chunks in document order
+    """
+    chunks: List[str] = []
+    current = ""
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = " ".join(paragraph.split())
+        for start in range(0, len(paragraph), chunk_size):
+            piece = paragraph[start:start + chunk_size]
+            if current and len(current) + 2 + len(piece) > chunk_size:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class KnowledgeBase:
+    """
+    Cosine-similarity index over knowledge base chunks.
+
+    Args:
+        embeddings: Embedding model
+        max_results: Results returned per query
+        similarity_threshold: Minimum cosine similarity of a result
+        max_chars: Maximum characters of formatted results given to the agent
+        cache_size: Cached query results
+        cache_ttl: Seconds a cached result stays valid
+        offload_threshold: Chunks above which scans run in a worker thread
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_results: int = 4,
+        similarity_threshold: float = 0.1,
+        max_chars: int = 2000,
+        cache_size: int = 256,
+        cache_ttl: float = 300.0,
+        offload_threshold: int = 20000
+    ):
+        self.embeddings = embeddings
+        self.max_results = max_results
+        self.similarity_threshold = similarity_threshold
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.offload_threshold = offload_threshold
+
+        self._vectors: Optional[np.ndarray] = None
+        self._payloads: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def _store(self, texts: List[str], vectors: List[List[float]], metadatas: List[Dict[str, Any]]):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+
+        payloads = [
+            {
+                "chunk_id": str(uuid.uuid4()),
+                "chunk_text": text,
+                "document_title": metadata.get("title", ""),
+                "metadata": metadata
+            }
+            for text, metadata in zip(texts, metadatas)
+        ]
+
+        with self._lock:
+            # A new matrix, so scans of the old one in other threads stay valid
+            self._vectors = matrix if self._vectors is None else np.vstack([self._vectors, matrix])
+            self._payloads = self._payloads + payloads
+            self._cache.clear()
+
+    def add_texts(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> int:
+        """
+        Embed and index chunks.
+
+        Args:
+            texts: Chunk texts
+            metadatas: Metadata per chunk; ``title`` is reported as the document title
+
+        Returns:
+            Number of chunks added
+        """
+        if not texts:
+            return 0
+        self._store(texts, self.embeddings.embed_documents(texts), metadatas or [{} for _ in texts])
+        return len(texts)
+
+    async def aadd_texts(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Embed and index chunks without blocking the event loop."""
+        if not texts:
+            return 0
+        vectors = await self.embeddings.aembed_documents(texts)
+        self._store(texts, vectors, metadatas or [{} for _ in texts])
+        return len(texts)
+
+    def load_directory(self, path: str, chunk_size: int = 800) -> int:
+        """
+        Index every Markdown and text file under a directory.
+
+        Args:
+            path: Directory to read
+            chunk_size: Maximum chunk size in characters
+
+        Returns:
+            Number of chunks added
+        """
+        texts: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        for file_path in sorted(Path(path).rglob("*")):
+            if file_path.is_file() and file_path.suffix.lower() in TEXT_SUFFIXES:
+                for chunk in split_text(file_path.read_text(encoding="utf-8", errors="replace"), chunk_size):
+                    texts.append(chunk)
+                    metadatas.append({"title": file_path.stem, "source": str(file_path)})
+
+        added = self.add_texts(texts, metadatas)
+        logger.info(f"Indexed {added} knowledge base chunks from {path}")
+        return added
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        similarity_threshold: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the chunks most similar to a query embedding.
+
+        Args:
+            query_embedding: Query embedding
+            top_k: Maximum number of results
+            similarity_threshold: Minimum cosine similarity
+
+        Returns:
+            Result dictionaries with a ``similarity`` field, best first
+        """
+        with self._lock:
+            vectors, payloads = self._vectors, self._payloads
+        if vectors is None or top_k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = vectors @ query
+
+        count = min(top_k, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {**payloads[row], "similarity": float(scores[row])}
+            for row in top
+            if scores[row] >= similarity_threshold
+        ]
+
+    def _cached(self, key: Tuple[str, int]) -> Optional[List[Dict[str, Any]]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, results = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return results
+
+    def _remember(self, key: Tuple[str, int], results: List[Dict[str, Any]]):
+        self._cache[key] = (time.monotonic() + self.cache_ttl, results)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def aquery(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve the chunks most relevant to a query.
+
+        Args:
+            query: Query text
+            top_k: Maximum number of results, capped at ``max_results``
+
+        Returns:
+            Result dictionaries, best first
+        """
+        top_k = min(top_k or self.max_results, self.max_results)
+        key = (" ".join(query.lower().split()), top_k)
+        results = self._cached(key)
+        if results is not None:
+            self._hits += 1
+            return results
+
+        self._misses += 1
+        if not self._payloads:
+            return []
+
+        query_embedding = await self.embeddings.aembed_query(query)
+        if len(self._payloads) > self.offload_threshold:
+            results = await asyncio.to_thread(self.search, query_embedding, top_k, self.similarity_threshold)
+        else:
+            results = self.search(query_embedding, top_k, self.similarity_threshold)
+
+        self._remember(key, results)
+        return results
+
+    def query(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Synchronous version of ``aquery``."""
+        top_k = min(top_k or self.max_results, self.max_results)
+        key = (" ".join(query.lower().split()), top_k)
+        results = self._cached(key)
+        if results is None:
+            self._misses += 1
+            results = self.search(self.embeddings.embed_query(query), top_k, self.similarity_threshold) if self._payloads else []
+            self._remember(key, results)
+        else:
+            self._hits += 1
+        return results
+
+    def format_results(self, query: str, results: List[Dict[str, Any]]) -> str:
+        """
+        Format results as tool output of at most ``max_chars`` characters.
+
+        Args:
+            query: The query searched for
+            results: Results of ``aquery``
+
+        Returns:
+            Numbered excerpts with their sources
+        """
+        if not results:
+            return f"No knowledge base entries found for '{query}'."
+
+        budget = self.max_chars
+        parts = []
+        for number, result in enumerate(results, 1):
+            header = f"[{number}] {result['document_title'] or 'Untitled'} (similarity {result['similarity']:.2f})\n"
+            room = budget - len(header) - 2
+            if room <= 0:
+                break
+            text = result["chunk_text"]
+            if len(text) > room:
+                text = text[:max(room - 3, 0)] + "..."
+            parts.append(header + text)
+            budget -= len(parts[-1]) + 2
+        return "\n\n".join(parts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "chunks": len(self._payloads),
+            "cached_queries": len(self._cache),
+            "cache_hit_rate": self._hits / lookups if lookups else 0.0
+        }
+
+
+def create_knowledge_base(settings: Any) -> Optional[KnowledgeBase]:
+    """
+    Create the knowledge base configured in the settings.
+
+    ``settings.knowledge_base_path`` names a directory of Markdown and text
+    files to index. ``settings.knowledge_embedding_provider`` is ``openai``
+    (default) or ``hashing`` for offline use. The knowledge base is
+    returned empty; index the directory with ``load_directory``, which
+    embeds every file and may call a remote API.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        The knowledge base, or None when no directory is configured
+    """
+    path = getattr(settings, "knowledge_base_path", None)
+    if not path:
+        return None
+
+    provider = getattr(settings, "knowledge_embedding_provider", "openai")
+    if provider == "hashing":
+        embeddings: Embeddings = HashingEmbeddings()
+    elif provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        embeddings = OpenAIEmbeddings(
+            model=getattr(settings, "embedding_model", "text-embedding-3-small"),
+            api_key=settings.openai_api_key
+        )
+    else:
+        raise ValueError(f"Unknown embedding provider: {provider}")
+
+    knowledge_base = KnowledgeBase(
+        embeddings,
+        max_results=getattr(settings, "knowledge_max_results", 4),
+        max_chars=getattr(settings, "knowledge_max_chars", 2000)
+    )
+    return knowledge_base
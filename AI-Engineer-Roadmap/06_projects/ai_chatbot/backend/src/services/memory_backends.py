@@ -0,0 +1,544 @@
+"""
+Memory Backends - Append-only conversation storage
+
+This module stores conversation messages as append-only records per
+session. Backends are SQLite in WAL mode and any Redis-compatible async
+client, with an in-process fake of the Redis commands used. A cached
+store sits in front of a backend: reads come from an LRU of recent
+sessions and appends are queued and written in batches in the
+background.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """
+    Interface of persistent conversation storage.
+
+    Records are JSON-serializable dicts, one per message.
+    """
+
+    async def append(self, batches: Dict[str, List[Dict[str, Any]]]):
+        """Append records to several sessions in one write."""
+        raise NotImplementedError
+
+    async def load(self, session_id: str) -> List[Dict[str, Any]]:
+        """Load every record of a session, oldest first."""
+        raise NotImplementedError
+
+    async def delete(self, session_id: str):
+        """Delete a session and its records."""
+        raise NotImplementedError
+
+    async def list_sessions(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List sessions, most recently updated first.
+
+        Args:
+            limit: Maximum sessions returned
+            cursor: Cursor returned by the previous page
+
+        Returns:
+            Session summaries and the cursor of the next page, or None on the last page
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SQLiteBackend(MemoryBackend):
+    """
+    SQLite storage in WAL mode.
+
+    Queries run on one dedicated thread so the event loop never blocks on
+    disk and the connection is never shared between threads.
+
+    Args:
+        path: Database file
+    """
+
+    def __init__(self, path: str = "conversations.db"):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-memory")
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    record TEXT NOT NULL,
+                    PRIMARY KEY (session_id, seq)
+                );
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    updated_at REAL NOT NULL,
+                    message_count INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS sessions_by_update ON sessions (updated_at DESC, session_id DESC);
+            """)
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _append(self, batches: Dict[str, List[Dict[str, Any]]]):
+        connection = self._connect()
+        now = time.time()
+        with connection:
+            for session_id, records in batches.items():
+                row = connection.execute(
+                    "SELECT message_count FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                start = row[0] if row else 0
+                connection.executemany(
+                    "INSERT INTO messages (session_id, seq, record) VALUES (?, ?, ?)",
+                    [(session_id, start + i, json.dumps(record)) for i, record in enumerate(records)]
+                )
+                connection.execute(
+                    "INSERT INTO sessions (session_id, updated_at, message_count) VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at, "
+                    "message_count = excluded.message_count",
+                    (session_id, now, start + len(records))
+                )
+
+    async def append(self, batches: Dict[str, List[Dict[str, Any]]]):
+        await self._run(self._append, batches)
+
+    def _load(self, session_id: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT record FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    async def load(self, session_id: str) -> List[Dict[str, Any]]:
+        return await self._run(self._load, session_id)
+
+    def _delete(self, session_id: str):
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    async def delete(self, session_id: str):
+        await self._run(self._delete, session_id)
+
+    def _list_sessions(self, limit: int, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Keyset pagination on (updated_at, session_id) uses the index, never a scan
+        if cursor:
+            updated_at, session_id = cursor.split(":", 1)
+            rows = self._connect().execute(
+                "SELECT session_id, updated_at, message_count FROM sessions "
+                "WHERE (updated_at, session_id) < (?, ?) "
+                "ORDER BY updated_at DESC, session_id DESC LIMIT ?",
+                (float(updated_at), session_id, limit + 1)
+            ).fetchall()
+        else:
+            rows = self._connect().execute(
+                "SELECT session_id, updated_at, message_count FROM sessions "
+                "ORDER BY updated_at DESC, session_id DESC LIMIT ?",
+                (limit + 1,)
+            ).fetchall()
+
+        sessions = [
+            {"session_id": sid, "updated_at": updated, "message_count": count}
+            for sid, updated, count in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = sessions[-1]
+            next_cursor = f"{last['updated_at']!r}:{last['session_id']}"
+        return sessions, next_cursor
+
+    async def list_sessions(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return await self._run(self._list_sessions, limit, cursor)
+
+    async def close(self):
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=False)
+
+
+class RedisBackend(MemoryBackend):
+    """
+    Storage on a Redis-compatible server.
+
+    Each session is a list of JSON records; a sorted set scored by update
+    time indexes the sessions.
+
+    Args:
+        client: Async Redis client, such as ``redis.asyncio.Redis`` or ``FakeRedis``
+        prefix: Key prefix
+    """
+
+    def __init__(self, client: Any, prefix: str = "chat"):
+        self.client = client
+        self.prefix = prefix
+        self._index_key = f"{prefix}:sessions"
+
+    def _messages_key(self, session_id: str) -> str:
+        return f"{self.prefix}:messages:{session_id}"
+
+    async def append(self, batches: Dict[str, List[Dict[str, Any]]]):
+        if not batches:
+            return
+        now = time.time()
+        # One MULTI/EXEC round trip, so the messages and the index never disagree
+        pipeline = self.client.pipeline(transaction=True)
+        for session_id, records in batches.items():
+            pipeline.rpush(self._messages_key(session_id), *(json.dumps(r) for r in records))
+        pipeline.zadd(self._index_key, {session_id: now for session_id in batches})
+        await pipeline.execute()
+
+    async def load(self, session_id: str) -> List[Dict[str, Any]]:
+        return [json.loads(raw) for raw in await self.client.lrange(self._messages_key(session_id), 0, -1)]
+
+    async def delete(self, session_id: str):
+        pipeline = self.client.pipeline(transaction=True)
+        pipeline.delete(self._messages_key(session_id))
+        pipeline.zrem(self._index_key, session_id)
+        await pipeline.execute()
+
+    async def list_sessions(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Keyset pagination on (score, member), like the SQLite backend, so
+        # sessions re-scored by new messages are neither skipped nor repeated
+        entries: List[Tuple[str, float]] = []
+        if cursor:
+            score, last_id = cursor.split(":", 1)
+            # Members sharing the cursor's score come in reverse lexical order
+            ties = await self.client.zrevrangebyscore(self._index_key, score, score, withscores=True)
+            entries = [(m, s) for m, s in self._decode(ties) if m < last_id][:limit + 1]
+            upper = f"({score}"
+        else:
+            upper = "+inf"
+        if len(entries) <= limit:
+            entries += self._decode(await self.client.zrevrangebyscore(
+                self._index_key, upper, "-inf", start=0, num=limit + 1 - len(entries), withscores=True
+            ))
+
+        page = entries[:limit]
+        pipeline = self.client.pipeline(transaction=False)
+        for session_id, _ in page:
+            pipeline.llen(self._messages_key(session_id))
+        counts = await pipeline.execute() if page else []
+
+        sessions = [
+            {"session_id": session_id, "updated_at": score, "message_count": count}
+            for (session_id, score), count in zip(page, counts)
+        ]
+        next_cursor = None
+        if len(entries) > limit:
+            last = sessions[-1]
+            next_cursor = f"{last['updated_at']!r}:{last['session_id']}"
+        return sessions, next_cursor
+
+    @staticmethod
+    def _decode(entries: List[Tuple[Any, float]]) -> List[Tuple[str, float]]:
+        return [
+            (member.decode() if isinstance(member, bytes) else member, float(score))
+            for member, score in entries
+        ]
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+
+class FakeRedis:
+    """In-process stand-in for the async Redis commands ``RedisBackend`` uses."""
+
+    def __init__(self):
+        self._lists: Dict[str, List[str]] = defaultdict(list)
+        self._zsets: Dict[str, Dict[str, float]] = defaultdict(dict)
+
+    async def rpush(self, key: str, *values: str) -> int:
+        self._lists[key].extend(values)
+        return len(self._lists[key])
+
+    async def lrange(self, key: str, start: int, stop: int) -> List[str]:
+        values = self._lists.get(key, [])
+        return values[start:] if stop == -1 else values[start:stop + 1]
+
+    async def llen(self, key: str) -> int:
+        return len(self._lists.get(key, []))
+
+    async def delete(self, *keys: str) -> int:
+        return sum(
+            (self._lists.pop(key, None) is not None) + (self._zsets.pop(key, None) is not None)
+            for key in keys
+        )
+
+    async def zadd(self, key: str, mapping: Dict[str, float]) -> int:
+        added = len(set(mapping) - set(self._zsets[key]))
+        self._zsets[key].update(mapping)
+        return added
+
+    async def zrem(self, key: str, *members: str) -> int:
+        zset = self._zsets.get(key, {})
+        return sum(zset.pop(member, None) is not None for member in members)
+
+    async def zrevrangebyscore(
+        self,
+        key: str,
+        max: Any,
+        min: Any,
+        start: Optional[int] = None,
+        num: Optional[int] = None,
+        withscores: bool = False
+    ) -> List[Any]:
+        def bound(value: Any) -> Tuple[float, bool]:
+            text = str(value)
+            return (float(text[1:]), True) if text.startswith("(") else (float(text), False)
+
+        high, high_open = bound(max)
+        low, low_open = bound(min)
+        ordered = sorted(self._zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+        window = [
+            (member, score) for member, score in ordered
+            if (score < high or (score == high and not high_open))
+            and (score > low or (score == low and not low_open))
+        ]
+        if start is not None:
+            window = window[start:start + num if num is not None and num >= 0 else None]
+        return window if withscores else [member for member, _ in window]
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Buffers ``FakeRedis`` commands until ``execute``, like a Redis pipeline."""
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._commands: List[Tuple[str, tuple]] = []
+
+    def __getattr__(self, name: str) -> Callable[..., "FakePipeline"]:
+        def queue(*args: Any) -> "FakePipeline":
+            self._commands.append((name, args))
+            return self
+        return queue
+
+    async def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        return [await getattr(self._client, name)(*args) for name, args in commands]
+
+
+class CachedMessageStore:
+    """
+    LRU read cache and batched write-behind in front of a backend.
+
+    Appends land in the cache immediately and are written by a background
+    task that groups everything queued since its last write.
+
+    Args:
+        backend: Persistent storage
+        cache_size: Sessions kept in the read cache
+        flush_interval: Seconds the writer waits to collect a batch
+        max_pending: Queued records that trigger an immediate write
+        on_write: Coroutine function called with the session ids of each written batch
+    """
+
+    def __init__(
+        self,
+        backend: MemoryBackend,
+        cache_size: int = 1000,
+        flush_interval: float = 0.05,
+        max_pending: int = 500,
+        on_write: Optional[Callable[[List[str]], Awaitable[None]]] = None
+    ):
+        self.backend = backend
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_write = on_write
+
+        self._cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._pending: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._pending_count = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        # Batches taken from the queue and batches finished writing
+        self._writes_started = 0
+        self._writes_finished = 0
+        self._hits = 0
+        self._misses = 0
+        self._batches_written = 0
+
+    def _cache_put(self, session_id: str, records: List[Dict[str, Any]]):
+        self._cache[session_id] = records
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def load(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get a session's records, from the cache when possible.
+
+        Args:
+            session_id: Session id
+
+        Returns:
+            Records, oldest first; do not modify the list
+        """
+        records = self._cache.get(session_id)
+        if records is not None:
+            self._hits += 1
+            self._cache.move_to_end(session_id)
+            return records
+
+        self._misses += 1
+        writes = (self._writes_started, self._writes_finished)
+        stored = await self.backend.load(session_id)
+
+        if (self._writes_started, self._writes_finished) != writes or writes[0] != writes[1]:
+            # A batch was written while loading, so its records may be in
+            # neither the snapshot nor the queue; load again between writes
+            async with self._lock():
+                return await self._load_fresh(session_id)
+        return self._merge_pending(session_id, stored)
+
+    async def _load_fresh(self, session_id: str) -> List[Dict[str, Any]]:
+        """Load a session while holding the write lock."""
+        records = self._cache.get(session_id)
+        if records is not None:
+            return records
+        return self._merge_pending(session_id, await self.backend.load(session_id))
+
+    def _merge_pending(self, session_id: str, stored: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Another load or append may have cached the session meanwhile
+        records = self._cache.get(session_id)
+        if records is not None:
+            return records
+        # Queued records are not in the backend yet
+        records = stored + list(self._pending.get(session_id, []))
+        self._cache_put(session_id, records)
+        return records
+
+    async def append(self, session_id: str, records: List[Dict[str, Any]]):
+        """
+        Append records to a session and queue them for writing.
+
+        Args:
+            session_id: Session id
+            records: New records
+        """
+        cached = self._cache.get(session_id)
+        if cached is None:
+            cached = await self.load(session_id)
+        cached.extend(records)
+        self._cache.move_to_end(session_id)
+
+        self._pending[session_id].extend(records)
+        self._pending_count += len(records)
+        self._start_writer()
+        if self._pending_count >= self.max_pending:
+            self._wakeup.set()
+
+    def _lock(self) -> asyncio.Lock:
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+    def _start_writer(self):
+        if self._writer is None or self._writer.done():
+            self._wakeup = asyncio.Event()
+            self._writer = asyncio.get_running_loop().create_task(self._write_loop())
+
+    async def _write_loop(self):
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                pass  # Logged by flush; the batch is retried on the next round
+
+    async def flush(self):
+        """Write every queued record now."""
+        async with self._lock():
+            if not self._pending:
+                return
+            batches = dict(self._pending)
+            self._pending = defaultdict(list)
+            self._pending_count = 0
+            self._writes_started += 1
+            try:
+                await self.backend.append(batches)
+                self._batches_written += 1
+            except Exception as e:
+                logger.error(f"Error writing conversation batch: {e}")
+                # Put the batch back in front of anything queued meanwhile
+                for session_id, records in batches.items():
+                    self._pending[session_id][:0] = records
+                self._pending_count = sum(len(r) for r in self._pending.values())
+                raise
+            finally:
+                self._writes_finished += 1
+
+        if self.on_write is not None:
+            try:
+                await self.on_write(list(batches))
+            except Exception as e:
+                logger.error(f"Error announcing written sessions: {e}")
+
+    def invalidate(self, session_id: str):
+        """Drop a session from the read cache, e.g. after another worker wrote to it."""
+        if not self._pending.get(session_id):
+            self._cache.pop(session_id, None)
+
+    async def delete(self, session_id: str):
+        """Delete a session, including records not written yet."""
+        # Waits for a batch in flight so it cannot recreate the session
+        async with self._lock():
+            self._cache.pop(session_id, None)
+            dropped = self._pending.pop(session_id, [])
+            self._pending_count -= len(dropped)
+            await self.backend.delete(session_id)
+
+    async def list_sessions(self, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """List sessions, most recently updated first, one page at a time."""
+        if self._pending:
+            await self.flush()
+        return await self.backend.list_sessions(limit, cursor)
+
+    async def close(self):
+        """Write queued records and close the backend."""
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+        await self.flush()
+        await self.backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "cached_sessions": len(self._cache),
+            "pending_records": self._pending_count,
+            "batches_written": self._batches_written,
+            "cache_hit_rate": self._hits / lookups if lookups else 0.0
+        }
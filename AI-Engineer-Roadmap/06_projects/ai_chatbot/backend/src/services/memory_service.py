@@ -0,0 +1,165 @@
+"""
+Memory Service - Conversation persistence for the chatbot
+
+This module loads and stores conversations on top of an append-only
+message store. Recent sessions are served from an in-process cache, new
+messages are appended rather than rewriting the conversation and writes
+are batched in the background. The backend is SQLite by default, or a
+Redis-compatible server.
+"""
+
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from datetime import datetime
+import logging
+
+from src.models.conversation import Conversation, Message
+from src.services.memory_backends import (
+    MemoryBackend,
+    SQLiteBackend,
+    RedisBackend,
+    FakeRedis,
+    CachedMessageStore
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _to_record(message: Message) -> Dict[str, Any]:
+    timestamp = message.timestamp
+    return {
+        "role": message.role,
+        "content": message.content,
+        "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp
+    }
+
+
+def _from_record(record: Dict[str, Any]) -> Message:
+    timestamp = record.get("timestamp")
+    return Message(
+        role=record["role"],
+        content=record["content"],
+        timestamp=datetime.fromisoformat(timestamp) if timestamp else datetime.now()
+    )
+
+
+def create_memory_backend(settings: Any = None) -> MemoryBackend:
+    """
+    Create the backend named by ``settings.memory_backend``.
+
+    Backends are ``sqlite`` (default, at ``settings.memory_db_path``),
+    ``redis`` (at ``settings.redis_url``) and ``fake_redis``, an
+    in-process stand-in for tests and local runs.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        A memory backend
+    """
+    name = getattr(settings, "memory_backend", "sqlite")
+
+    if name == "sqlite":
+        return SQLiteBackend(getattr(settings, "memory_db_path", "conversations.db"))
+
+    if name == "redis":
+        import redis.asyncio as redis
+
+        return RedisBackend(redis.from_url(getattr(settings, "redis_url", "redis://localhost:6379/0")))
+
+    if name == "fake_redis":
+        return RedisBackend(FakeRedis())
+
+    raise ValueError(f"Unknown memory backend: {name}")
+
+
+class MemoryService:
+    """
+    Conversation storage with a read cache and batched appends.
+
+    Args:
+        backend: Persistent storage, SQLite by default
+        cache_size: Sessions kept in the read cache
+        flush_interval: Seconds appends are collected before being written
+        on_write: Coroutine function called with the session ids of each written batch
+    """
+
+    def __init__(
+        self,
+        backend: Optional[MemoryBackend] = None,
+        cache_size: int = 1000,
+        flush_interval: float = 0.05,
+        on_write: Optional[Callable[[List[str]], Awaitable[None]]] = None
+    ):
+        self.store = CachedMessageStore(
+            backend or SQLiteBackend(),
+            cache_size=cache_size,
+            flush_interval=flush_interval,
+            on_write=on_write
+        )
+
+    async def get_conversation(self, session_id: str) -> Conversation:
+        """
+        Get a session's conversation, empty if the session is new.
+
+        Args:
+            session_id: Session id
+
+        Returns:
+            The conversation
+        """
+        conversation = Conversation(session_id=session_id)
+        for record in await self.store.load(session_id):
+            conversation.add_message(_from_record(record))
+        return conversation
+
+    async def append_messages(self, session_id: str, messages: List[Message]):
+        """
+        Append new messages to a session.
+
+        Args:
+            session_id: Session id
+            messages: Messages in the order they were exchanged
+        """
+        await self.store.append(session_id, [_to_record(message) for message in messages])
+
+    async def save_conversation(self, session_id: str, conversation: Conversation):
+        """
+        Store a conversation, appending only the messages not stored yet.
+
+        Args:
+            session_id: Session id
+            conversation: Conversation loaded by ``get_conversation`` and extended since
+        """
+        stored = len(await self.store.load(session_id))
+        new_messages = conversation.get_messages()[stored:]
+        if new_messages:
+            await self.append_messages(session_id, new_messages)
+
+    def invalidate(self, session_id: str):
+        """Forget the cached copy of a session changed by another worker."""
+        self.store.invalidate(session_id)
+
+    async def delete_conversation(self, session_id: str):
+        """Delete a session's conversation."""
+        await self.store.delete(session_id)
+
+    async def list_conversations(self, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List conversations, most recently updated first.
+
+        Args:
+            limit: Maximum conversations returned
+            cursor: ``next_cursor`` of the previous page
+
+        Returns:
+            Dictionary with the conversations and the cursor of the next page
+        """
+        sessions, next_cursor = await self.store.list_sessions(limit, cursor)
+        return {"conversations": sessions, "next_cursor": next_cursor}
+
+    async def close(self):
+        """Write queued messages and close the backend."""
+        await self.store.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.store.get_stats()
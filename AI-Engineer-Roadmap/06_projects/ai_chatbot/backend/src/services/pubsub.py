@@ -0,0 +1,219 @@
+"""
+Session Bus - Pub/sub shared by every backend worker
+
+This module lets several worker processes serve the same users and
+sessions. Workers publish JSON messages on named channels and every
+worker subscribed to a channel receives them. Backends are Redis pub/sub
+for real deployments and an in-process fake for tests and single-process
+runs.
+"""
+
+from typing import Dict, Any, Optional, Callable, Awaitable, Set
+from collections import defaultdict
+import asyncio
+import json
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Subscription:
+    """Async iterator over the raw messages of one channel."""
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class PubSubBackend:
+    """Interface of a publish/subscribe transport."""
+
+    async def publish(self, channel: str, message: str):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str) -> Subscription:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class _QueueSubscription(Subscription):
+    def __init__(self, backend: "InProcessPubSub", channel: str):
+        self.backend = backend
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def __anext__(self) -> str:
+        return await self.queue.get()
+
+    async def close(self):
+        self.backend._subscribers[self.channel].discard(self)
+
+
+class InProcessPubSub(PubSubBackend):
+    """
+    Pub/sub within one process.
+
+    Several ``SessionBus`` instances on one backend behave like workers
+    sharing a Redis server.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[_QueueSubscription]] = defaultdict(set)
+
+    async def publish(self, channel: str, message: str):
+        for subscription in list(self._subscribers.get(channel, ())):
+            subscription.queue.put_nowait(message)
+
+    async def subscribe(self, channel: str) -> Subscription:
+        subscription = _QueueSubscription(self, channel)
+        self._subscribers[channel].add(subscription)
+        return subscription
+
+
+class _RedisSubscription(Subscription):
+    def __init__(self, pubsub: Any):
+        self.pubsub = pubsub
+
+    async def __anext__(self) -> str:
+        while True:
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is not None:
+                data = message["data"]
+                return data.decode() if isinstance(data, bytes) else data
+
+    async def close(self):
+        await self.pubsub.unsubscribe()
+        close = getattr(self.pubsub, "aclose", None) or self.pubsub.close
+        await close()
+
+
+class RedisPubSub(PubSubBackend):
+    """
+    Pub/sub over a Redis server.
+
+    Args:
+        client: Async Redis client, such as ``redis.asyncio.Redis``
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    async def publish(self, channel: str, message: str):
+        await self.client.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> Subscription:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(channel)
+        return _RedisSubscription(pubsub)
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or self.client.close
+        await close()
+
+
+def create_pubsub_backend(settings: Any = None) -> PubSubBackend:
+    """
+    Create the backend named by ``settings.pubsub_backend``.
+
+    Backends are ``memory`` (default, single process) and ``redis`` (at
+    ``settings.redis_url``).
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        A pub/sub backend
+    """
+    name = getattr(settings, "pubsub_backend", "memory")
+
+    if name == "memory":
+        return InProcessPubSub()
+
+    if name == "redis":
+        import redis.asyncio as redis
+
+        return RedisPubSub(redis.from_url(getattr(settings, "redis_url", "redis://localhost:6379/0")))
+
+    raise ValueError(f"Unknown pub/sub backend: {name}")
+
+
+class SessionBus:
+    """
+    JSON messaging between workers.
+
+    Args:
+        backend: Pub/sub transport
+        worker_id: Id stamped on published messages, random by default
+    """
+
+    def __init__(self, backend: PubSubBackend, worker_id: Optional[str] = None):
+        self.backend = backend
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self._readers: Dict[str, asyncio.Task] = {}
+
+    async def publish(self, channel: str, payload: Dict[str, Any]):
+        """
+        Publish a message to every subscriber of a channel.
+
+        Args:
+            channel: Channel name
+            payload: JSON-serializable message
+        """
+        await self.backend.publish(channel, json.dumps({**payload, "origin": self.worker_id}))
+
+    async def subscribe(self, channel: str, handler: Handler, include_own: bool = True):
+        """
+        Call a handler for every message on a channel.
+
+        Args:
+            channel: Channel name
+            handler: Coroutine function called with each message
+            include_own: Also deliver messages this worker published
+        """
+        if channel in self._readers:
+            return
+        subscription = await self.backend.subscribe(channel)
+        self._readers[channel] = asyncio.create_task(self._read(subscription, handler, include_own))
+
+    async def _read(self, subscription: Subscription, handler: Handler, include_own: bool):
+        try:
+            async for raw in subscription:
+                try:
+                    payload = json.loads(raw)
+                    if not isinstance(payload, dict):
+                        raise ValueError(f"expected an object, got {type(payload).__name__}")
+                except ValueError as e:
+                    # One bad publisher must not stop this worker's reader
+                    logger.error(f"Dropping malformed bus message {raw!r:.200}: {e}")
+                    continue
+                if not include_own and payload.get("origin") == self.worker_id:
+                    continue
+                try:
+                    await handler(payload)
+                except Exception as e:
+                    logger.error(f"Error handling bus message: {e}")
+        finally:
+            await subscription.close()
+
+    async def unsubscribe(self, channel: str):
+        """Stop receiving a channel."""
+        reader = self._readers.pop(channel, None)
+        if reader is not None:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+    async def close(self):
+        """Stop every subscription and close the backend."""
+        for channel in list(self._readers):
+            await self.unsubscribe(channel)
+        await self.backend.close()
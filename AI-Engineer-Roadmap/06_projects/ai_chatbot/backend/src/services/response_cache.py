@@ -0,0 +1,174 @@
+"""
+Response Cache - Cached and coalesced chat answers
+
+This module caches answers to repeated chat messages. Keys combine the
+normalized message with everything else that shapes the answer: the
+model, the system prompt version and a hash of the history summary and
+recent turns. Entries expire after a TTL and the least recently used are
+evicted. Identical requests that arrive while the first is still being
+answered wait for it instead of starting their own LLM call.
+"""
+
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple, Iterable
+from collections import OrderedDict
+import asyncio
+import hashlib
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return _WHITESPACE.sub(" ", message.casefold()).strip().rstrip("?!. ")
+
+
+def history_hash(history: Iterable[Any], turns: int = 4) -> str:
+    """
+    Hash the summary and last few messages of a history.
+
+    System messages, which carry the summary of earlier turns, are always
+    hashed, so sessions whose recent turns match but whose earlier context
+    differs get different keys.
+
+    Args:
+        history: Chat messages with ``type`` and ``content``
+        turns: Number of trailing conversation messages hashed
+
+    Returns:
+        Short hex digest, identical for all empty histories
+    """
+    messages = list(history)
+    summaries = [m for m in messages if getattr(m, "type", "") == "system"]
+    recent = [m for m in messages if getattr(m, "type", "") != "system"][-turns:]
+
+    digest = hashlib.sha1()
+    for message in summaries + recent:
+        digest.update(f"{getattr(message, 'type', '')}\x1f{message.content}\x1e".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def cache_key(message: str, model: str, prompt_version: str, history: Iterable[Any] = ()) -> str:
+    """
+    Build the cache key of a chat request.
+
+    Args:
+        message: The user's message
+        model: Model answering it
+        prompt_version: Version of the system prompt
+        history: Prompt history the answer depends on
+
+    Returns:
+        Cache key
+    """
+    parts = [normalize_message(message), model, prompt_version, history_hash(history)]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    TTL and LRU bounded cache with single-flight computation.
+
+    Args:
+        max_entries: Answers kept before the least recently used is evicted
+        ttl: Seconds an answer stays valid
+        clock: Time source, monotonic by default
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a live cached value, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        """Cache a value for ``ttl`` seconds."""
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Tuple[Any, bool]]]) -> Any:
+        """
+        Get a cached value, or compute it once for all concurrent callers.
+
+        Args:
+            key: Cache key
+            compute: Coroutine function returning ``(value, cacheable)``
+
+        Returns:
+            The cached or computed value
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self._hits += 1
+                return value
+
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+
+            self._coalesced += 1
+            try:
+                # Shielded so a cancelled waiter does not cancel the shared call
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller computing it was cancelled; try again
+
+        self._misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value, cacheable = await compute()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Waiters see the exception; mark it retrieved for the no-waiter case
+                future.exception()
+            raise
+        else:
+            if cacheable:
+                self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses + self._coalesced
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "hit_rate": (self._hits + self._coalesced) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,71 @@
+"""
+Tests for the shared agent pool.
+"""
+
+import asyncio
+
+import pytest
+
+from src.agents.agent_pool import AgentPool
+
+
+class RecordingAgent:
+    """Agent stand-in that records overlapping turns."""
+
+    def __init__(self, log):
+        self.log = log
+
+    async def generate_response(self, session_id, turn):
+        self.log.append(("start", session_id, turn))
+        await asyncio.sleep(0.01)
+        self.log.append(("end", session_id, turn))
+
+
+async def _run_turns(pool, turns):
+    async def turn(session_id, number):
+        async with pool.session(session_id) as agent:
+            await agent.generate_response(session_id, number)
+
+    await asyncio.gather(*(turn(session_id, number) for session_id, number in turns))
+
+
+class TestAgentPool:
+    """Test cases for AgentPool."""
+
+    def test_same_session_turns_do_not_overlap(self):
+        """Test that turns of one session run one after another."""
+        log = []
+        pool = AgentPool(lambda: RecordingAgent(log))
+
+        asyncio.run(_run_turns(pool, [("a", 1), ("a", 2), ("a", 3)]))
+
+        assert [event for event, _, _ in log] == ["start", "end"] * 3
+
+    def test_sessions_share_agents_concurrently(self):
+        """Test that different sessions overlap on the shared agents."""
+        log = []
+        pool = AgentPool(lambda: RecordingAgent(log), size=2)
+
+        asyncio.run(_run_turns(pool, [("a", 1), ("b", 1), ("c", 1)]))
+
+        assert [event for event, _, _ in log[:3]] == ["start"] * 3
+        assert len(pool.agents) == 2
+        assert pool.get_stats()["active_turns"] == 0
+
+    def test_max_concurrency_bounds_turns(self):
+        """Test that no more than max_concurrency turns run at once."""
+        log = []
+        pool = AgentPool(lambda: RecordingAgent(log), max_concurrency=2)
+
+        asyncio.run(_run_turns(pool, [(str(i), 1) for i in range(6)]))
+
+        running = peak = 0
+        for event, _, _ in log:
+            running += 1 if event == "start" else -1
+            peak = max(peak, running)
+        assert peak == 2
+
+    def test_rejects_empty_pool(self):
+        """Test that a pool needs at least one agent."""
+        with pytest.raises(ValueError):
+            AgentPool(lambda: None, size=0)
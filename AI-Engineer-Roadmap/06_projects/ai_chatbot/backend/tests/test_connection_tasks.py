@@ -0,0 +1,69 @@
+"""
+Tests for per-connection request tasks.
+"""
+
+import asyncio
+
+from src.services.connection_tasks import ConnectionTasks
+
+
+class TestConnectionTasks:
+    """Test cases for ConnectionTasks."""
+
+    def test_limit_and_duplicates(self):
+        """Test that requests beyond the limit or with a running id are rejected."""
+        async def scenario():
+            tasks = ConnectionTasks(max_in_flight=2)
+            release = asyncio.Event()
+
+            assert tasks.start("a", release.wait)
+            assert not tasks.start("a", release.wait)
+            assert tasks.start("b", release.wait)
+            assert not tasks.start("c", release.wait)
+
+            release.set()
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return len(tasks), tasks.start("c", release.wait)
+
+        remaining, restarted = asyncio.run(scenario())
+
+        assert remaining == 0
+        assert restarted
+
+    def test_cancel_by_id(self):
+        """Test that one request can be cancelled while others continue."""
+        async def scenario():
+            tasks = ConnectionTasks()
+            finished = []
+
+            async def work(name):
+                await asyncio.sleep(0.02)
+                finished.append(name)
+
+            tasks.start("slow", lambda: work("slow"))
+            tasks.start("kept", lambda: work("kept"))
+            await asyncio.sleep(0)
+
+            cancelled = tasks.cancel("slow")
+            await asyncio.sleep(0.05)
+            return cancelled, tasks.cancel("missing"), finished
+
+        cancelled, missing, finished = asyncio.run(scenario())
+
+        assert cancelled
+        assert not missing
+        assert finished == ["kept"]
+
+    def test_cancel_all_on_disconnect(self):
+        """Test that cancel_all stops and reports every running request."""
+        async def scenario():
+            tasks = ConnectionTasks()
+            tasks.start("a", lambda: asyncio.sleep(10))
+            tasks.start("b", lambda: asyncio.sleep(10))
+            await asyncio.sleep(0)
+
+            cancelled = await tasks.cancel_all()
+            return sorted(cancelled), len(tasks)
+
+        assert asyncio.run(scenario()) == (["a", "b"], 0)
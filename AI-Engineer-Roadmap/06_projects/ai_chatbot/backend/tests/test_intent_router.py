@@ -0,0 +1,75 @@
+"""
+Tests for the fast-path intent router.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from src.agents.intent_router import IntentRouter
+from src.agents.safe_math import safe_eval
+
+
+@pytest.fixture
+def router():
+    """Router with a fixed clock."""
+    return IntentRouter(safe_eval, now=lambda: datetime(2026, 10, 19, 14, 5))
+
+
+class TestIntentRouter:
+    """Test cases for IntentRouter."""
+
+    @pytest.mark.parametrize("message", [
+        "What time is it?",
+        "what's the time",
+        "Hey, what is the date today?",
+        "current time please",
+        "What day is it today",
+    ])
+    def test_time_requests(self, router, message):
+        """Test that plain time and date questions are answered locally."""
+        answer = router.route(message)
+
+        assert answer.tool == "get_current_time"
+        assert answer.output == "It's 14:05 on Monday, October 19, 2026."
+
+    @pytest.mark.parametrize("message, expected", [
+        ("2+2*3", "2+2*3 = 8"),
+        ("What is (1 + 2) / 4?", "(1 + 2) / 4 = 0.75"),
+        ("calculate 6 x 7", "6 * 7 = 42"),
+        ("10 % 4 =", "10 % 4 = 2"),
+        ("2**10", "2**10 = 1024"),
+        ("calculate 12/25", "12/25 = 0.48"),
+        ("100-58=", "100-58 = 42"),
+        ("10 - 3", "10 - 3 = 7"),
+    ])
+    def test_arithmetic_requests(self, router, message, expected):
+        """Test that bare arithmetic is evaluated locally."""
+        answer = router.route(message)
+
+        assert answer.tool == "calculate"
+        assert answer.output == expected
+
+    @pytest.mark.parametrize("message", [
+        "What time does the store open?",
+        "what is 42",
+        "what is the time complexity of 2 + 2",
+        "1/0",
+        "2 ** 100000",
+        "Tell me a joke about the time 3+4 went to a bar",
+        "2024-10-15",
+        "555-1234",
+        "1-800-2000",
+        "12/25",
+    ])
+    def test_everything_else_goes_to_agent(self, router, message):
+        """Test that anything beyond a plain tool request is not routed."""
+        assert router.route(message) is None
+
+    def test_stats(self, router):
+        """Test that routed and passed messages are counted."""
+        router.route("what time is it")
+        router.route("1+1")
+        router.route("hello")
+
+        assert router.get_stats() == {"routed": {"get_current_time": 1, "calculate": 1}, "sent_to_agent": 1}
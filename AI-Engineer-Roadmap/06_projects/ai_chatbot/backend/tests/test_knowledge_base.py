@@ -0,0 +1,105 @@
+"""
+Tests for the knowledge base behind the search_knowledge tool.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from src.services.knowledge_base import HashingEmbeddings, KnowledgeBase, split_text
+
+
+DOCUMENTS = [
+    "Refunds are issued within 14 days of a return reaching our warehouse.",
+    "Our support team is available Monday to Friday from 9am to 5pm.",
+    "Shipping to Europe takes five to seven business days.",
+    "Passwords must be at least twelve characters long.",
+]
+
+
+@pytest.fixture
+def knowledge_base():
+    """Knowledge base over a few short documents."""
+    kb = KnowledgeBase(HashingEmbeddings(), max_results=2, similarity_threshold=0.05, max_chars=300)
+    kb.add_texts(DOCUMENTS, [{"title": f"doc-{i}"} for i in range(len(DOCUMENTS))])
+    return kb
+
+
+class TestKnowledgeBase:
+    """Test cases for KnowledgeBase."""
+
+    def test_finds_relevant_chunk(self, knowledge_base):
+        """Test that the best match is the chunk sharing the query's words."""
+        results = asyncio.run(knowledge_base.aquery("how many days until refunds are issued"))
+
+        assert results[0]["document_title"] == "doc-0"
+        assert len(results) <= 2
+        assert all(r["similarity"] >= 0.05 for r in results)
+
+    def test_matches_other_word_forms(self, knowledge_base):
+        """Test that a query using another form of a word still finds its chunk."""
+        results = knowledge_base.query("refund warehouses")
+
+        assert results[0]["document_title"] == "doc-0"
+
+    def test_sync_and_async_agree(self, knowledge_base):
+        """Test that query and aquery return the same chunks."""
+        sync_results = knowledge_base.query("shipping to europe")
+        knowledge_base._cache.clear()
+        async_results = asyncio.run(knowledge_base.aquery("shipping to europe"))
+
+        assert [r["chunk_id"] for r in sync_results] == [r["chunk_id"] for r in async_results]
+
+    def test_results_are_cached(self, knowledge_base):
+        """Test that repeated queries are served from the cache until new texts are added."""
+        first = asyncio.run(knowledge_base.aquery("support hours"))
+        second = asyncio.run(knowledge_base.aquery("  Support   HOURS "))
+
+        assert second is first
+        assert knowledge_base.get_stats()["cache_hit_rate"] == 0.5
+
+        knowledge_base.add_texts(["Support hours change on public holidays."])
+        assert knowledge_base.get_stats()["cached_queries"] == 0
+
+    def test_formatted_results_are_bounded(self, knowledge_base):
+        """Test that tool output never exceeds max_chars."""
+        knowledge_base.add_texts(["refunds " * 200], [{"title": "long"}])
+        results = knowledge_base.query("refunds")
+        text = knowledge_base.format_results("refunds", results)
+
+        assert len(text) <= knowledge_base.max_chars
+        assert text.startswith("[1] ")
+        assert knowledge_base.format_results("nothing", []) == "No knowledge base entries found for 'nothing'."
+
+    def test_empty_knowledge_base(self):
+        """Test that an empty knowledge base returns no results."""
+        kb = KnowledgeBase(HashingEmbeddings())
+
+        assert asyncio.run(kb.aquery("anything")) == []
+
+    def test_large_index_search_is_fast(self):
+        """Test that a query over 50k chunks stays within tens of milliseconds."""
+        kb = KnowledgeBase(HashingEmbeddings(dimensions=64), offload_threshold=10000)
+        vectors = np.random.default_rng(0).normal(size=(50000, 64)).tolist()
+        kb._store([f"chunk {i}" for i in range(50000)], vectors, [{} for _ in range(50000)])
+
+        start = time.perf_counter()
+        results = asyncio.run(kb.aquery("chunk 42"))
+        elapsed = time.perf_counter() - start
+
+        assert len(results) <= kb.max_results
+        assert elapsed < 0.1
+
+
+class TestSplitText:
+    """Test cases for split_text."""
+
+    def test_packs_paragraphs(self):
+        """Test that short paragraphs share a chunk and none exceed the size."""
+        text = "\n\n".join(["alpha " * 10, "beta " * 10, "gamma " * 100])
+        chunks = split_text(text, chunk_size=200)
+
+        assert chunks[0].startswith("alpha") and "beta" in chunks[0]
+        assert all(len(chunk) <= 200 for chunk in chunks)
@@ -0,0 +1,200 @@
+"""
+Tests for conversation storage backends and the cached message store.
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.memory_backends import SQLiteBackend, RedisBackend, FakeRedis, CachedMessageStore
+
+
+@pytest.fixture(params=["sqlite", "fake_redis"])
+def backend(request, tmp_path):
+    """Each backend, empty."""
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "memory.db"))
+    return RedisBackend(FakeRedis())
+
+
+def record(i):
+    return {"role": "user", "content": f"message {i}"}
+
+
+class TestMemoryBackends:
+    """Test cases shared by every backend."""
+
+    def test_append_load_delete(self, backend):
+        """Test that appends accumulate per session and delete removes them."""
+        async def scenario():
+            await backend.append({"a": [record(0), record(1)], "b": [record(9)]})
+            await backend.append({"a": [record(2)]})
+            loaded = await backend.load("a")
+            await backend.delete("a")
+            after = await backend.load("a"), await backend.load("b")
+            await backend.close()
+            return loaded, after
+
+        loaded, (deleted, other) = asyncio.run(scenario())
+
+        assert [r["content"] for r in loaded] == ["message 0", "message 1", "message 2"]
+        assert deleted == []
+        assert other == [record(9)]
+
+    def test_list_sessions_paginates(self, backend):
+        """Test that sessions are listed newest first, one page at a time."""
+        async def scenario():
+            for i in range(5):
+                await backend.append({f"s{i}": [record(i)] * (i + 1)})
+                await asyncio.sleep(0.002)
+
+            pages = []
+            cursor = None
+            while True:
+                sessions, cursor = await backend.list_sessions(2, cursor)
+                pages.append(sessions)
+                if cursor is None:
+                    break
+            await backend.close()
+            return pages
+
+        pages = asyncio.run(scenario())
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        listed = [s["session_id"] for page in pages for s in page]
+        assert listed == ["s4", "s3", "s2", "s1", "s0"]
+        assert pages[0][0]["message_count"] == 5
+
+    def test_pagination_survives_updates(self, backend):
+        """Test that a session updated mid-listing does not shift the pages after it."""
+        async def scenario():
+            for i in range(5):
+                await backend.append({f"s{i}": [record(i)]})
+                await asyncio.sleep(0.002)
+
+            first, cursor = await backend.list_sessions(2)
+            await backend.append({"s0": [record(9)]})
+            listed = [s["session_id"] for s in first]
+            while cursor is not None:
+                sessions, cursor = await backend.list_sessions(2, cursor)
+                listed += [s["session_id"] for s in sessions]
+            await backend.close()
+            return listed
+
+        # s0 moved ahead of the cursor; nothing else is skipped or repeated
+        assert asyncio.run(scenario()) == ["s4", "s3", "s2", "s1"]
+
+    def test_redis_pages_sessions_with_equal_scores(self):
+        """Test that sessions sharing an update time are each listed once."""
+        async def scenario():
+            client = FakeRedis()
+            backend = RedisBackend(client)
+            for name in "abcde":
+                await client.rpush(backend._messages_key(name), "{}")
+            await client.zadd(backend._index_key, {name: 1.5 for name in "abcde"})
+
+            listed, cursor = [], None
+            while True:
+                sessions, cursor = await backend.list_sessions(2, cursor)
+                listed += [(s["session_id"], s["message_count"]) for s in sessions]
+                if cursor is None:
+                    return listed
+
+        assert asyncio.run(scenario()) == [(name, 1) for name in "edcba"]
+
+    def test_redis_append_is_one_transaction(self):
+        """Test that a batch of sessions is written in a single transactional pipeline."""
+        calls = []
+
+        class RecordingRedis(FakeRedis):
+            def pipeline(self, transaction=True):
+                calls.append(("pipeline", transaction))
+                return super().pipeline(transaction)
+
+            async def rpush(self, key, *values):
+                calls.append(("rpush", key))
+                return await super().rpush(key, *values)
+
+        async def scenario():
+            backend = RedisBackend(RecordingRedis())
+            await backend.append({"a": [record(0)], "b": [record(1)], "c": [record(2)]})
+            sessions, _ = await backend.list_sessions(10)
+            return sessions
+
+        sessions = asyncio.run(scenario())
+
+        # The three pushes are replayed by the fake pipeline's execute
+        assert calls[0] == ("pipeline", True)
+        assert [name for name, _ in calls[:4]] == ["pipeline", "rpush", "rpush", "rpush"]
+        assert sorted(s["session_id"] for s in sessions) == ["a", "b", "c"]
+
+
+class TestCachedMessageStore:
+    """Test cases for CachedMessageStore."""
+
+    def test_appends_are_batched(self):
+        """Test that appends are readable at once and written together later."""
+        async def scenario():
+            backend = RedisBackend(FakeRedis())
+            store = CachedMessageStore(backend, flush_interval=0.01)
+            for i in range(10):
+                await store.append(f"s{i % 2}", [record(i)])
+
+            cached = list(await store.load("s0"))
+            before = await backend.load("s0")
+            await asyncio.sleep(0.05)
+            after = await backend.load("s0")
+            stats = store.get_stats()
+            await store.close()
+            return cached, before, after, stats
+
+        cached, before, after, stats = asyncio.run(scenario())
+
+        assert len(cached) == 5
+        assert before == []
+        assert after == cached
+        assert stats["batches_written"] == 1
+        assert stats["pending_records"] == 0
+
+    def test_evicted_session_includes_pending_records(self):
+        """Test that a cache miss merges records not written yet."""
+        async def scenario():
+            backend = RedisBackend(FakeRedis())
+            await backend.append({"a": [record(0)]})
+            store = CachedMessageStore(backend, cache_size=1, flush_interval=10)
+            await store.append("a", [record(1)])
+            await store.load("b")  # Evicts "a" before its append is written
+            loaded = await store.load("a")
+            await store.delete("a")
+            await store.close()
+            return loaded, await backend.load("a")
+
+        loaded, remaining = asyncio.run(scenario())
+
+        assert [r["content"] for r in loaded] == ["message 0", "message 1"]
+        assert remaining == []
+
+    def test_load_racing_a_flush_keeps_written_records(self):
+        """Test that a cache-miss load overlapping a batch write does not cache a stale snapshot."""
+        class SlowLoadBackend(RedisBackend):
+            async def load(self, session_id):
+                records = await super().load(session_id)
+                await asyncio.sleep(0.02)
+                return records
+
+        async def scenario():
+            backend = SlowLoadBackend(FakeRedis())
+            store = CachedMessageStore(backend, cache_size=1, flush_interval=10)
+            await store.append("a", [record(0)])
+            await store.load("b")  # Evicts "a" while its record is still queued
+            load = asyncio.create_task(store.load("a"))
+            await asyncio.sleep(0.005)
+            await store.flush()
+            loaded = list(await load)
+            cached = list(await store.load("a"))
+            await store.close()
+            return loaded, cached, await backend.load("a")
+
+        loaded, cached, stored = asyncio.run(scenario())
+
+        assert loaded == cached == stored == [record(0)]
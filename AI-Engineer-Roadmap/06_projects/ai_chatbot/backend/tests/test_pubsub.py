@@ -0,0 +1,129 @@
+"""
+Tests for the session bus and cross-worker connection manager.
+"""
+
+import asyncio
+
+from src.services.connection_manager import ConnectionManager
+from src.services.pubsub import InProcessPubSub, SessionBus
+
+
+class FakeWebSocket:
+    """WebSocket stand-in that records sent text."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+
+async def settle():
+    """Let bus readers deliver queued messages."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestSessionBus:
+    """Test cases for SessionBus."""
+
+    def test_messages_reach_other_workers(self):
+        """Test that subscribers on every bus receive a publish, optionally skipping their own."""
+        async def scenario():
+            backend = InProcessPubSub()
+            first, second = SessionBus(backend, "w1"), SessionBus(backend, "w2")
+            received = {"w1": [], "w2": []}
+
+            async def record(worker):
+                async def handler(payload):
+                    received[worker].append(payload)
+                return handler
+
+            await first.subscribe("sessions", await record("w1"), include_own=False)
+            await second.subscribe("sessions", await record("w2"))
+            await first.publish("sessions", {"session_ids": ["a"]})
+            await settle()
+
+            await second.unsubscribe("sessions")
+            await first.publish("sessions", {"session_ids": ["b"]})
+            await settle()
+            await first.close()
+            return received
+
+        received = asyncio.run(scenario())
+
+        assert received["w1"] == []
+        assert received["w2"] == [{"session_ids": ["a"], "origin": "w1"}]
+
+    def test_malformed_message_is_skipped(self):
+        """Test that a message that is not a JSON object does not stop the reader."""
+        async def scenario():
+            backend = InProcessPubSub()
+            bus = SessionBus(backend, "w1")
+            received = []
+
+            async def handler(payload):
+                received.append(payload)
+
+            await bus.subscribe("sessions", handler)
+            await backend.publish("sessions", "not json")
+            await backend.publish("sessions", "[1, 2]")
+            await bus.publish("sessions", {"session_ids": ["a"]})
+            await settle()
+            await bus.close()
+            return received
+
+        assert asyncio.run(scenario()) == [{"session_ids": ["a"], "origin": "w1"}]
+
+
+class TestConnectionManager:
+    """Test cases for ConnectionManager."""
+
+    def test_broadcast_and_user_messages_across_workers(self):
+        """Test that broadcasts and user messages reach sockets on any worker."""
+        async def scenario():
+            backend = InProcessPubSub()
+            workers = [ConnectionManager(SessionBus(backend)) for _ in range(2)]
+            for manager in workers:
+                await manager.start()
+
+            alice, bob = FakeWebSocket(), FakeWebSocket()
+            await workers[0].connect(alice, "alice")
+            await workers[1].connect(bob, "bob")
+
+            await workers[0].broadcast("hello all")
+            await workers[0].send_to_user("bob", "hi bob")
+            await settle()
+
+            await workers[1].disconnect(bob)
+            await workers[0].send_to_user("bob", "gone")
+            await settle()
+            return alice.sent, bob.sent, workers[1].get_stats()
+
+        alice, bob, stats = asyncio.run(scenario())
+
+        assert alice == ["hello all"]
+        assert bob == ["hello all", "hi bob"]
+        assert stats["connections"] == 0
+
+    def test_local_broadcast_is_concurrent(self):
+        """Test that a broadcast does not wait for slow sockets one by one."""
+        async def scenario():
+            manager = ConnectionManager()
+            sockets = [FakeWebSocket(delay=0.05) for _ in range(5)]
+            for i, ws in enumerate(sockets):
+                await manager.connect(ws, f"user{i}")
+
+            start = asyncio.get_running_loop().time()
+            await manager.broadcast("ping")
+            return asyncio.get_running_loop().time() - start, sockets
+
+        elapsed, sockets = asyncio.run(scenario())
+
+        assert all(ws.sent == ["ping"] for ws in sockets)
+        assert elapsed < 0.2
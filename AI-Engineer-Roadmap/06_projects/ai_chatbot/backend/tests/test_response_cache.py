@@ -0,0 +1,105 @@
+"""
+Tests for the chat response cache.
+"""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+
+from src.services.response_cache import ResponseCache, cache_key, normalize_message
+
+
+class FakeClock:
+    """Manually advanced time source."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCacheKey:
+    """Test cases for cache keys."""
+
+    def test_normalization(self):
+        """Test that case, spacing and trailing punctuation do not change the key."""
+        assert normalize_message("  What are your   HOURS?? ") == "what are your hours"
+        assert cache_key("What are your hours?", "gpt", "v1") == cache_key("what are  your hours", "gpt", "v1")
+
+    def test_context_changes_the_key(self):
+        """Test that model, prompt version and history are part of the key."""
+        base = cache_key("hi", "gpt", "v1")
+        history = [HumanMessage(content="earlier"), AIMessage(content="reply")]
+
+        assert cache_key("hi", "other", "v1") != base
+        assert cache_key("hi", "gpt", "v2") != base
+        assert cache_key("hi", "gpt", "v1", history) != base
+
+    def test_summary_changes_the_key(self):
+        """Test that sessions with equal recent turns but different summaries do not share a key."""
+        recent = [HumanMessage(content=f"q{i}") if i % 2 == 0 else AIMessage(content=f"a{i}") for i in range(6)]
+        first = [SystemMessage(content="Summary: the user is Ana, a nurse.")] + recent
+        second = [SystemMessage(content="Summary: the user is Ben, a pilot.")] + recent
+
+        assert cache_key("what is my job", "gpt", "v1", first) != cache_key("what is my job", "gpt", "v1", second)
+
+
+class TestResponseCache:
+    """Test cases for ResponseCache."""
+
+    def test_ttl_and_lru(self):
+        """Test that entries expire and the least recently used is evicted."""
+        clock = FakeClock()
+        cache = ResponseCache(max_entries=2, ttl=10, clock=clock)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+
+        clock.now = 11
+        assert cache.get("a") is None
+
+    def test_duplicates_are_coalesced(self):
+        """Test that simultaneous identical requests share one computation."""
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer", True
+
+        async def scenario():
+            cache = ResponseCache()
+            results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(10)))
+            cached = await cache.get_or_compute("k", compute)
+            return results, cached, cache.get_stats()
+
+        results, cached, stats = asyncio.run(scenario())
+
+        assert results == ["answer"] * 10
+        assert cached == "answer"
+        assert len(calls) == 1
+        assert stats["coalesced"] == 9
+        assert stats["hits"] == 1
+
+    def test_uncacheable_results_and_errors_are_not_stored(self):
+        """Test that results marked uncacheable and failures are recomputed."""
+        async def volatile():
+            return "12:00", False
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        async def scenario():
+            cache = ResponseCache()
+            await cache.get_or_compute("time", volatile)
+            with pytest.raises(RuntimeError):
+                await cache.get_or_compute("bad", failing)
+            return cache.get("time"), cache.get_stats()["in_flight"]
+
+        assert asyncio.run(scenario()) == (None, 0)
@@ -0,0 +1,80 @@
+"""
+Tests for the bounded arithmetic evaluator.
+"""
+
+import math
+import time
+
+import pytest
+
+from src.agents.safe_math import CalculationError, SafeEvaluator, parse_expression, safe_eval
+
+
+class TestSafeEval:
+    """Test cases for safe_eval."""
+
+    @pytest.mark.parametrize("expression, expected", [
+        ("2 + 2 * 3", 8),
+        ("(1 + 2) / 4", 0.75),
+        ("-3 ** 2", -9),
+        ("7 // 2 + 7 % 2", 4),
+        ("sqrt(16) + abs(-2)", 6.0),
+        ("2 * pi", 2 * math.pi),
+        ("max(1, 5, 3)", 5),
+        ("2 ** 100", 2 ** 100),
+        ("round(1234.5678, 2) + round(1234, -2)", 2434.57),
+    ])
+    def test_arithmetic(self, expression, expected):
+        """Test that ordinary arithmetic evaluates like Python."""
+        assert safe_eval(expression) == pytest.approx(expected)
+
+    @pytest.mark.parametrize("expression", [
+        "__import__('os').system('true')",
+        "().__class__.__bases__",
+        "open('/etc/passwd')",
+        "[1, 2]",
+        "x + 1",
+        "lambda: 1",
+        "'a' * 3",
+        "True + 1",
+        "sqrt(x=4)",
+        "1 if 1 else 2",
+    ])
+    def test_rejects_non_arithmetic(self, expression):
+        """Test that names, attributes, calls and other syntax are refused."""
+        with pytest.raises(CalculationError):
+            safe_eval(expression)
+
+    @pytest.mark.parametrize("expression", [
+        "9**9**9",
+        "2 ** 100000",
+        "10 ** 4000 * 10 ** 4000",
+        "1.5 ** 5000",
+        "exp(1000)",
+        "1 / 0",
+        "(-8) ** 0.5",
+        "+".join(["1"] * 300),
+        "max(1e308 * 10, 1)",
+        "1e308 * 10 - 1e308 * 10",
+        "1e400",
+        "round(5, -10000000)",
+        "round(1.5, 10 ** 9)",
+    ])
+    def test_limits_and_failures(self, expression):
+        """Test that huge, overflowing or failing expressions raise quickly."""
+        start = time.perf_counter()
+        with pytest.raises(CalculationError):
+            safe_eval(expression)
+        assert time.perf_counter() - start < 0.1
+
+    def test_step_budget(self):
+        """Test that an evaluator stops after its step budget."""
+        evaluator = SafeEvaluator(max_steps=10)
+
+        assert evaluator.evaluate("1 + 2 + 3") == 6
+        with pytest.raises(CalculationError):
+            evaluator.evaluate(" + ".join(["1"] * 20))
+
+    def test_parsed_expressions_are_cached(self):
+        """Test that parsing the same expression twice reuses the tree."""
+        assert parse_expression("40 + 2") is parse_expression("40 + 2")
@@ -0,0 +1,131 @@
+"""
+Tests for incremental, token-bounded session memory.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.agents.session_memory import SessionMemory, SessionMemoryStore, to_chat_messages
+
+
+def word_count(text):
+    """Count one token per word."""
+    return len(text.split())
+
+
+class TestSessionMemory:
+    """Test cases for SessionMemory."""
+
+    def test_window_is_bounded_by_tokens(self):
+        """Test that old messages are evicted once the token budget is exceeded."""
+        memory = SessionMemory(max_tokens=30, token_counter=word_count)
+
+        for i in range(10):
+            memory.add_user_message(f"message number {i} here")
+
+        contents = [m.content for m in memory.history()]
+        assert memory.window_tokens <= 30
+        assert contents[-1] == "message number 9 here"
+        assert contents == [f"message number {i} here" for i in range(10 - len(contents), 10)]
+
+    def test_oversized_message_is_kept(self):
+        """Test that the newest message survives even if it exceeds the budget."""
+        memory = SessionMemory(max_tokens=5, token_counter=word_count)
+
+        memory.add_user_message("short")
+        memory.add_ai_message("a " * 50)
+
+        assert len(memory) == 1
+        assert memory.history()[0].content.startswith("a a")
+
+    def test_evicted_messages_are_summarized_in_background(self):
+        """Test that evicted messages are folded into a cached summary."""
+        calls = []
+
+        async def summarizer(summary, messages):
+            calls.append([m.content for m in messages])
+            return f"{summary or ''}+{len(messages)}"
+
+        async def scenario():
+            memory = SessionMemory(max_tokens=12, token_counter=word_count,
+                                   summarizer=summarizer, summary_batch_tokens=10)
+            for i in range(6):
+                memory.add_user_message(f"turn {i}")
+            await memory.wait_for_summary()
+            return memory
+
+        memory = asyncio.run(scenario())
+        history = memory.history()
+
+        assert calls
+        assert isinstance(history[0], SystemMessage)
+        assert memory.summary in history[0].content
+        assert calls[0][0] == "turn 0"
+        assert memory.get_stats()["has_summary"]
+
+
+    def test_replace_window_keeps_summary(self):
+        """Test that a reloaded window keeps the summary and only the newest messages that fit."""
+        calls = []
+
+        async def summarizer(summary, messages):
+            calls.append(messages)
+            return "summary"
+
+        memory = SessionMemory(max_tokens=20, token_counter=word_count, summarizer=summarizer)
+        memory.summary = "The user is called Sam."
+        memory.add_user_message("hello")
+
+        memory.replace_window([HumanMessage(content=f"turn {i} " * 3) for i in range(10)])
+
+        history = memory.history()
+        assert "Sam" in history[0].content
+        assert [m.content for m in history[1:]] == ["turn 8 " * 3, "turn 9 " * 3]
+        assert memory.window_tokens <= 20
+        assert calls == []
+
+
+class TestSessionMemoryStore:
+    """Test cases for SessionMemoryStore."""
+
+    def test_seeds_once_and_evicts_least_recent(self):
+        """Test that a session is seeded on first use only and the LRU is bounded."""
+        seeded = []
+
+        def seed():
+            seeded.append(True)
+            return [HumanMessage(content="hello")]
+
+        store = SessionMemoryStore(max_sessions=2, token_counter=word_count)
+        first = store.get("a", seed)
+        first.add_ai_message("hi there")
+
+        assert store.get("a", seed) is first
+        assert len(seeded) == 1
+        assert [m.content for m in first.history()] == ["hello", "hi there"]
+
+        store.get("b")
+        store.get("c")
+        assert "a" not in store
+        assert store.get_stats()["sessions"] == 2
+
+    def test_stale_session_keeps_summary(self):
+        """Test that marking a session stale keeps the memory and its summary."""
+        store = SessionMemoryStore(token_counter=word_count)
+        memory = store.get("a")
+        memory.summary = "The user is called Sam."
+
+        store.mark_stale("a")
+        store.mark_stale("missing")
+
+        assert store.get("a") is memory
+        assert memory.stale
+        assert memory.summary == "The user is called Sam."
+
+    def test_to_chat_messages_skips_other_roles(self):
+        """Test that only user and assistant messages are converted."""
+        messages = [SimpleNamespace(role=role, content=role) for role in ("system", "user", "assistant")]
+
+        assert [m.content for m in to_chat_messages(messages)] == ["user", "assistant"]
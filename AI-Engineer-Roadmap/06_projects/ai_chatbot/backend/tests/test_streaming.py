@@ -0,0 +1,52 @@
+"""
+Tests for agent stream frames.
+"""
+
+import json
+
+from langchain_core.messages import AIMessageChunk
+
+from src.agents.streaming import MAX_TOOL_TEXT, to_stream_frame, final_output, sse_format
+
+
+class TestStreamFrames:
+    """Test cases for converting agent events into frames."""
+
+    def test_token_frames(self):
+        """Test that model chunks with text become token frames."""
+        event = {"event": "on_chat_model_stream", "data": {"chunk": AIMessageChunk(content="Hel")}}
+
+        assert to_stream_frame(event) == {"type": "token", "content": "Hel"}
+
+    def test_tool_call_chunks_are_skipped(self):
+        """Test that chunks streaming tool arguments produce no frame."""
+        chunk = AIMessageChunk(content="", tool_call_chunks=[{"name": "calculate", "args": "{", "id": "1", "index": 0}])
+
+        assert to_stream_frame({"event": "on_chat_model_stream", "data": {"chunk": chunk}}) is None
+        assert to_stream_frame({"event": "on_chain_start", "data": {}}) is None
+
+    def test_tool_frames(self):
+        """Test that tool events are forwarded with truncated text."""
+        start = to_stream_frame({"event": "on_tool_start", "name": "calculate", "data": {"input": "2+2"}})
+        end = to_stream_frame({"event": "on_tool_end", "name": "calculate", "data": {"output": "x" * 2000}})
+
+        assert start == {"type": "tool_start", "tool": "calculate", "input": "2+2"}
+        assert end["type"] == "tool_end"
+        assert len(end["output"]) == MAX_TOOL_TEXT + 3
+
+    def test_final_output_only_from_top_level_run(self):
+        """Test that only the outermost chain end carries the answer."""
+        top = {"event": "on_chain_end", "parent_ids": [], "data": {"output": {"output": "Done"}}}
+        nested = {"event": "on_chain_end", "parent_ids": ["run"], "data": {"output": {"output": "step"}}}
+
+        assert final_output(top) == "Done"
+        assert final_output(nested) is None
+
+    def test_sse_format(self):
+        """Test that frames are encoded as named Server-Sent Events."""
+        text = sse_format({"type": "token", "content": "hi"})
+
+        event_line, data_line = text.rstrip("\n").split("\n")
+        assert event_line == "event: token"
+        assert json.loads(data_line[len("data: "):]) == {"type": "token", "content": "hi"}
+        assert text.endswith("\n\n")
@@ -0,0 +1 @@
+"""Performance benchmarks for the document intelligence system."""
@@ -0,0 +1,138 @@
+"""
+Quantization Benchmark - Memory and recall of quantized vector search
+
+Compares int8 and product quantization, with and without exact float32
+re-ranking, against exact float32 search. Embeddings are read from a .npy
+file when given, otherwise a clustered synthetic set is generated.
+
+Usage:
+    python -m benchmarks.quantization_benchmark --vectors 20000 --dimensions 1536
+"""
+
+from typing import List, Dict, Any, Optional
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.quantization import QuantizedVectorIndex, normalize_rows
+
+
+def synthetic_embeddings(count: int, dimensions: int, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    """Generate clustered unit vectors that resemble text embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions))
+    labels = rng.integers(clusters, size=count)
+    noise = rng.normal(size=(count, dimensions)) * 0.5
+    return normalize_rows(centers[labels] + noise).astype(np.float32)
+
+
+def run_benchmark(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    top_k: int = 10,
+    pq_subspaces: int = 16,
+    rerank_factor: int = 4
+) -> List[Dict[str, Any]]:
+    """
+    Measure memory, recall@k and latency for each configuration.
+
+    Args:
+        vectors: Stored embeddings
+        queries: Query embeddings
+        top_k: Results per query
+        pq_subspaces: Bytes per vector for product quantization
+        rerank_factor: Candidates re-ranked per requested result
+
+    Returns:
+        One result row per configuration
+    """
+    vectors = normalize_rows(vectors)
+    queries = normalize_rows(queries)
+    exact = [set(np.argsort(-(vectors @ q))[:top_k]) for q in queries]
+    ids = [str(i) for i in range(len(vectors))]
+    payloads = [{"chunk_id": chunk_id} for chunk_id in ids]
+    float32_mb = vectors.nbytes / (1024 * 1024)
+
+    rows = [{"config": "float32", "resident_mb": float32_mb, "compression_ratio": 1.0,
+             "recall_at_k": 1.0, "ms_per_query": _time_exact(vectors, queries, top_k)}]
+
+    for method in ("int8", "pq"):
+        index = QuantizedVectorIndex(
+            method=method,
+            rerank_factor=rerank_factor,
+            pq_subspaces=pq_subspaces,
+            train_size=min(len(vectors), 10000)
+        )
+        start = time.perf_counter()
+        index.add(ids, vectors, payloads)
+        build_seconds = time.perf_counter() - start
+        memory = index.memory_usage()
+
+        for rerank in (False, True):
+            hits = 0
+            start = time.perf_counter()
+            for query, truth in zip(queries, exact):
+                found = index.search(query, top_k=top_k, rerank=rerank)
+                hits += len(truth & {int(r["chunk_id"]) for r in found})
+            elapsed = time.perf_counter() - start
+
+            rows.append({
+                "config": f"{method}{'+rerank' if rerank else ''}",
+                "resident_mb": memory["resident_mb"],
+                "compression_ratio": memory["compression_ratio"],
+                "recall_at_k": hits / (top_k * len(queries)),
+                "ms_per_query": 1000 * elapsed / len(queries),
+                "build_seconds": build_seconds
+            })
+
+    return rows
+
+
+def _time_exact(vectors: np.ndarray, queries: np.ndarray, top_k: int) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        scores = vectors @ query
+        np.argpartition(-scores, top_k)[:top_k]
+    return 1000 * (time.perf_counter() - start) / len(queries)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--embeddings", help="Stored embeddings as a .npy file")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--pq-subspaces", type=int, default=16)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    if args.embeddings:
+        data = np.load(args.embeddings).astype(np.float32)
+        rng = np.random.default_rng(1)
+        query_rows = rng.choice(len(data), size=min(args.queries, len(data)), replace=False)
+        # Perturbed copies of stored vectors stand in for real queries
+        queries = data[query_rows] + rng.normal(scale=0.05, size=(len(query_rows), data.shape[1]))
+        vectors = data
+    else:
+        vectors = synthetic_embeddings(args.vectors, args.dimensions)
+        queries = synthetic_embeddings(args.queries, args.dimensions, seed=1)
+
+    rows = run_benchmark(vectors, queries, args.top_k, args.pq_subspaces, args.rerank_factor)
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, recall@{args.top_k} over {len(queries)} queries")
+    print(f"{'config':<14}{'resident MB':>13}{'ratio':>8}{'recall':>9}{'ms/query':>10}")
+    for row in rows:
+        print(f"{row['config']:<14}{row['resident_mb']:>13.2f}{row['compression_ratio']:>8.1f}"
+              f"{row['recall_at_k']:>9.3f}{row['ms_per_query']:>10.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
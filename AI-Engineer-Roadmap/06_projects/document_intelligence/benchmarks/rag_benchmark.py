@@ -0,0 +1,223 @@
+"""
+RAG Benchmark - Retrieval quality and latency harness for RAGSystem
+
+Indexes a corpus directory, runs a labelled question set through RAGSystem
+with offline embedding and LLM backends and reports recall@k, MRR and
+p50/p95/p99 latency for each query stage (embed, cache, search, context
+and generate) as timed by RAGSystem itself.
+Results are written as JSON so runs with different settings can be
+compared.
+
+Question files are JSON lists of
+``{"question": "...", "relevant_documents": ["file_name.md", ...]}``.
+
+Usage:
+    python -m benchmarks.rag_benchmark --corpus benchmarks/sample/corpus \\
+        --questions benchmarks/sample/questions.json --output results.json
+"""
+
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+from types import SimpleNamespace
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.embeddings import create_embeddings
+from src.ingestion.extractors import SUPPORTED_TYPES, get_file_type
+from src.ingestion.pipeline import process_upload
+from src.quantization import QuantizedVectorIndex
+from src.rag_system import RAGSystem
+from src.telemetry import STAGES
+
+
+DEFAULT_SETTINGS = {
+    "openai_model": "gpt-3.5-turbo",
+    "openai_api_key": "unused",
+    "embedding_model": "hashing",
+    "embedding_provider": "hashing",
+    "temperature": 0.0,
+    "max_tokens": 500,
+    "retrieval_mode": "dense",
+    "enable_answer_cache": False,
+    "chunk_size": 1000,
+    "chunk_overlap": 200
+}
+
+
+class StubChatModel(FakeListChatModel):
+    """Canned-answer chat model with an optional simulated latency."""
+
+    latency: float = 0.0
+    temperature: float = 0.0
+    max_tokens: int = 500
+    model: str = "stub"
+
+    def _call(self, *args: Any, **kwargs: Any) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return super()._call(*args, **kwargs)
+
+
+def load_corpus(corpus_dir: str, chunk_size: int, chunk_overlap: int) -> List[Any]:
+    """Parse and chunk every supported file in a directory."""
+    documents = []
+    for path in sorted(Path(corpus_dir).rglob("*")):
+        if path.is_file() and get_file_type(path.name) in SUPPORTED_TYPES:
+            documents.append(process_upload(path.name, path.read_bytes(), chunk_size, chunk_overlap))
+    return documents
+
+
+def build_system(settings: Any, generate_latency: float = 0.0) -> RAGSystem:
+    """Create a RAGSystem with offline embedding and LLM backends."""
+    embeddings = create_embeddings(settings)
+    quantization = getattr(settings, "vector_quantization", None)
+    vector_store = QuantizedVectorIndex(
+        method=quantization or "int8",
+        # Without quantization the index never trains and stays exact float32
+        train_size=None if quantization else sys.maxsize,
+        embedder=embeddings
+    )
+    llm = StubChatModel(responses=["This is a benchmark answer."], latency=generate_latency)
+
+    return RAGSystem(settings, vector_store, embeddings=embeddings, llm=llm)
+
+
+def _document_name(source: Dict[str, Any]) -> str:
+    metadata = source.get("metadata") or {}
+    return metadata.get("file_name") or source.get("document_title", "")
+
+
+def retrieval_metrics(ranked: List[str], relevant: List[str], k: int) -> Dict[str, float]:
+    """
+    Score one ranked list of documents against the labels.
+
+    Args:
+        ranked: Retrieved document names, best first, without repeats
+        relevant: Document names labelled relevant
+        k: Cut-off for recall
+
+    Returns:
+        Recall@k and reciprocal rank
+    """
+    relevant_set = set(relevant)
+    if not relevant_set:
+        return {"recall": 0.0, "reciprocal_rank": 0.0}
+
+    recall = len(relevant_set & set(ranked[:k])) / len(relevant_set)
+    reciprocal_rank = next((1.0 / rank for rank, name in enumerate(ranked, 1) if name in relevant_set), 0.0)
+    return {"recall": recall, "reciprocal_rank": reciprocal_rank}
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Summarize latencies in seconds as milliseconds."""
+    values = np.array(samples) * 1000
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "mean": float(values.mean())
+    }
+
+
+def run_benchmark(
+    settings: Any,
+    corpus_dir: str,
+    questions: List[Dict[str, Any]],
+    top_k: int = 5,
+    generate_latency: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Index a corpus and measure retrieval quality and stage latency.
+
+    Args:
+        settings: Settings passed to RAGSystem
+        corpus_dir: Directory of documents to index
+        questions: Labelled questions
+        top_k: Chunks retrieved per question, also the recall cut-off
+        generate_latency: Simulated LLM latency in seconds
+
+    Returns:
+        Benchmark report
+    """
+    rag_system = build_system(settings, generate_latency)
+
+    start = time.perf_counter()
+    documents = load_corpus(corpus_dir, settings.chunk_size, settings.chunk_overlap)
+    for document in documents:
+        rag_system.vector_store.add_document(document)
+    rag_system.index_documents(documents)
+    index_seconds = time.perf_counter() - start
+
+    stage_samples: Dict[str, List[float]] = {stage: [] for stage in STAGES + ("total",)}
+    per_question = []
+
+    for item in questions:
+        result = rag_system.query(item["question"], max_results=top_k, similarity_threshold=0.0)
+        stages = {**result.get("timings", {}), "total": result["processing_time"]}
+        for stage in stage_samples:
+            stage_samples[stage].append(stages.get(stage, 0.0))
+
+        ranked = list(dict.fromkeys(_document_name(source) for source in result["sources"]))
+        metrics = retrieval_metrics(ranked, item.get("relevant_documents", []), top_k)
+        per_question.append({"question": item["question"], "retrieved": ranked, **metrics})
+
+    return {
+        "settings": {key: value for key, value in vars(settings).items() if key != "openai_api_key"},
+        "documents": len(documents),
+        "chunks": sum(len(document.chunks) for document in documents),
+        "questions": len(questions),
+        "index_seconds": index_seconds,
+        "retrieval": {
+            f"recall@{top_k}": float(np.mean([q["recall"] for q in per_question])) if per_question else 0.0,
+            "mrr": float(np.mean([q["reciprocal_rank"] for q in per_question])) if per_question else 0.0
+        },
+        "latency_ms": {stage: latency_summary(samples) for stage, samples in stage_samples.items() if samples},
+        "per_question": per_question
+    }
+
+
+def _parse_value(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark RAGSystem retrieval quality and latency")
+    parser.add_argument("--corpus", required=True, help="Directory of documents to index")
+    parser.add_argument("--questions", required=True, help="JSON file of labelled questions")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--generate-latency-ms", type=float, default=0.0)
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a setting, e.g. --set retrieval_mode=hybrid")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    overrides = dict(item.split("=", 1) for item in args.set)
+    settings = SimpleNamespace(**{**DEFAULT_SETTINGS, **{k: _parse_value(v) for k, v in overrides.items()}})
+
+    with open(args.questions) as f:
+        questions = json.load(f)
+
+    report = run_benchmark(settings, args.corpus, questions, args.top_k, args.generate_latency_ms / 1000)
+
+    print(f"{report['documents']} documents, {report['chunks']} chunks, {report['questions']} questions")
+    for name, value in report["retrieval"].items():
+        print(f"{name:<10}{value:.3f}")
+    print(f"{'stage':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, summary in report["latency_ms"].items():
+        print(f"{stage:<10}{summary['p50']:>10.2f}{summary['p95']:>10.2f}{summary['p99']:>10.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Context Packing - Token-budget-aware context assembly for RAG prompts
+
+This module counts tokens with the model's tokenizer and packs retrieved
+chunks into a fixed token budget. Chunks are taken in score order after
+near-duplicates are dropped and neighbouring chunks of the same document
+are merged back together.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class TokenCounter:
+    """
+    Token counter backed by tiktoken when it is installed.
+
+    Without tiktoken, counts fall back to a word and punctuation based
+    estimate that tracks BPE token counts far better than ``len(text) // 4``.
+    Counts are memoized since the same chunks are counted on every query.
+    """
+
+    def __init__(self, model: Optional[str] = None, cache_size: int = 4096):
+        self.model = model
+        self._encoding = self._load_encoding(model)
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    @staticmethod
+    def _load_encoding(model: Optional[str]):
+        try:
+            import tiktoken
+        except ImportError:
+            logger.info("tiktoken not installed, using estimated token counts")
+            return None
+
+        try:
+            return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from the real tokenizer."""
+        return self._encoding is not None
+
+    def _count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        # Roughly one token per short word, more for long words and symbols
+        words = _WORD_PATTERN.findall(text)
+        word_tokens = sum(1 + len(word) // 8 for word in words)
+        symbols = len(text) - sum(len(word) for word in words) - text.count(" ")
+        return word_tokens + max(symbols, 0) // 2
+
+
+def _chunk_score(chunk: Dict[str, Any]) -> float:
+    if "rerank_score" in chunk:
+        return chunk["rerank_score"]
+    return chunk.get("fusion_score", chunk.get("similarity", 0.0))
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _merge_overlap(first: str, second: str, max_overlap: int = 1000) -> str:
+    """Join two consecutive chunks, dropping the text they share."""
+    limit = min(len(first), len(second), max_overlap)
+    for size in range(limit, 0, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + "\n" + second
+
+
+class ContextPacker:
+    """
+    Packs retrieved chunks into a token budget.
+
+    Args:
+        token_counter: Counter used to measure chunks
+        token_budget: Maximum number of context tokens
+        duplicate_threshold: Shingle Jaccard similarity above which a chunk
+            counts as a near-duplicate of a better one
+        merge_adjacent: Merge chunks that are neighbours in the same document
+    """
+
+    def __init__(
+        self,
+        token_counter: TokenCounter,
+        token_budget: int = 3000,
+        duplicate_threshold: float = 0.85,
+        merge_adjacent: bool = True
+    ):
+        self.token_counter = token_counter
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+        self.merge_adjacent = merge_adjacent
+
+    def pack(self, chunks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Select and merge chunks for the prompt.
+
+        Args:
+            chunks: Retrieved chunks in the vector store result format
+
+        Returns:
+            Tuple of (packed chunks in score order, packing statistics)
+        """
+        ranked = sorted(chunks, key=_chunk_score, reverse=True)
+        unique = self._drop_near_duplicates(ranked)
+
+        packed = []
+        used_tokens = 0
+        for chunk in unique:
+            tokens = self.token_counter.count(chunk.get("chunk_text", ""))
+            if used_tokens + tokens > self.token_budget:
+                continue
+            packed.append(chunk)
+            used_tokens += tokens
+
+        if self.merge_adjacent:
+            packed = self._merge_neighbours(packed)
+            used_tokens = sum(self.token_counter.count(c.get("chunk_text", "")) for c in packed)
+
+        stats = {
+            "retrieved_chunks": len(chunks),
+            "duplicates_removed": len(ranked) - len(unique),
+            "packed_chunks": len(packed),
+            "context_tokens": used_tokens,
+            "token_budget": self.token_budget
+        }
+        return packed, stats
+
+    def _drop_near_duplicates(self, ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep the best-scoring chunk of every near-duplicate group."""
+        kept: List[Dict[str, Any]] = []
+        kept_shingles: List[set] = []
+
+        for chunk in ranked:
+            shingles = _shingles(chunk.get("chunk_text", ""))
+            duplicate = any(
+                len(shingles & other) / (len(shingles | other) or 1) >= self.duplicate_threshold
+                for other in kept_shingles
+            )
+            if not duplicate:
+                kept.append(chunk)
+                kept_shingles.append(shingles)
+
+        return kept
+
+    def _merge_neighbours(self, packed: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge runs of consecutive chunks from the same document."""
+        positions = {}
+        for chunk in packed:
+            position = _position(chunk)
+            if position is not None:
+                positions[position] = chunk
+
+        consumed = set()
+        result = []
+
+        # Chunks are in score order, so each run is placed at the rank of
+        # its best member
+        for chunk in packed:
+            if id(chunk) in consumed:
+                continue
+
+            position = _position(chunk)
+            if position is None:
+                result.append(chunk)
+                continue
+
+            document, index = position
+            start, end = index, index
+            while (document, start - 1) in positions and id(positions[(document, start - 1)]) not in consumed:
+                start -= 1
+            while (document, end + 1) in positions and id(positions[(document, end + 1)]) not in consumed:
+                end += 1
+
+            run = [positions[(document, i)] for i in range(start, end + 1)]
+            consumed.update(id(c) for c in run)
+
+            if len(run) == 1:
+                result.append(chunk)
+                continue
+
+            text = run[0].get("chunk_text", "")
+            for neighbour in run[1:]:
+                text = _merge_overlap(text, neighbour.get("chunk_text", ""))
+
+            merged = dict(chunk)
+            merged["chunk_text"] = text
+            merged["merged_chunk_ids"] = [c.get("chunk_id") for c in run]
+            result.append(merged)
+
+        return result
+
+
+def _position(chunk: Dict[str, Any]) -> Optional[Tuple[Any, int]]:
+    """Return (document, chunk_index) for chunks that know their position."""
+    metadata = chunk.get("metadata") or {}
+    index = metadata.get("chunk_index")
+    if index is None:
+        return None
+    return metadata.get("document_id", chunk.get("document_title")), index
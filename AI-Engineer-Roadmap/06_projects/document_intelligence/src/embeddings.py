@@ -0,0 +1,269 @@
+"""
+Embedding Providers - Pluggable local and remote embedding backends
+
+This module provides LangChain-compatible embedding providers that run on
+the local CPU: a sentence-transformers or ONNX model when one is installed,
+and a dependency-free hashing vectorizer otherwise. Documents are embedded
+in batches spread over a thread pool. ``create_embeddings`` picks the
+provider named in the settings.
+"""
+
+from typing import List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Base class for local providers.
+
+    Subclasses implement ``_embed_batch``. Document lists are split into
+    batches of ``batch_size`` texts and the batches run on a shared thread
+    pool, which overlaps well with backends that release the GIL.
+
+    Args:
+        batch_size: Texts per inference call
+        max_workers: Threads used for batches, defaults to the CPU count capped at 4
+    """
+
+    def __init__(self, batch_size: int = 64, max_workers: Optional[int] = None):
+        self.batch_size = batch_size
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=type(self).__name__
+                )
+            return self._executor
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents in batches, preserving input order."""
+        if not texts:
+            return []
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self.max_workers == 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            results = list(self._get_executor().map(self._embed_batch, batches))
+
+        return np.vstack(results).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        return self._embed_batch([text])[0].tolist()
+
+    def close(self):
+        """Shut down the thread pool."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+class HashingEmbeddings(BatchedEmbeddings):
+    """
+    Feature-hashing embeddings with no model or network dependency.
+
+    Word unigrams and bigrams are hashed into ``dimensions`` signed buckets
+    with log-scaled term frequencies and the result is L2-normalized. Quality
+    is that of a lexical model, which is enough for tests, offline use and
+    as a fallback.
+
+    Args:
+        dimensions: Output vector size
+    """
+
+    def __init__(self, dimensions: int = 384, batch_size: int = 256, max_workers: Optional[int] = None):
+        super().__init__(batch_size=batch_size, max_workers=max_workers)
+        self.dimensions = dimensions
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN_PATTERN.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                # crc32 is stable across processes, unlike hash()
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dimensions] += sign * (1.0 + np.log(count))
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbeddings(BatchedEmbeddings):
+    """
+    Local sentence-transformers model.
+
+    Args:
+        model_name: Model name or path, e.g. ``all-MiniLM-L6-v2``
+        device: Torch device
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        device: str = "cpu",
+        batch_size: int = 64,
+        max_workers: Optional[int] = None
+    ):
+        super().__init__(batch_size=batch_size, max_workers=max_workers)
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+
+
+class OnnxEmbeddings(BatchedEmbeddings):
+    """
+    Transformer encoder exported to ONNX, run with onnxruntime.
+
+    Token embeddings are mean-pooled over the attention mask and normalized.
+
+    Args:
+        model_path: Path to the ``.onnx`` model
+        tokenizer_path: Path to a Hugging Face ``tokenizer.json``
+        max_length: Maximum tokens per text
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: str,
+        max_length: int = 256,
+        batch_size: int = 32,
+        max_workers: Optional[int] = None
+    ):
+        super().__init__(batch_size=batch_size, max_workers=max_workers)
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        inputs = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.zeros_like(ids)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+
+def create_embeddings(settings: Any) -> Embeddings:
+    """
+    Create the embedding provider named by ``settings.embedding_provider``.
+
+    Providers are ``openai`` (the default), ``sentence_transformers``,
+    ``onnx``, ``hashing`` and ``local``, which uses the best local backend
+    that is installed.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        A LangChain embeddings object
+    """
+    provider = getattr(settings, "embedding_provider", "openai")
+    batch_size = getattr(settings, "embedding_batch_size", 64)
+    max_workers = getattr(settings, "embedding_workers", None)
+
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(
+            model=settings.embedding_model,
+            api_key=settings.openai_api_key
+        )
+
+    if provider == "hashing":
+        return HashingEmbeddings(
+            dimensions=getattr(settings, "embedding_dimensions", 384),
+            max_workers=max_workers
+        )
+
+    if provider == "sentence_transformers":
+        return SentenceTransformerEmbeddings(
+            model_name=getattr(settings, "local_embedding_model", "all-MiniLM-L6-v2"),
+            batch_size=batch_size,
+            max_workers=max_workers
+        )
+
+    if provider == "onnx":
+        return OnnxEmbeddings(
+            model_path=settings.onnx_model_path,
+            tokenizer_path=settings.onnx_tokenizer_path,
+            batch_size=batch_size,
+            max_workers=max_workers
+        )
+
+    if provider == "local":
+        if getattr(settings, "onnx_model_path", None):
+            try:
+                return OnnxEmbeddings(
+                    model_path=settings.onnx_model_path,
+                    tokenizer_path=settings.onnx_tokenizer_path,
+                    batch_size=batch_size,
+                    max_workers=max_workers
+                )
+            except ImportError:
+                logger.info("onnxruntime not installed, trying sentence-transformers")
+        try:
+            return SentenceTransformerEmbeddings(
+                model_name=getattr(settings, "local_embedding_model", "all-MiniLM-L6-v2"),
+                batch_size=batch_size,
+                max_workers=max_workers
+            )
+        except ImportError:
+            logger.warning("No local embedding model installed, using hashing embeddings")
+            return HashingEmbeddings(
+                dimensions=getattr(settings, "embedding_dimensions", 384),
+                max_workers=max_workers
+            )
+
+    raise ValueError(f"Unknown embedding provider: {provider}")
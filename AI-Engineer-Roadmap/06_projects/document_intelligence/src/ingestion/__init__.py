@@ -0,0 +1 @@
+"""Parallel document ingestion components."""
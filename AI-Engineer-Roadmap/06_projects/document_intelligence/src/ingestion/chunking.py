@@ -0,0 +1,201 @@
+"""
+Streaming Chunker - Incremental sentence and token chunking
+
+This module chunks text while it is being read. Text is fed in pieces (for
+example one PDF page at a time) and finished chunks are emitted as soon as
+they are full, so only the current chunk and its overlap are buffered.
+Chunks remember the pages they were cut from.
+"""
+
+from typing import List, Tuple, Iterator, Optional, Callable
+from dataclasses import dataclass
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+CHUNKING_STRATEGIES = ("sentence", "token")
+
+_SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?](?=\s)|\n\s*\n|$)", re.DOTALL)
+_WORD_TOKEN_PATTERN = re.compile(r"\S+\s*")
+
+
+@dataclass
+class TextChunk:
+    """A chunk of text and the pages it spans."""
+    text: str
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
+
+def _load_token_codec(model: Optional[str]) -> Tuple[Callable[[str], list], Callable[[list], str]]:
+    """Return (encode, decode) for the model's tokenizer, or a word-based stand-in."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken not installed, chunking on words instead of tokens")
+        return _WORD_TOKEN_PATTERN.findall, "".join
+
+    try:
+        encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return (lambda text: encoding.encode(text, disallowed_special=())), encoding.decode
+
+
+class StreamingChunker:
+    """
+    Incremental chunker with overlap.
+
+    The ``sentence`` strategy packs whole sentences into chunks of at most
+    ``chunk_size`` characters and carries trailing sentences of up to
+    ``chunk_overlap`` characters into the next chunk. Sentences longer than
+    a chunk are cut. The ``token`` strategy cuts fixed windows of
+    ``chunk_size`` tokens that overlap by ``chunk_overlap`` tokens.
+
+    Args:
+        chunk_size: Maximum chunk size in characters or tokens
+        chunk_overlap: Size shared by consecutive chunks
+        strategy: ``"sentence"`` or ``"token"``
+        model: Model whose tokenizer measures tokens
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        strategy: str = "sentence",
+        model: Optional[str] = None
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        if strategy not in CHUNKING_STRATEGIES:
+            raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.strategy = strategy
+        if strategy == "token":
+            self._encode, self._decode = _load_token_codec(model)
+
+        # Buffered units (sentences or tokens) with the page each came from
+        self._units: List = []
+        self._pages: List[Optional[int]] = []
+        self._size = 0
+        # Units at the front of the buffer already emitted as overlap
+        self._carried = 0
+
+    def feed(self, text: str, page: Optional[int] = None) -> Iterator[TextChunk]:
+        """
+        Add text and yield every chunk that is now complete.
+
+        Args:
+            text: Next piece of the document
+            page: Page the text came from
+        """
+        if self.strategy == "token":
+            yield from self._feed_tokens(text, page)
+        else:
+            yield from self._feed_sentences(text, page)
+
+    def flush(self) -> Iterator[TextChunk]:
+        """Yield the final partial chunk, if it holds any new text."""
+        if len(self._units) > self._carried:
+            yield self._emit(len(self._units))
+        self._units, self._pages, self._size, self._carried = [], [], 0, 0
+
+    def chunk(self, pages: Iterator[Tuple[Optional[int], str]]) -> Iterator[TextChunk]:
+        """
+        Chunk a stream of (page, text) pieces from start to finish.
+
+        Args:
+            pages: Iterator of (page number, text)
+        """
+        for page, text in pages:
+            yield from self.feed(text, page)
+        yield from self.flush()
+
+    def _feed_sentences(self, text: str, page: Optional[int]) -> Iterator[TextChunk]:
+        for match in _SENTENCE_PATTERN.finditer(text):
+            sentence = " ".join(match.group().split())
+            if not sentence:
+                continue
+            # Cut sentences that could never fit in a chunk
+            for start in range(0, len(sentence), self.chunk_size):
+                piece = sentence[start:start + self.chunk_size]
+                if self._units and self._size + 1 + len(piece) > self.chunk_size:
+                    yield self._emit(len(self._units))
+                    self._carry_sentences(min(self.chunk_overlap, self.chunk_size - len(piece) - 1))
+                self._size += len(piece) + (1 if self._units else 0)
+                self._units.append(piece)
+                self._pages.append(page)
+
+    def _carry_sentences(self, limit: int):
+        """Keep the trailing sentences that fit in ``limit`` characters."""
+        keep = 0
+        size = 0
+        for sentence in reversed(self._units):
+            if size + len(sentence) + 1 > limit:
+                break
+            size += len(sentence) + 1
+            keep += 1
+
+        if keep:
+            self._units = self._units[-keep:]
+            self._pages = self._pages[-keep:]
+        else:
+            self._units, self._pages = [], []
+        self._size = max(size - 1, 0)
+        self._carried = keep
+
+    def _feed_tokens(self, text: str, page: Optional[int]) -> Iterator[TextChunk]:
+        # The newline keeps words on either side of a page break apart
+        tokens = self._encode(text + "\n")
+        self._units.extend(tokens)
+        self._pages.extend([page] * len(tokens))
+
+        step = self.chunk_size - self.chunk_overlap
+        while len(self._units) >= self.chunk_size:
+            yield self._emit(self.chunk_size)
+            del self._units[:step]
+            del self._pages[:step]
+            self._carried = self.chunk_overlap
+
+    def _emit(self, count: int) -> TextChunk:
+        units = self._units[:count]
+        if self.strategy == "token":
+            text = self._decode(units).strip()
+        else:
+            text = " ".join(units)
+        pages = [p for p in self._pages[:count] if p is not None]
+        return TextChunk(
+            text=text,
+            page_start=pages[0] if pages else None,
+            page_end=pages[-1] if pages else None
+        )
+
+
+class StreamingFingerprint:
+    """
+    Incremental version of ``fingerprint_text`` for text read in pieces.
+
+    Feeding pieces that concatenate (with any whitespace between them) to a
+    text gives the same digest as fingerprinting that text in one go.
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha1()
+        self._empty = True
+
+    def update(self, text: str):
+        words = text.split()
+        if not words:
+            return
+        if not self._empty:
+            self._hash.update(b" ")
+        self._hash.update(" ".join(words).encode("utf-8"))
+        self._empty = False
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
@@ -0,0 +1,174 @@
+"""
+Text Extractors - In-memory text extraction for uploaded documents
+
+This module extracts text from the raw bytes of PDF, DOCX, TXT and Markdown
+uploads so documents can be processed without writing temporary files.
+Text is read page by page, with the pages of large PDFs extracted in
+parallel worker processes.
+"""
+
+from typing import List, Dict, Any, Tuple, Iterator, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import io
+import re
+
+
+SUPPORTED_TYPES = ("pdf", "docx", "txt", "md")
+
+# Below this many pages a PDF is not worth a process pool
+PARALLEL_PAGE_THRESHOLD = 64
+
+PageStream = Iterator[Tuple[Optional[int], str]]
+
+_BLOCK_PATTERN = re.compile(r"\S.*?(?:\n\s*\n|\Z)", re.DOTALL)
+
+
+class UnsupportedDocumentError(ValueError):
+    """Raised when a file type has no in-memory extractor."""
+
+
+def get_file_type(file_name: str) -> str:
+    """Return the lower-case extension of a file name without the dot."""
+    return Path(file_name).suffix.lower().lstrip(".")
+
+
+_worker_reader = None
+
+
+def _init_pdf_worker(data: bytes):
+    """Open the PDF once per worker process."""
+    global _worker_reader
+    from pypdf import PdfReader
+
+    _worker_reader = PdfReader(io.BytesIO(data))
+
+
+def _extract_page_range(start: int, end: int) -> List[str]:
+    return [_worker_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def iter_pdf_pages(
+    data: bytes,
+    workers: int = 1,
+    pages_per_task: int = 16,
+    reader: Any = None
+) -> Iterator[str]:
+    """
+    Yield the text of each page of a PDF in order.
+
+    With more than one worker, page ranges are extracted in a process pool.
+    Only a few ranges are in flight at a time so memory stays bounded
+    regardless of the page count.
+
+    Args:
+        data: Raw PDF bytes
+        workers: Worker processes for large PDFs
+        pages_per_task: Pages extracted per task
+        reader: Already opened ``PdfReader`` for the same bytes
+
+    Yields:
+        Page texts
+    """
+    if reader is None:
+        from pypdf import PdfReader
+
+        reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+
+    if workers <= 1 or page_count < PARALLEL_PAGE_THRESHOLD:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    starts = iter(range(0, page_count, pages_per_task))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_pdf_worker,
+        initargs=(data,)
+    ) as executor:
+        pending = deque()
+
+        def submit_next() -> bool:
+            start = next(starts, None)
+            if start is None:
+                return False
+            pending.append(executor.submit(_extract_page_range, start, min(start + pages_per_task, page_count)))
+            return True
+
+        for _ in range(2 * workers):
+            if not submit_next():
+                break
+
+        while pending:
+            pages = pending.popleft().result()
+            submit_next()
+            yield from pages
+
+
+def decode_text(data: bytes) -> str:
+    """
+    Decode a plain text or Markdown file.
+
+    Args:
+        data: Raw file bytes
+
+    Returns:
+        Decoded text, falling back to latin-1 for non UTF-8 input
+    """
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def _base_metadata(file_name: str, data: bytes) -> Dict[str, Any]:
+    return {
+        "title": Path(file_name).stem,
+        "file_name": file_name,
+        "type": get_file_type(file_name),
+        "size_bytes": len(data)
+    }
+
+
+def iter_pages(file_name: str, data: bytes, page_workers: int = 1) -> Tuple[Dict[str, Any], PageStream]:
+    """
+    Open an uploaded file for page-by-page reading.
+
+    PDFs yield one item per page with its 1-based page number. Other types
+    have no pages and yield paragraph blocks with a page number of None.
+
+    Args:
+        file_name: Original file name, used to detect the type
+        data: Raw file bytes
+        page_workers: Worker processes for the pages of large PDFs
+
+    Returns:
+        Tuple of (metadata, iterator of (page number, text))
+
+    Raises:
+        UnsupportedDocumentError: If the file type is not supported
+    """
+    file_type = get_file_type(file_name)
+    metadata = _base_metadata(file_name, data)
+
+    if file_type == "pdf":
+        from pypdf import PdfReader
+
+        reader = PdfReader(io.BytesIO(data))
+        metadata["pages"] = len(reader.pages)
+        pages = iter_pdf_pages(data, workers=page_workers, reader=reader)
+        return metadata, ((number, text) for number, text in enumerate(pages, 1))
+
+    if file_type == "docx":
+        import docx
+
+        document = docx.Document(io.BytesIO(data))
+        return metadata, ((None, paragraph.text) for paragraph in document.paragraphs)
+
+    if file_type in ("txt", "md"):
+        text = decode_text(data)
+        return metadata, ((None, match.group()) for match in _BLOCK_PATTERN.finditer(text))
+
+    raise UnsupportedDocumentError(f"Unsupported file type: {file_type or file_name}")
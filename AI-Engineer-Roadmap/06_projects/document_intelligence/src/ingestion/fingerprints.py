@@ -0,0 +1,264 @@
+"""
+Document Fingerprints - Incremental re-indexing support
+
+This module tracks content fingerprints for indexed documents and chunks so
+the knowledge base can be updated in place. Only new or changed chunks are
+sent to the vector store; chunks of changed or removed documents are
+tombstoned and filtered out of search results until the vector store
+has deleted them.
+"""
+
+from typing import List, Dict, Any, Optional, Set, Callable
+from dataclasses import dataclass, field
+import copy
+import hashlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_text(text: str) -> str:
+    """Return a whitespace-insensitive content hash for a piece of text."""
+    normalized = " ".join(text.split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def document_fingerprint(document: Any) -> str:
+    """Return the content hash of a document, computed during ingestion when available."""
+    metadata = getattr(document, "metadata", {}) or {}
+    return metadata.get("content_fingerprint") or fingerprint_text(document.content)
+
+
+def document_key(document: Any) -> str:
+    """Return the stable identity of a document across re-uploads."""
+    metadata = getattr(document, "metadata", {}) or {}
+    return str(
+        metadata.get("file_name")
+        or metadata.get("source")
+        or metadata.get("title")
+        or document_fingerprint(document)
+    )
+
+
+def _chunk_text(chunk: Any) -> str:
+    return getattr(chunk, "content", None) or getattr(chunk, "text", "")
+
+
+def _chunk_id(chunk: Any, fingerprint: str) -> str:
+    return str(getattr(chunk, "chunk_id", None) or fingerprint)
+
+
+@dataclass
+class DocumentRecord:
+    """Fingerprints of an indexed document and its live chunks."""
+    fingerprint: str
+    chunks: Dict[str, str] = field(default_factory=dict)  # chunk fingerprint -> chunk_id
+
+
+@dataclass
+class IndexPlan:
+    """Changes needed to bring the index in line with a document set."""
+    documents_to_add: List[Any] = field(default_factory=list)
+    chunk_ids_to_add: List[str] = field(default_factory=list)
+    chunk_ids_to_remove: List[str] = field(default_factory=list)
+    removed_documents: List[str] = field(default_factory=list)
+    # Kept chunks of changed documents, under their indexed ids, with new metadata
+    documents_to_refresh: List[Any] = field(default_factory=list)
+    unchanged_documents: List[str] = field(default_factory=list)
+    records: Dict[str, Optional[DocumentRecord]] = field(default_factory=dict)
+
+    @property
+    def chunks_to_add(self) -> int:
+        """Number of chunks that need embedding."""
+        return sum(len(doc.chunks) for doc in self.documents_to_add)
+
+    @property
+    def has_changes(self) -> bool:
+        """Whether applying the plan changes the index."""
+        return bool(self.documents_to_add or self.chunk_ids_to_remove)
+
+
+class FingerprintRegistry:
+    """
+    Registry of what the vector store currently holds.
+
+    ``plan`` diffs a document set against the registry, and ``commit``
+    records the result once the vector store has been updated.
+    """
+
+    def __init__(self):
+        self._documents: Dict[str, DocumentRecord] = {}
+        self._tombstones: Set[str] = set()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def plan(self, documents: List[Any], remove_missing: bool = False) -> IndexPlan:
+        """
+        Work out which chunks to insert and which to tombstone.
+
+        Args:
+            documents: Processed documents with ``content``, ``metadata`` and ``chunks``
+            remove_missing: Also remove indexed documents that are not in ``documents``
+
+        Returns:
+            The index plan
+        """
+        plan = IndexPlan()
+        seen = set()
+
+        with self._lock:
+            for document in documents:
+                key = document_key(document)
+                seen.add(key)
+                record = self._documents.get(key)
+                doc_fingerprint = document_fingerprint(document)
+
+                if record is not None and record.fingerprint == doc_fingerprint:
+                    plan.unchanged_documents.append(key)
+                    continue
+
+                existing = record.chunks if record else {}
+                new_record = DocumentRecord(fingerprint=doc_fingerprint)
+                new_chunks = []
+                kept_chunks = []
+
+                for chunk in document.chunks:
+                    chunk_fingerprint = fingerprint_text(_chunk_text(chunk))
+                    if chunk_fingerprint in new_record.chunks:
+                        # Repeated text within a document is indexed once
+                        continue
+                    if chunk_fingerprint in existing:
+                        new_record.chunks[chunk_fingerprint] = existing[chunk_fingerprint]
+                        # The text is unchanged but document_id, ingested_at and
+                        # positions are those of the new upload
+                        kept = copy.copy(chunk)
+                        kept.chunk_id = existing[chunk_fingerprint]
+                        kept_chunks.append(kept)
+                    else:
+                        chunk_id = _chunk_id(chunk, chunk_fingerprint)
+                        new_record.chunks[chunk_fingerprint] = chunk_id
+                        plan.chunk_ids_to_add.append(chunk_id)
+                        new_chunks.append(chunk)
+
+                kept = set(new_record.chunks.values())
+                plan.chunk_ids_to_remove.extend(
+                    chunk_id for chunk_id in existing.values() if chunk_id not in kept
+                )
+                plan.records[key] = new_record
+
+                if new_chunks:
+                    partial = copy.copy(document)
+                    partial.chunks = new_chunks
+                    plan.documents_to_add.append(partial)
+                if kept_chunks:
+                    refreshed = copy.copy(document)
+                    refreshed.chunks = kept_chunks
+                    plan.documents_to_refresh.append(refreshed)
+
+            if remove_missing:
+                for key, record in self._documents.items():
+                    if key not in seen:
+                        plan.removed_documents.append(key)
+                        plan.chunk_ids_to_remove.extend(record.chunks.values())
+                        plan.records[key] = None
+
+        return plan
+
+    def commit(self, plan: IndexPlan):
+        """
+        Record an applied plan.
+
+        Args:
+            plan: Plan whose additions have been written to the vector store
+        """
+        with self._lock:
+            for key, record in plan.records.items():
+                if record is None:
+                    self._documents.pop(key, None)
+                else:
+                    self._documents[key] = record
+            self._tombstones.update(plan.chunk_ids_to_remove)
+            # A re-added chunk overwrites its old entry and is live again
+            self._tombstones.difference_update(plan.chunk_ids_to_add)
+            if plan.has_changes:
+                self._version += 1
+
+        logger.info(
+            f"Index updated: {len(plan.documents_to_add)} documents, {plan.chunks_to_add} chunks added, "
+            f"{len(plan.chunk_ids_to_remove)} chunks tombstoned"
+        )
+
+    def is_tombstoned(self, chunk_id: str) -> bool:
+        """Whether a chunk has been removed from the live index."""
+        return chunk_id in self._tombstones
+
+    def filter_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop search results that point at tombstoned chunks."""
+        if not self._tombstones:
+            return results
+        return [r for r in results if r.get("chunk_id") not in self._tombstones]
+
+    def clear_tombstones(self, chunk_ids: List[str]):
+        """Forget tombstones for chunks the vector store has physically deleted."""
+        with self._lock:
+            self._tombstones.difference_update(chunk_ids)
+
+    @property
+    def version(self) -> int:
+        """Counter that increases every time the indexed content changes."""
+        return self._version
+
+    @property
+    def tombstone_count(self) -> int:
+        """Number of removed chunks still present in the vector store."""
+        return len(self._tombstones)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registry statistics."""
+        with self._lock:
+            return {
+                "indexed_documents": len(self._documents),
+                "live_chunks": sum(len(r.chunks) for r in self._documents.values()),
+                "tombstoned_chunks": len(self._tombstones),
+                "version": self._version
+            }
+
+
+def apply_index_plan(
+    plan: IndexPlan,
+    registry: FingerprintRegistry,
+    vector_store: Any,
+    on_indexed: Optional[Callable[[List[Any], List[str], List[Any]], None]] = None
+):
+    """
+    Write a plan to the vector store and record it in the registry.
+
+    Dead chunks are deleted from stores that support ``remove`` and their
+    tombstones are then cleared, so the tombstone set only holds chunks a
+    store cannot delete.
+
+    Args:
+        plan: Plan from ``registry.plan``
+        registry: Registry the plan was made against
+        vector_store: Store with ``add_document`` and optionally ``remove``
+        on_indexed: Called with the added documents, removed chunk ids and
+            documents to refresh, to keep other indexes in step
+    """
+    remove = getattr(vector_store, "remove", None)
+    deleted = []
+    if plan.chunk_ids_to_remove and remove is not None:
+        # Removed first, so a chunk id that is re-added keeps its new vector
+        remove(plan.chunk_ids_to_remove)
+        re_added = set(plan.chunk_ids_to_add)
+        deleted = [chunk_id for chunk_id in plan.chunk_ids_to_remove if chunk_id not in re_added]
+
+    for document in plan.documents_to_add:
+        vector_store.add_document(document)
+
+    if on_indexed is not None:
+        on_indexed(plan.documents_to_add, plan.chunk_ids_to_remove, plan.documents_to_refresh)
+
+    registry.commit(plan)
+    if deleted:
+        registry.clear_tombstones(deleted)
@@ -0,0 +1,185 @@
+"""
+Ingestion Pipeline - Parallel parsing and chunking of uploaded documents
+
+This module spreads document parsing and chunking over a process pool.
+Files are processed straight from their uploaded bytes, results come back
+in upload order and progress is reported as each file finishes. Each file
+is read and chunked page by page, so the full document text is never held
+in memory unless asked for.
+"""
+
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+import hashlib
+import logging
+import os
+
+from src.ingestion.extractors import iter_pages
+from src.ingestion.chunking import StreamingChunker, StreamingFingerprint
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+@dataclass
+class IngestedChunk:
+    """A chunk of document text ready to be embedded."""
+    chunk_id: str
+    content: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class IngestedDocument:
+    """A parsed and chunked document. ``content`` is empty unless the text was kept."""
+    content: str
+    metadata: Dict[str, Any]
+    chunks: List[IngestedChunk] = field(default_factory=list)
+
+
+@dataclass
+class IngestionResult:
+    """Outcome of processing a batch of uploads. ``errors`` is keyed by upload index."""
+    documents: List[IngestedDocument] = field(default_factory=list)
+    errors: Dict[int, str] = field(default_factory=dict)
+
+
+def process_upload(
+    file_name: str,
+    data: bytes,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    strategy: str = "sentence",
+    page_workers: int = 1,
+    keep_content: bool = False
+) -> IngestedDocument:
+    """
+    Parse and chunk one uploaded file from memory, page by page.
+
+    Args:
+        file_name: Original file name
+        data: Raw file bytes
+        chunk_size: Maximum chunk size, in characters or tokens depending on the strategy
+        chunk_overlap: Size shared by consecutive chunks
+        strategy: Chunking strategy, ``"sentence"`` or ``"token"``
+        page_workers: Worker processes for the pages of large PDFs
+        keep_content: Keep the full document text in ``content``
+
+    Returns:
+        The ingested document. Its metadata carries a ``content_fingerprint``
+        of the text and a short ``preview``.
+    """
+    metadata, pages = iter_pages(file_name, data, page_workers)
+    # The name is part of the identity, so the same bytes uploaded under
+    # two names yield two documents with distinct chunk ids
+    document_id = hashlib.sha1(file_name.encode("utf-8") + b"\0" + data).hexdigest()[:16]
+    metadata["document_id"] = document_id
+    metadata["ingested_at"] = datetime.now().isoformat()
+
+    chunker = StreamingChunker(chunk_size, chunk_overlap, strategy)
+    fingerprint = StreamingFingerprint()
+    kept_text: List[str] = []
+
+    def read_pages():
+        for page, text in pages:
+            fingerprint.update(text)
+            if keep_content:
+                kept_text.append(text)
+            yield page, text
+
+    chunks = []
+    for i, piece in enumerate(chunker.chunk(read_pages())):
+        chunk_metadata = {**metadata, "chunk_index": i}
+        if piece.page_start is not None:
+            chunk_metadata["page_start"] = piece.page_start
+            chunk_metadata["page_end"] = piece.page_end
+        chunks.append(IngestedChunk(chunk_id=f"{document_id}-{i}", content=piece.text, metadata=chunk_metadata))
+
+    metadata["content_fingerprint"] = fingerprint.hexdigest()
+    metadata["preview"] = chunks[0].content[:200] if chunks else ""
+
+    return IngestedDocument(
+        content="\n\n".join(kept_text) if keep_content else "",
+        metadata=metadata,
+        chunks=chunks
+    )
+
+
+def ingest_uploads(
+    uploads: List[Tuple[str, bytes]],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    max_workers: Optional[int] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+    strategy: str = "sentence",
+    keep_content: bool = False
+) -> IngestionResult:
+    """
+    Process uploaded files in parallel across worker processes.
+
+    Several files are spread over the pool one file per worker. A single
+    file uses the pool for its pages instead, which pays off for large PDFs.
+
+    Args:
+        uploads: List of (file_name, data) pairs
+        chunk_size: Maximum chunk size, in characters or tokens depending on the strategy
+        chunk_overlap: Size shared by consecutive chunks
+        max_workers: Worker process count, defaults to the number of CPUs
+        progress_callback: Called with (completed, total, file_name) after each file
+        strategy: Chunking strategy, ``"sentence"`` or ``"token"``
+        keep_content: Keep the full text of each document in ``content``
+
+    Returns:
+        Documents in upload order and a mapping of the indices of failed
+        uploads to their errors
+    """
+    total = len(uploads)
+    results: List[Optional[IngestedDocument]] = [None] * total
+    errors: Dict[int, str] = {}
+
+    if total == 0:
+        return IngestionResult()
+
+    available = max_workers or os.cpu_count() or 1
+    workers = min(available, total)
+    options = {"strategy": strategy, "keep_content": keep_content}
+
+    if workers == 1:
+        # Not worth the cost of starting a pool per file; a lone file may
+        # still extract its pages in parallel
+        page_workers = available if total == 1 else 1
+        for i, (file_name, data) in enumerate(uploads):
+            try:
+                results[i] = process_upload(
+                    file_name, data, chunk_size, chunk_overlap, page_workers=page_workers, **options
+                )
+            except Exception as e:
+                logger.error(f"Error processing {file_name}: {e}")
+                errors[i] = str(e)
+            if progress_callback:
+                progress_callback(i + 1, total, file_name)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(process_upload, file_name, data, chunk_size, chunk_overlap, **options): i
+                for i, (file_name, data) in enumerate(uploads)
+            }
+
+            for completed, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                file_name = uploads[i][0]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    logger.error(f"Error processing {file_name}: {e}")
+                    errors[i] = str(e)
+                if progress_callback:
+                    progress_callback(completed, total, file_name)
+
+    return IngestionResult(
+        documents=[doc for doc in results if doc is not None],
+        errors=errors
+    )
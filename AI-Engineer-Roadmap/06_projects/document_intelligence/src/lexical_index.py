@@ -0,0 +1,311 @@
+"""
+Lexical Index - In-process BM25 inverted index over chunk text
+
+This module implements the lexical side of hybrid retrieval. It keeps a
+compact inverted index of chunk text, scores queries with BM25 and fuses
+lexical and dense rankings with reciprocal rank fusion.
+"""
+
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable
+from array import array
+from collections import Counter, defaultdict
+import heapq
+import math
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-./:]\w+)*", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-case terms.
+
+    Compound identifiers such as ``ERR-404`` or ``v2.1.3`` are kept whole
+    and also indexed by their parts, so exact codes and their pieces match.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in re.split(r"[-./:_]", token) if part)
+    return tokens
+
+
+class PostingList:
+    """Postings for one term stored as parallel unsigned int arrays."""
+
+    __slots__ = ("doc_ids", "term_freqs")
+
+    def __init__(self):
+        self.doc_ids = array("I")
+        self.term_freqs = array("I")
+
+    def append(self, doc_id: int, term_freq: int):
+        self.doc_ids.append(doc_id)
+        self.term_freqs.append(term_freq)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring.
+
+    Chunks are added incrementally. Removed chunks are tombstoned and their
+    postings are dropped the next time ``compact`` runs, which also happens
+    automatically once tombstones make up a quarter of the index.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, PostingList] = defaultdict(PostingList)
+        self._doc_lengths = array("I")
+        self._chunk_ids: List[str] = []
+        self._payloads: List[Optional[Dict[str, Any]]] = []
+        self._id_lookup: Dict[str, int] = {}
+        self._deleted: Set[int] = set()
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._chunk_ids) - len(self._deleted)
+
+    def add(self, chunk_id: str, text: str, payload: Optional[Dict[str, Any]] = None):
+        """
+        Index one chunk, replacing any earlier chunk with the same id.
+
+        Args:
+            chunk_id: Chunk identifier
+            text: Chunk text
+            payload: Search result fields returned for this chunk
+        """
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+
+        with self._lock:
+            if chunk_id in self._id_lookup:
+                self.remove(chunk_id)
+
+            doc_id = len(self._chunk_ids)
+            self._chunk_ids.append(chunk_id)
+            self._payloads.append(payload)
+            self._doc_lengths.append(length)
+            self._id_lookup[chunk_id] = doc_id
+            self._total_length += length
+
+            for term, freq in terms.items():
+                self._postings[term].append(doc_id, freq)
+
+    def add_document(self, document: Any):
+        """
+        Index every chunk of a processed document.
+
+        Args:
+            document: Document with ``metadata`` and ``chunks``
+        """
+        metadata = getattr(document, "metadata", {}) or {}
+        title = metadata.get("title", "Unknown Document")
+
+        for chunk in document.chunks:
+            text = getattr(chunk, "content", None) or getattr(chunk, "text", "")
+            chunk_id = str(chunk.chunk_id)
+            self.add(chunk_id, text, {
+                "chunk_id": chunk_id,
+                "chunk_text": text,
+                "document_title": title,
+                "metadata": getattr(chunk, "metadata", None) or metadata
+            })
+
+    def remove(self, chunk_id: str) -> bool:
+        """
+        Tombstone a chunk.
+
+        Args:
+            chunk_id: Chunk identifier
+
+        Returns:
+            True if the chunk was indexed
+        """
+        with self._lock:
+            doc_id = self._id_lookup.pop(chunk_id, None)
+            if doc_id is None:
+                return False
+            self._deleted.add(doc_id)
+            self._payloads[doc_id] = None
+            self._total_length -= self._doc_lengths[doc_id]
+
+            if len(self._deleted) * 4 > len(self._chunk_ids):
+                self.compact()
+            return True
+
+    def remove_many(self, chunk_ids: Iterable[str]):
+        """Tombstone several chunks."""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self.remove(chunk_id)
+
+    def compact(self):
+        """Rewrite the postings without tombstoned chunks."""
+        with self._lock:
+            if not self._deleted:
+                return
+
+            remap = {}
+            chunk_ids, payloads, lengths = [], [], array("I")
+            for old_id, chunk_id in enumerate(self._chunk_ids):
+                if old_id in self._deleted:
+                    continue
+                remap[old_id] = len(chunk_ids)
+                chunk_ids.append(chunk_id)
+                payloads.append(self._payloads[old_id])
+                lengths.append(self._doc_lengths[old_id])
+
+            postings: Dict[str, PostingList] = defaultdict(PostingList)
+            for term, plist in self._postings.items():
+                for doc_id, freq in zip(plist.doc_ids, plist.term_freqs):
+                    if doc_id in remap:
+                        postings[term].append(remap[doc_id], freq)
+
+            self._postings = postings
+            self._chunk_ids = chunk_ids
+            self._payloads = payloads
+            self._doc_lengths = lengths
+            self._id_lookup = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+            self._deleted = set()
+
+    def _score(self, query: str, candidate_ids: Optional[Set[str]] = None) -> Dict[int, float]:
+        """Accumulate BM25 scores over the postings of the query terms."""
+        live = len(self)
+        if live == 0:
+            return {}
+
+        avg_length = self._total_length / live or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            plist = self._postings.get(term)
+            if not plist:
+                continue
+            df = len(plist)
+            idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+            for doc_id, freq in zip(plist.doc_ids, plist.term_freqs):
+                if doc_id in self._deleted:
+                    continue
+                if candidate_ids is not None and self._chunk_ids[doc_id] not in candidate_ids:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+        return scores
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        candidate_ids: Optional[Set[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: Query text
+            top_k: Maximum number of results
+            candidate_ids: Only score these chunks
+
+        Returns:
+            Result dictionaries in the vector store format with a ``bm25_score`` field
+        """
+        with self._lock:
+            scores = self._score(query, candidate_ids)
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+            results = []
+            for doc_id, score in best:
+                result = dict(self._payloads[doc_id] or {"chunk_id": self._chunk_ids[doc_id]})
+                result["bm25_score"] = score
+                results.append(result)
+            return results
+
+    def candidates(
+        self,
+        query: str,
+        limit: int,
+        candidate_ids: Optional[Set[str]] = None
+    ) -> Set[str]:
+        """
+        Cheap lexical prefilter for dense search.
+
+        Args:
+            query: Query text
+            limit: Maximum number of candidate chunks
+            candidate_ids: Only consider these chunks
+
+        Returns:
+            Ids of the best lexical matches
+        """
+        with self._lock:
+            scores = self._score(query, candidate_ids)
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return {self._chunk_ids[doc_id] for doc_id, _ in best}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics."""
+        with self._lock:
+            postings = sum(len(p) for p in self._postings.values())
+            return {
+                "indexed_chunks": len(self),
+                "terms": len(self._postings),
+                "postings": postings,
+                "tombstoned_chunks": len(self._deleted),
+                # Two 4-byte arrays per posting list entry
+                "postings_size_mb": postings * 8 / (1024 * 1024)
+            }
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Dict[str, Any]]],
+    k: int = 60,
+    top_k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fuse several ranked result lists with reciprocal rank fusion.
+
+    Args:
+        rankings: Result lists, each ordered best first
+        k: RRF damping constant
+        top_k: Maximum number of fused results
+
+    Returns:
+        Fused results with a ``fusion_score`` field. Fields from earlier
+        rankings take precedence when a chunk appears in several lists.
+    """
+    fused: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, 1):
+            chunk_id = result.get("chunk_id")
+            score, merged = fused.get(chunk_id, (0.0, {}))
+            merged = {**result, **merged}
+            fused[chunk_id] = (score + 1.0 / (k + rank), merged)
+
+    ordered = sorted(fused.values(), key=lambda item: item[0], reverse=True)
+    results = []
+    for score, merged in ordered[:top_k]:
+        merged["fusion_score"] = score
+        merged.setdefault("similarity", 0.0)
+        results.append(merged)
+    return results
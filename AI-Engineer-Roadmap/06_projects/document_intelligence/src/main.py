@@ -9,12 +9,18 @@ import streamlit as st
 import os
 from typing import List, Dict, Any, Optional
 import tempfile
+import itertools
 import logging
 from pathlib import Path
 
 from src.document_processor import DocumentProcessor
+from src.ingestion.pipeline import ingest_uploads
+from src.ingestion.fingerprints import FingerprintRegistry, apply_index_plan
 from src.rag_system import RAGSystem
 from src.vector_store import VectorStore
+from src.quantization import QuantizedVectorIndex
+from src.sharded_store import ShardedVectorStore
+from src.embeddings import create_embeddings
 from src.utils.config import Settings
 
 # Configure logging
@@ -64,14 +70,42 @@ st.markdown("""
 def initialize_services():
     """Initialize document processing and RAG services."""
     try:
-        # Initialize vector store
-        vector_store = VectorStore(settings)
+        # Initialize the embedding provider shared by indexing and queries
+        embeddings = create_embeddings(settings)
+        
+        # Initialize vector store, optionally with quantized in-memory vectors
+        quantization = getattr(settings, "vector_quantization", None)
+        if quantization:
+            vector_store = QuantizedVectorIndex(
+                method=quantization,
+                rerank_factor=getattr(settings, "quantization_rerank_factor", 4),
+                pq_subspaces=getattr(settings, "pq_subspaces", 16),
+                float_store_path=getattr(settings, "float_vector_path", None),
+                embedder=embeddings
+            )
+        elif getattr(settings, "vector_store_shards", None):
+            # Multi-process search over memory-mapped shards
+            vector_store = ShardedVectorStore(
+                num_shards=settings.vector_store_shards,
+                directory=getattr(settings, "vector_shard_directory", None),
+                embedder=embeddings
+            )
+        else:
+            vector_store = VectorStore(settings)
         
         # Initialize document processor
         doc_processor = DocumentProcessor(settings)
         
+        # Track indexed content for incremental re-indexing
+        index_registry = FingerprintRegistry()
+        
         # Initialize RAG system
-        rag_system = RAGSystem(settings, vector_store)
+        rag_system = RAGSystem(
+            settings,
+            vector_store,
+            index_registry=index_registry,
+            embeddings=embeddings
+        )
         
         return doc_processor, rag_system, vector_store
     except Exception as e:
@@ -105,10 +139,30 @@ def upload_documents(doc_processor: DocumentProcessor):
         
         # Process documents
         if st.button("Process Documents", type="primary"):
+            progress_bar = st.progress(0.0)
+            status_text = st.empty()
+            
+            def report_progress(completed: int, total: int, file_name: str):
+                progress_bar.progress(completed / total)
+                status_text.text(f"Processed {completed}/{total}: {file_name}")
+            
             with st.spinner("Processing documents..."):
-                processed_docs = []
+                # Parse and chunk every file in parallel, straight from memory
+                result = ingest_uploads(
+                    [(f.name, f.getvalue()) for f in uploaded_files],
+                    chunk_size=getattr(settings, "chunk_size", 1000),
+                    chunk_overlap=getattr(settings, "chunk_overlap", 200),
+                    max_workers=getattr(settings, "ingestion_workers", None),
+                    progress_callback=report_progress,
+                    strategy=getattr(settings, "chunking_strategy", "sentence")
+                )
+                processed_docs = list(result.documents)
                 
-                for uploaded_file in uploaded_files:
+                # Fall back to the document processor for files the
+                # in-memory extractors could not handle
+                for i, uploaded_file in enumerate(uploaded_files):
+                    if i not in result.errors:
+                        continue
                     try:
                         # Save uploaded file temporarily
                         with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
@@ -138,9 +192,10 @@ def upload_documents(doc_processor: DocumentProcessor):
                             st.write(f"**Type:** {doc.metadata.get('type', 'Unknown')}")
                             st.write(f"**Pages:** {doc.metadata.get('pages', 'N/A')}")
                             st.write(f"**Chunks:** {len(doc.chunks)}")
-                            st.write(f"**Preview:** {doc.content[:200]}...")
+                            preview = doc.metadata.get('preview') or doc.content[:200]
+                            st.write(f"**Preview:** {preview}...")
 
-def build_knowledge_base(vector_store: VectorStore):
+def build_knowledge_base(vector_store: VectorStore, rag_system: RAGSystem):
     """Build knowledge base from processed documents."""
     if 'processed_documents' not in st.session_state:
         st.warning("Please upload and process documents first.")
@@ -148,14 +203,31 @@ def build_knowledge_base(vector_store: VectorStore):
     
     st.subheader("🧠 Build Knowledge Base")
     
+    remove_missing = st.checkbox(
+        "Remove documents that are not in the current upload",
+        help="Indexed documents missing from the processed set are removed from the knowledge base"
+    )
+    
     if st.button("Build Knowledge Base", type="primary"):
         with st.spinner("Building knowledge base..."):
             try:
-                # Add documents to vector store
-                for doc in st.session_state.processed_documents:
-                    vector_store.add_document(doc)
+                # Only embed chunks that are new or changed since the last build
+                index_registry = rag_system.index_registry
+                plan = index_registry.plan(
+                    st.session_state.processed_documents,
+                    remove_missing=remove_missing
+                )
+                
+                # Update the vector store, deleting dead chunks, and keep the
+                # lexical and metadata indexes in step
+                apply_index_plan(plan, index_registry, vector_store, on_indexed=rag_system.index_documents)
                 
                 st.success("Knowledge base built successfully!")
+                st.caption(
+                    f"{plan.chunks_to_add} chunks added, "
+                    f"{len(plan.chunk_ids_to_remove)} chunks removed, "
+                    f"{len(plan.unchanged_documents)} documents unchanged"
+                )
                 st.session_state.knowledge_base_built = True
                 
                 # Show statistics
@@ -195,43 +267,99 @@ def query_documents(rag_system: RAGSystem):
         with col2:
             temperature = st.slider("Temperature", 0.0, 1.0, 0.7)
             max_tokens = st.slider("Max Tokens", 100, 1000, 500)
+        
+        # Restrict the search to a subset of the knowledge base
+        col1, col2 = st.columns(2)
+        with col1:
+            selected_documents = st.multiselect(
+                "Only these documents",
+                rag_system.metadata_index.values("file_name")
+            )
+        with col2:
+            selected_types = st.multiselect(
+                "Only these file types",
+                rag_system.metadata_index.values("type")
+            )
+    
+    filters = {}
+    if selected_documents:
+        filters["file_name"] = {"$in": selected_documents}
+    if selected_types:
+        filters["type"] = {"$in": selected_types}
     
     if st.button("Ask Question", type="primary") and query:
-        with st.spinner("Searching documents and generating answer..."):
-            try:
-                # Get answer from RAG system
-                result = rag_system.query(
+        try:
+            st.subheader("🤖 Answer")
+            answer_placeholder = st.empty()
+            sources_container = st.container()
+            stats_container = st.container()
+            
+            answer = ""
+            result = None
+            
+            # Stream retrieval results and answer tokens from the RAG system
+            with st.spinner("Searching documents..."):
+                events = rag_system.query_stream(
                     question=query,
                     max_results=max_results,
                     similarity_threshold=similarity_threshold,
                     temperature=temperature,
-                    max_tokens=max_tokens
+                    max_tokens=max_tokens,
+                    filters=filters or None
                 )
-                
-                # Display answer
-                st.subheader("🤖 Answer")
-                st.write(result['answer'])
-                
-                # Display sources
-                if result['sources']:
-                    st.subheader("📚 Sources")
-                    for i, source in enumerate(result['sources']):
-                        with st.expander(f"Source {i+1} (Similarity: {source['similarity']:.3f})"):
-                            st.write(f"**Document:** {source['document_title']}")
-                            st.write(f"**Chunk:** {source['chunk_text'][:200]}...")
-                            st.write(f"**Metadata:** {source['metadata']}")
-                
-                # Display query statistics
-                col1, col2, col3 = st.columns(3)
+                first_event = next(events)
+            
+            for event in itertools.chain([first_event], events):
+                if event['type'] == 'sources':
+                    display_sources(sources_container, event['sources'])
+                elif event['type'] == 'token':
+                    answer += event['content']
+                    answer_placeholder.markdown(answer + "▌")
+                elif event['type'] in ('done', 'error'):
+                    result = event
+            
+            answer_placeholder.markdown(result['answer'] if result else answer)
+            
+            if result is None:
+                return
+            
+            # Display query statistics
+            with stats_container:
+                col1, col2, col3, col4 = st.columns(4)
                 with col1:
                     st.metric("Sources Found", len(result['sources']))
                 with col2:
                     st.metric("Processing Time", f"{result['processing_time']:.2f}s")
                 with col3:
+                    ttft = result.get('time_to_first_token')
+                    st.metric("Time to First Token", f"{ttft:.2f}s" if ttft is not None else "N/A")
+                with col4:
                     st.metric("Tokens Used", result.get('tokens_used', 'N/A'))
                 
-            except Exception as e:
-                st.error(f"Error processing query: {str(e)}")
+                if result.get('cache_hit'):
+                    st.caption("⚡ Served from the answer cache")
+                
+                timings = result.get('timings')
+                if timings:
+                    st.caption(" · ".join(
+                        f"{stage.title()} {seconds * 1000:.0f} ms" for stage, seconds in timings.items()
+                    ))
+            
+        except Exception as e:
+            st.error(f"Error processing query: {str(e)}")
+
+def display_sources(container, sources: List[Dict[str, Any]]):
+    """Render retrieved sources into a container."""
+    if not sources:
+        return
+    
+    with container:
+        st.subheader("📚 Sources")
+        for i, source in enumerate(sources):
+            with st.expander(f"Source {i+1} (Similarity: {source['similarity']:.3f})"):
+                st.write(f"**Document:** {source['document_title']}")
+                st.write(f"**Chunk:** {source['chunk_text'][:200]}...")
+                st.write(f"**Metadata:** {source['metadata']}")
 
 def display_analytics(vector_store: VectorStore):
     """Display knowledge base analytics."""
@@ -288,7 +416,7 @@ def main():
     if page == "Upload Documents":
         upload_documents(doc_processor)
     elif page == "Build Knowledge Base":
-        build_knowledge_base(vector_store)
+        build_knowledge_base(vector_store, rag_system)
     elif page == "Query Documents":
         query_documents(rag_system)
     elif page == "Analytics":
@@ -0,0 +1,303 @@
+"""
+Metadata Index - Bitmap pre-filter index for filtered vector search
+
+This module resolves metadata filter expressions to the set of matching
+chunks before any vector is scored. Equality fields are indexed as one
+bitmap per value and range fields as a sorted list, so resolving a filter
+never touches the chunks it excludes.
+
+Filter expressions use the operator syntax common to vector databases::
+
+    {"type": "pdf"}
+    {"document_id": {"$in": ["a1", "b2"]}}
+    {"ingested_at": {"$gte": "2024-01-01", "$lt": "2024-02-01"}}
+    {"$or": [{"type": "pdf"}, {"type": "docx"}]}
+"""
+
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+import heapq
+import json
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EQUALITY_FIELDS = ("document_id", "file_name", "title", "type")
+DEFAULT_RANGE_FIELDS = ("ingested_at", "pages")
+
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+
+class FilterError(ValueError):
+    """Raised for malformed filters or filters on unindexed fields."""
+
+
+class MetadataIndex:
+    """
+    Bitmap index over chunk metadata.
+
+    Each chunk gets a dense integer slot, and a bitmap is a Python int with
+    bit ``i`` set when slot ``i`` matches. Removed slots are cleared from
+    every bitmap and reused lowest first, so bitmaps stay as wide as the
+    live index rather than everything ever indexed.
+    """
+
+    def __init__(
+        self,
+        equality_fields: Iterable[str] = DEFAULT_EQUALITY_FIELDS,
+        range_fields: Iterable[str] = DEFAULT_RANGE_FIELDS
+    ):
+        self.equality_fields = tuple(equality_fields)
+        self.range_fields = tuple(range_fields)
+
+        self._bitmaps: Dict[str, Dict[Any, int]] = {f: defaultdict(int) for f in self.equality_fields}
+        self._ranges: Dict[str, List[Tuple[Any, int]]] = {f: [] for f in self.range_fields}
+        self._slots: Dict[str, int] = {}
+        self._chunk_ids: List[Optional[str]] = []
+        self._slot_values: List[Dict[str, Any]] = []
+        self._free_slots: List[int] = []
+        self._live = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, chunk_id: str, metadata: Dict[str, Any]):
+        """
+        Index the metadata of one chunk, replacing any earlier entry.
+
+        Args:
+            chunk_id: Chunk identifier
+            metadata: Chunk metadata
+        """
+        with self._lock:
+            if chunk_id in self._slots:
+                self.remove(chunk_id)
+
+            if self._free_slots:
+                slot = heapq.heappop(self._free_slots)
+            else:
+                slot = len(self._chunk_ids)
+                self._chunk_ids.append(None)
+                self._slot_values.append({})
+            bit = 1 << slot
+            values = {}
+
+            for field in self.equality_fields:
+                value = metadata.get(field)
+                if value is not None:
+                    self._bitmaps[field][value] |= bit
+                    values[field] = value
+
+            for field in self.range_fields:
+                value = metadata.get(field)
+                if value is not None:
+                    insort(self._ranges[field], (value, slot))
+                    values[field] = value
+
+            self._slots[chunk_id] = slot
+            self._chunk_ids[slot] = chunk_id
+            self._slot_values[slot] = values
+            self._live |= bit
+
+    def add_document(self, document: Any):
+        """
+        Index every chunk of a processed document.
+
+        Args:
+            document: Document with ``metadata`` and ``chunks``
+        """
+        metadata = getattr(document, "metadata", {}) or {}
+        for chunk in document.chunks:
+            self.add(str(chunk.chunk_id), {**metadata, **(getattr(chunk, "metadata", None) or {})})
+
+    def remove(self, chunk_id: str) -> bool:
+        """
+        Remove a chunk from every bitmap.
+
+        Args:
+            chunk_id: Chunk identifier
+
+        Returns:
+            True if the chunk was indexed
+        """
+        with self._lock:
+            slot = self._slots.pop(chunk_id, None)
+            if slot is None:
+                return False
+
+            mask = ~(1 << slot)
+            for field, value in self._slot_values[slot].items():
+                if field in self._bitmaps:
+                    bitmaps = self._bitmaps[field]
+                    bitmaps[value] &= mask
+                    if not bitmaps[value]:
+                        del bitmaps[value]
+                else:
+                    entries = self._ranges[field]
+                    i = bisect_left(entries, (value, slot))
+                    if i < len(entries) and entries[i] == (value, slot):
+                        del entries[i]
+
+            self._live &= mask
+            self._chunk_ids[slot] = None
+            self._slot_values[slot] = {}
+            heapq.heappush(self._free_slots, slot)
+            return True
+
+    def remove_many(self, chunk_ids: Iterable[str]):
+        """Remove several chunks."""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self.remove(chunk_id)
+
+    def values(self, field: str) -> List[Any]:
+        """List the distinct indexed values of an equality field."""
+        with self._lock:
+            if field not in self._bitmaps:
+                raise FilterError(f"Field is not indexed for equality: {field}")
+            return sorted(self._bitmaps[field], key=str)
+
+    def resolve(self, filters: Dict[str, Any]) -> Set[str]:
+        """
+        Resolve a filter expression to the ids of matching chunks.
+
+        Args:
+            filters: Filter expression
+
+        Returns:
+            Set of matching chunk ids
+
+        Raises:
+            FilterError: If the filter is malformed or uses an unindexed field
+        """
+        with self._lock:
+            bitmap = self._evaluate(filters) & self._live
+            return {self._chunk_ids[slot] for slot in _set_bits(bitmap)}
+
+    def count(self, filters: Dict[str, Any]) -> int:
+        """Count the chunks matching a filter expression."""
+        with self._lock:
+            return (self._evaluate(filters) & self._live).bit_count()
+
+    def _evaluate(self, filters: Dict[str, Any]) -> int:
+        """Evaluate a filter expression to a bitmap."""
+        if not isinstance(filters, dict):
+            raise FilterError(f"Filter must be a dict, got {type(filters).__name__}")
+
+        result = self._live
+        for key, condition in filters.items():
+            if key == "$and":
+                for clause in condition:
+                    result &= self._evaluate(clause)
+            elif key == "$or":
+                union = 0
+                for clause in condition:
+                    union |= self._evaluate(clause)
+                result &= union
+            elif key == "$not":
+                result &= ~self._evaluate(condition) & self._live
+            elif key.startswith("$"):
+                raise FilterError(f"Unknown operator: {key}")
+            else:
+                result &= self._evaluate_field(key, condition)
+        return result
+
+    def _evaluate_field(self, field: str, condition: Any) -> int:
+        """Evaluate the condition on a single field to a bitmap."""
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        result = self._live
+        range_bounds = {}
+
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                result &= self._equality_bitmap(field, [operand])
+            elif operator == "$in":
+                result &= self._equality_bitmap(field, operand)
+            elif operator == "$ne":
+                result &= ~self._equality_bitmap(field, [operand]) & self._live
+            elif operator == "$nin":
+                result &= ~self._equality_bitmap(field, operand) & self._live
+            elif operator in _RANGE_OPERATORS:
+                range_bounds[operator] = operand
+            else:
+                raise FilterError(f"Unknown operator for {field}: {operator}")
+
+        if range_bounds:
+            result &= self._range_bitmap(field, range_bounds)
+        return result
+
+    def _equality_bitmap(self, field: str, values: Iterable[Any]) -> int:
+        bitmaps = self._bitmaps.get(field)
+        if bitmaps is None:
+            if field in self._ranges:
+                # Equality on a range field is a closed single-value range
+                result = 0
+                for value in values:
+                    result |= self._range_bitmap(field, {"$gte": value, "$lte": value})
+                return result
+            raise FilterError(f"Field is not indexed: {field}")
+
+        result = 0
+        for value in values:
+            result |= bitmaps.get(value, 0)
+        return result
+
+    def _range_bitmap(self, field: str, bounds: Dict[str, Any]) -> int:
+        entries = self._ranges.get(field)
+        if entries is None:
+            raise FilterError(f"Field is not indexed for ranges: {field}")
+
+        # Slots sort after any real slot number, so these keys bracket a value
+        lo, hi = 0, len(entries)
+        if "$gte" in bounds:
+            lo = max(lo, bisect_left(entries, (bounds["$gte"], -1)))
+        if "$gt" in bounds:
+            lo = max(lo, bisect_right(entries, (bounds["$gt"], float("inf"))))
+        if "$lte" in bounds:
+            hi = min(hi, bisect_right(entries, (bounds["$lte"], float("inf"))))
+        if "$lt" in bounds:
+            hi = min(hi, bisect_left(entries, (bounds["$lt"], -1)))
+
+        return _bitmap_from_slots(slot for _, slot in entries[lo:hi])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics."""
+        with self._lock:
+            return {
+                "indexed_chunks": len(self._slots),
+                "bitmaps": {field: len(bitmaps) for field, bitmaps in self._bitmaps.items()},
+                "range_fields": list(self.range_fields)
+            }
+
+
+def _bitmap_from_slots(slots: Iterable[int]) -> int:
+    """Build a bitmap from slot numbers in one pass."""
+    buffer = bytearray()
+    for slot in slots:
+        byte = slot >> 3
+        if byte >= len(buffer):
+            buffer.extend(bytes(byte - len(buffer) + 1))
+        buffer[byte] |= 1 << (slot & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _set_bits(bitmap: int) -> List[int]:
+    """Return the positions of the set bits of a bitmap."""
+    if not bitmap:
+        return []
+    data = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(data, bitorder="little")).tolist()
+
+
+def filter_key(filters: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Return a canonical, hashable form of a filter expression."""
+    if not filters:
+        return None
+    return json.dumps(filters, sort_keys=True, default=str)
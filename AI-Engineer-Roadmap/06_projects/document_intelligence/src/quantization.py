@@ -0,0 +1,513 @@
+"""
+Vector Quantization - Compressed embedding storage for vector search
+
+This module implements int8 scalar quantization and product quantization
+for stored embeddings. Candidates are scored on the compact codes and the
+best of them are re-ranked with exact float32 similarity, read from a
+memory-mapped file so full-precision vectors do not have to stay in RAM.
+"""
+
+from typing import List, Dict, Any, Optional, Set, Iterable
+from datetime import datetime
+import tempfile
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SCORE_BLOCK = 65536
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 scalar quantizer.
+
+    Each dimension is mapped linearly onto 256 levels between the minimum
+    and maximum seen during training. Values outside that range are clipped.
+    """
+
+    def __init__(self):
+        self.offset: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.offset is not None
+
+    def code_size(self, dimensions: int) -> int:
+        """Bytes per encoded vector."""
+        return dimensions
+
+    def fit(self, vectors: np.ndarray):
+        """Learn the per-dimension range."""
+        low = vectors.min(axis=0)
+        high = vectors.max(axis=0)
+        self.offset = low.astype(np.float32)
+        self.scale = np.maximum((high - low) / 255.0, 1e-8).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Encode float vectors to uint8 codes."""
+        codes = np.rint((vectors - self.offset) / self.scale)
+        return np.clip(codes, 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruct approximate float vectors."""
+        return codes.astype(np.float32) * self.scale + self.offset
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate dot products between a query and encoded vectors."""
+        weights = query * self.scale
+        bias = float(query @ self.offset)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _SCORE_BLOCK):
+            block = codes[start:start + _SCORE_BLOCK]
+            scores[start:start + len(block)] = block.astype(np.float32) @ weights + bias
+        return scores
+
+
+class ProductQuantizer:
+    """
+    Product quantizer with 256 centroids per subspace.
+
+    Vectors are split into ``subspaces`` equal slices and each slice is
+    replaced by the index of its nearest k-means centroid, so a vector is
+    stored in ``subspaces`` bytes. Queries are scored with per-subspace
+    lookup tables (asymmetric distance computation).
+    """
+
+    def __init__(self, subspaces: int = 16, centroids: int = 256, iterations: int = 20, seed: int = 0):
+        if centroids > 256:
+            raise ValueError("At most 256 centroids fit in a uint8 code")
+        self.subspaces = subspaces
+        self.centroids = centroids
+        self.iterations = iterations
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None  # (subspaces, centroids, sub_dim)
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    def code_size(self, dimensions: int) -> int:
+        """Bytes per encoded vector."""
+        return self.subspaces
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        n, dimensions = vectors.shape
+        if dimensions % self.subspaces:
+            raise ValueError(f"{dimensions} dimensions cannot be split into {self.subspaces} subspaces")
+        return vectors.reshape(n, self.subspaces, dimensions // self.subspaces)
+
+    def fit(self, vectors: np.ndarray):
+        """Train one k-means codebook per subspace."""
+        rng = np.random.default_rng(self.seed)
+        parts = self._split(vectors.astype(np.float32))
+        k = min(self.centroids, len(vectors))
+        codebooks = []
+
+        for j in range(self.subspaces):
+            data = parts[:, j, :]
+            centers = data[rng.choice(len(data), size=k, replace=False)].copy()
+            for _ in range(self.iterations):
+                assignment = self._nearest(data, centers)
+                for c in range(k):
+                    members = data[assignment == c]
+                    if len(members):
+                        centers[c] = members.mean(axis=0)
+                    else:
+                        # Re-seed empty clusters on a random point
+                        centers[c] = data[rng.integers(len(data))]
+            if k < self.centroids:
+                centers = np.vstack([centers, np.repeat(centers[:1], self.centroids - k, axis=0)])
+            codebooks.append(centers)
+
+        self.codebooks = np.stack(codebooks).astype(np.float32)
+
+    @staticmethod
+    def _nearest(data: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        distances = (
+            (data ** 2).sum(axis=1, keepdims=True)
+            - 2 * data @ centers.T
+            + (centers ** 2).sum(axis=1)
+        )
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Encode float vectors to (n, subspaces) uint8 codes."""
+        parts = self._split(vectors.astype(np.float32))
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for j in range(self.subspaces):
+            codes[:, j] = self._nearest(parts[:, j, :], self.codebooks[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruct approximate float vectors."""
+        parts = [self.codebooks[j][codes[:, j]] for j in range(self.subspaces)]
+        return np.concatenate(parts, axis=1)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate dot products using per-subspace lookup tables."""
+        sub_query = query.reshape(self.subspaces, -1)
+        tables = np.einsum("jkd,jd->jk", self.codebooks, sub_query)
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.subspaces):
+            scores += tables[j][codes[:, j]]
+        return scores
+
+
+class _FloatStore:
+    """Growable float32 matrix, optionally backed by a memory-mapped file."""
+
+    def __init__(self, dimensions: int, path: Optional[str] = None, in_memory: bool = False):
+        self.dimensions = dimensions
+        self.in_memory = in_memory
+        self._file = None if in_memory or path else tempfile.TemporaryFile()
+        self._path = path
+        self._rows = 0
+        self._data = self._allocate(1024, mode="w+")
+
+    def _allocate(self, capacity: int, mode: str = "r+") -> np.ndarray:
+        shape = (capacity, self.dimensions)
+        if self.in_memory:
+            return np.zeros(shape, dtype=np.float32)
+        # In "r+" mode the existing file is extended, keeping its rows
+        return np.memmap(self._path or self._file, dtype=np.float32, mode=mode, shape=shape)
+
+    def append(self, vectors: np.ndarray):
+        needed = self._rows + len(vectors)
+        if needed > len(self._data):
+            capacity = max(needed, 2 * len(self._data))
+            if self.in_memory:
+                grown = self._allocate(capacity)
+                grown[:self._rows] = self._data[:self._rows]
+                self._data = grown
+            else:
+                # Grow the backing file in place rather than copying it through RAM
+                self._data.flush()
+                self._data = self._allocate(capacity)
+        self._data[self._rows:needed] = vectors
+        self._rows = needed
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def compact(self, keep: np.ndarray, block_size: int = 65536):
+        """Move the rows at the sorted indices ``keep`` to the front, dropping the rest."""
+        # keep[i] >= i, so each block is read before anything overwrites it
+        for start in range(0, len(keep), block_size):
+            block = keep[start:start + block_size]
+            self._data[start:start + len(block)] = self._data[block]
+        self._rows = len(keep)
+
+    def rows(self, indices: np.ndarray) -> np.ndarray:
+        return np.asarray(self._data[indices])
+
+    def all(self) -> np.ndarray:
+        return self._data[:self._rows]
+
+
+class QuantizedVectorIndex:
+    """
+    In-process vector index that keeps quantized codes in memory.
+
+    Search scores every live vector on its codes, keeps the best
+    ``top_k * rerank_factor`` candidates and re-ranks them with exact
+    float32 cosine similarity. Until enough vectors have arrived to train
+    the quantizer, search is exact.
+
+    Args:
+        method: ``"int8"`` for scalar quantization or ``"pq"`` for product quantization
+        rerank_factor: Candidates re-ranked per requested result, 0 disables re-ranking
+        pq_subspaces: Bytes per vector for product quantization
+        train_size: Vectors to collect before training the quantizer
+        float_store_path: File backing the float32 vectors used for re-ranking
+        embedder: Embedding model used by ``add_document``
+        compact_ratio: Fraction of removed rows at which storage is compacted
+    """
+
+    def __init__(
+        self,
+        method: str = "int8",
+        rerank_factor: int = 4,
+        pq_subspaces: int = 16,
+        train_size: Optional[int] = None,
+        float_store_path: Optional[str] = None,
+        embedder: Any = None,
+        compact_ratio: float = 0.25
+    ):
+        if method == "int8":
+            self.quantizer = ScalarQuantizer()
+            default_train_size = 256
+        elif method == "pq":
+            self.quantizer = ProductQuantizer(subspaces=pq_subspaces)
+            default_train_size = 4096
+        else:
+            raise ValueError(f"Unknown quantization method: {method}")
+
+        self.method = method
+        self.rerank_factor = rerank_factor
+        self.train_size = train_size or default_train_size
+        self.float_store_path = float_store_path
+        self.embedder = embedder
+        self.compact_ratio = compact_ratio
+
+        self.dimensions: Optional[int] = None
+        self._floats: Optional[_FloatStore] = None
+        self._codes: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._payloads: List[Optional[Dict[str, Any]]] = []
+        self._row_of: Dict[str, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._document_types: Dict[str, str] = {}
+        # Live chunk count per document and the document of each chunk
+        self._document_chunks: Dict[str, int] = {}
+        self._document_of: Dict[str, str] = {}
+        self._total_chars = 0
+        self._last_updated: Optional[str] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def add(self, chunk_ids: List[str], embeddings: Iterable[List[float]], payloads: List[Dict[str, Any]]):
+        """
+        Add vectors, replacing any earlier vectors with the same ids.
+
+        Args:
+            chunk_ids: Chunk identifiers
+            embeddings: One embedding per chunk
+            payloads: Search result fields returned for each chunk
+        """
+        vectors = normalize_rows(np.asarray(list(embeddings), dtype=np.float32))
+        if len(vectors) == 0:
+            return
+
+        with self._lock:
+            if self.dimensions is None:
+                self.dimensions = vectors.shape[1]
+                self._floats = _FloatStore(self.dimensions, self.float_store_path)
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(f"Expected {self.dimensions} dimensions, got {vectors.shape[1]}")
+
+            self.remove([cid for cid in chunk_ids if cid in self._row_of])
+
+            first_row = len(self._ids)
+            self._floats.append(vectors)
+            for offset, (chunk_id, payload) in enumerate(zip(chunk_ids, payloads)):
+                self._ids.append(chunk_id)
+                self._payloads.append(payload)
+                self._row_of[chunk_id] = first_row + offset
+                self._total_chars += len(payload.get("chunk_text", ""))
+            self._live = np.concatenate([self._live, np.ones(len(vectors), dtype=bool)])
+
+            if self.quantizer.trained:
+                self._codes = np.concatenate([self._codes, self.quantizer.encode(vectors)])
+            elif len(self._ids) >= self.train_size:
+                self._train()
+
+            self._last_updated = datetime.now().isoformat()
+
+    def _train(self, block_size: int = 65536):
+        """Train the quantizer on a sample of the stored vectors and encode them all."""
+        count = len(self._floats)
+        # Choose the sample first so only its rows are read from the store
+        indices = np.sort(np.random.default_rng(0).permutation(count)[:self.train_size * 4])
+        sample = self._floats.rows(indices)
+        logger.info(f"Training {self.method} quantizer on {len(sample)} vectors")
+        self.quantizer.fit(sample)
+
+        stored = self._floats.all()
+        self._codes = np.concatenate([
+            self.quantizer.encode(np.asarray(stored[start:start + block_size]))
+            for start in range(0, count, block_size)
+        ])
+
+    def add_document(self, document: Any, batch_size: int = 256):
+        """
+        Embed and add every chunk of a processed document.
+
+        Args:
+            document: Document with ``metadata`` and ``chunks``
+            batch_size: Chunks per embedding request
+        """
+        if self.embedder is None:
+            raise RuntimeError("QuantizedVectorIndex needs an embedder to add documents")
+
+        metadata = getattr(document, "metadata", {}) or {}
+        title = metadata.get("title", "Unknown Document")
+        document_key = metadata.get("document_id", title)
+        chunks = list(document.chunks)
+
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            texts = [getattr(c, "content", None) or getattr(c, "text", "") for c in batch]
+            embeddings = self.embedder.embed_documents(texts)
+            self.add(
+                [str(c.chunk_id) for c in batch],
+                embeddings,
+                [
+                    {
+                        "chunk_id": str(c.chunk_id),
+                        "chunk_text": text,
+                        "document_title": title,
+                        "metadata": getattr(c, "metadata", None) or metadata
+                    }
+                    for c, text in zip(batch, texts)
+                ]
+            )
+
+            with self._lock:
+                for c in batch:
+                    chunk_id = str(c.chunk_id)
+                    if chunk_id in self._row_of and chunk_id not in self._document_of:
+                        self._document_of[chunk_id] = document_key
+                        self._document_chunks[document_key] = self._document_chunks.get(document_key, 0) + 1
+                self._document_types[document_key] = metadata.get("type", "unknown")
+
+    def remove(self, chunk_ids: Iterable[str]):
+        """
+        Remove vectors from search results.
+
+        Rows are only marked dead; once they make up ``compact_ratio`` of
+        the index the storage is compacted.
+        """
+        with self._lock:
+            for chunk_id in chunk_ids:
+                row = self._row_of.pop(chunk_id, None)
+                if row is not None:
+                    self._live[row] = False
+                    self._total_chars -= len((self._payloads[row] or {}).get("chunk_text", ""))
+                    self._payloads[row] = None
+                    self._forget_document_chunk(chunk_id)
+
+            dead = len(self._ids) - len(self._row_of)
+            if dead and dead >= len(self._ids) * self.compact_ratio:
+                self._compact()
+
+    def _forget_document_chunk(self, chunk_id: str):
+        document_key = self._document_of.pop(chunk_id, None)
+        if document_key is None:
+            return
+        remaining = self._document_chunks[document_key] - 1
+        if remaining:
+            self._document_chunks[document_key] = remaining
+        else:
+            # The document's last chunk is gone, so it no longer counts
+            del self._document_chunks[document_key]
+            self._document_types.pop(document_key, None)
+
+    def _compact(self):
+        """Drop dead rows from the ids, payloads, codes and float store."""
+        keep = np.flatnonzero(self._live)
+        self._floats.compact(keep)
+        if self._codes is not None:
+            self._codes = self._codes[keep]
+        self._ids = [self._ids[row] for row in keep]
+        self._payloads = [self._payloads[row] for row in keep]
+        self._row_of = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._live = np.ones(len(keep), dtype=bool)
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        similarity_threshold: float = 0.0,
+        candidate_ids: Optional[Set[str]] = None,
+        rerank: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the chunks most similar to a query embedding.
+
+        Args:
+            query_embedding: Query embedding
+            top_k: Maximum number of results
+            similarity_threshold: Minimum cosine similarity
+            candidate_ids: Only score these chunks
+            rerank: Re-rank candidates with exact float32 similarity
+
+        Returns:
+            Result dictionaries with a ``similarity`` field, best first
+        """
+        with self._lock:
+            if not self._row_of:
+                return []
+
+            query = np.asarray(query_embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+
+            if candidate_ids is not None:
+                rows = np.array(sorted(self._row_of[c] for c in candidate_ids if c in self._row_of), dtype=np.int64)
+            else:
+                rows = np.flatnonzero(self._live)
+            if len(rows) == 0:
+                return []
+
+            if not self.quantizer.trained:
+                scores = self._floats.rows(rows) @ query
+            else:
+                scores = self.quantizer.score(self._codes[rows], query)
+                if rerank and self.rerank_factor:
+                    shortlist = min(len(rows), top_k * self.rerank_factor)
+                    best = np.argpartition(-scores, shortlist - 1)[:shortlist]
+                    rows = rows[best]
+                    scores = self._floats.rows(rows) @ query
+
+            count = min(top_k, len(rows))
+            best = np.argpartition(-scores, count - 1)[:count]
+            best = best[np.argsort(-scores[best])]
+
+            results = []
+            for i in best:
+                similarity = float(scores[i])
+                if similarity < similarity_threshold:
+                    break
+                result = dict(self._payloads[rows[i]])
+                result["similarity"] = similarity
+                results.append(result)
+            return results
+
+    def memory_usage(self) -> Dict[str, float]:
+        """Report resident vector memory against a float32 index in MB."""
+        with self._lock:
+            rows = len(self._ids)
+            dimensions = self.dimensions or 0
+            float32_bytes = rows * dimensions * 4
+            if self.quantizer.trained:
+                resident = rows * self.quantizer.code_size(dimensions)
+            else:
+                resident = 0 if self._floats is not None and not self._floats.in_memory else float32_bytes
+            return {
+                "float32_mb": float32_bytes / (1024 * 1024),
+                "resident_mb": resident / (1024 * 1024),
+                "compression_ratio": float32_bytes / resident if resident else float("inf")
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics in the same shape as the vector store."""
+        with self._lock:
+            memory = self.memory_usage()
+            breakdown: Dict[str, int] = {}
+            for doc_type in self._document_types.values():
+                breakdown[doc_type] = breakdown.get(doc_type, 0) + 1
+
+            return {
+                "total_documents": len(self._document_types),
+                "total_chunks": len(self._row_of),
+                "vector_dimensions": self.dimensions or 0,
+                "avg_chunk_size": self._total_chars / len(self._row_of) if self._row_of else 0,
+                "storage_size": memory["resident_mb"],
+                "float32_size": memory["float32_mb"],
+                "quantization": self.method,
+                "quantizer_trained": self.quantizer.trained,
+                "last_updated": self._last_updated,
+                "document_breakdown": breakdown
+            }
@@ -5,49 +5,145 @@ This module implements a complete RAG system for document question-answering
 using vector search and language models.
 """
 
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple, Hashable, Iterator, AsyncIterator
+from collections import OrderedDict
+from operator import itemgetter
+import asyncio
+import inspect
 import time
 import logging
+import threading
 from datetime import datetime
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 
 from src.vector_store import VectorStore
+from src.semantic_cache import SemanticCache
+from src.ingestion.fingerprints import FingerprintRegistry
+from src.lexical_index import BM25Index, reciprocal_rank_fusion
+from src.metadata_index import MetadataIndex, filter_key
+from src.context_packing import ContextPacker, TokenCounter
+from src.embeddings import create_embeddings
+from src.telemetry import Telemetry, token_usage
+from src.reranking import Reranker, create_reranker
 from src.utils.config import Settings
 from src.models.document import Document, Chunk
 
 logger = logging.getLogger(__name__)
 
+
+def _message_text(message: Any) -> str:
+    """Extract the text of an LLM output message or message chunk."""
+    if message is None:
+        return ""
+    content = getattr(message, "content", message)
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
+
 class RAGSystem:
     """
     Retrieval-Augmented Generation system for document Q&A.
     """
     
-    def __init__(self, settings: Settings, vector_store: VectorStore):
+    def __init__(
+        self,
+        settings: Settings,
+        vector_store: VectorStore,
+        answer_cache: Optional[SemanticCache] = None,
+        index_registry: Optional[FingerprintRegistry] = None,
+        lexical_index: Optional[BM25Index] = None,
+        metadata_index: Optional[MetadataIndex] = None,
+        reranker: Optional[Reranker] = None,
+        embeddings: Optional[Embeddings] = None,
+        llm: Optional[BaseChatModel] = None
+    ):
         self.settings = settings
         self.vector_store = vector_store
         
+        # Tracks tombstoned chunks left behind by incremental re-indexing
+        self.index_registry = index_registry
+        
+        # Lexical index for hybrid retrieval, kept in step by index_documents
+        self.lexical_index = lexical_index or BM25Index()
+        self.retrieval_mode = getattr(settings, "retrieval_mode", "dense")
+        if self.retrieval_mode not in ("dense", "hybrid", "lexical_prefilter"):
+            raise ValueError(f"Unknown retrieval mode: {self.retrieval_mode}")
+        self.rrf_k = getattr(settings, "rrf_k", 60)
+        self.prefilter_limit = getattr(settings, "lexical_prefilter_limit", 200)
+        
+        # Metadata bitmaps that resolve query filters before scoring
+        self.metadata_index = metadata_index or MetadataIndex()
+        self._store_takes_candidates = (
+            "candidate_ids" in inspect.signature(vector_store.search).parameters
+        )
+        
         # Initialize LLM and embeddings
-        self.llm = ChatOpenAI(
+        self.llm = llm or ChatOpenAI(
             model=settings.openai_model,
             temperature=settings.temperature,
             max_tokens=settings.max_tokens,
-            api_key=settings.openai_api_key
+            api_key=settings.openai_api_key,
+            # Report token usage on the final chunk of streamed responses
+            stream_usage=True
         )
         
-        self.embeddings = OpenAIEmbeddings(
-            model=settings.embedding_model,
-            api_key=settings.openai_api_key
+        # Embedding provider chosen by settings.embedding_provider
+        self.embeddings = embeddings or create_embeddings(settings)
+        
+        # Initialize answer cache
+        if answer_cache is None and getattr(settings, "enable_answer_cache", True):
+            answer_cache = SemanticCache(
+                similarity_threshold=getattr(settings, "cache_similarity_threshold", 0.95),
+                max_entries=getattr(settings, "cache_max_entries", 1000),
+                ttl_seconds=getattr(settings, "cache_ttl_seconds", None)
+            )
+        self.answer_cache = answer_cache
+        
+        # Exact-match memo so repeated questions skip the embedding call
+        self._query_embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_embedding_cache_size = 1024
+        self._query_embedding_lock = threading.Lock()
+        
+        # Optional second-stage re-ranking of over-fetched candidates
+        self.reranker = reranker or create_reranker(settings)
+        self.rerank_fetch_factor = getattr(settings, "rerank_fetch_factor", 4)
+        self.rerank_top_n = getattr(settings, "rerank_top_n", None)
+        
+        # Token-budgeted context assembly
+        self.token_counter = TokenCounter(settings.openai_model)
+        self.context_packer = ContextPacker(
+            self.token_counter,
+            token_budget=getattr(settings, "context_token_budget", 3000),
+            duplicate_threshold=getattr(settings, "context_duplicate_threshold", 0.85)
         )
         
+        # Stage timing, optional tracing and aggregated query metrics
+        self.telemetry = Telemetry(
+            enable_tracing=getattr(settings, "enable_tracing", False),
+            metrics_window=getattr(settings, "metrics_window", 1000)
+        )
+        
+        # Upper bound on concurrent LLM calls for batched queries
+        self.max_concurrency = getattr(settings, "max_concurrent_generations", 8)
+        
         # Initialize prompt template
         self.prompt_template = self._create_prompt_template()
         
         # Initialize chain
         self.chain = self._create_chain()
+        
+        # Chains with per-request generation parameters bound to the LLM
+        self._bound_chains: Dict[Tuple[float, int], Any] = {}
+        # Async and batched queries build chains from worker threads
+        self._bound_chains_lock = threading.Lock()
     
     def _create_prompt_template(self) -> PromptTemplate:
         """Create the prompt template for RAG."""
@@ -74,22 +170,56 @@ class RAGSystem:
             input_variables=["context", "question"]
         )
     
-    def _create_chain(self):
-        """Create the RAG chain."""
+    def _create_chain(self, llm=None):
+        """
+        Create the RAG chain.
+        
+        The chain returns the LLM's message rather than a plain string so
+        that provider-reported token usage is available.
+        
+        Args:
+            llm: Runnable to generate with, defaults to the shared LLM
+        """
         return (
-            {"context": RunnablePassthrough(), "question": RunnablePassthrough()}
+            {"context": itemgetter("context"), "question": itemgetter("question")}
             | self.prompt_template
-            | self.llm
-            | StrOutputParser()
+            | (llm or self.llm)
         )
     
+    def _chain_for(self, temperature: float, max_tokens: int):
+        """
+        Get a chain whose LLM call uses the given generation parameters.
+        
+        The parameters are bound to the call rather than written onto the
+        shared LLM, so concurrent queries cannot see each other's settings.
+        
+        Args:
+            temperature: LLM temperature for response generation
+            max_tokens: Maximum tokens for response
+            
+        Returns:
+            RAG chain for these parameters
+        """
+        key = (temperature, max_tokens)
+        with self._bound_chains_lock:
+            chain = self._bound_chains.get(key)
+            if chain is None:
+                chain = self._create_chain(
+                    self.llm.bind(temperature=temperature, max_tokens=max_tokens)
+                )
+                if len(self._bound_chains) >= 64:
+                    self._bound_chains.clear()
+                self._bound_chains[key] = chain
+        return chain
+    
     def query(
         self,
         question: str,
         max_results: int = 5,
         similarity_threshold: float = 0.7,
         temperature: float = 0.7,
-        max_tokens: int = 500
+        max_tokens: int = 500,
+        filters: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Query the RAG system with a question.
@@ -100,65 +230,687 @@ class RAGSystem:
             similarity_threshold: Minimum similarity score for chunks
             temperature: LLM temperature for response generation
             max_tokens: Maximum tokens for response
+            filters: Metadata filter expression restricting the searched chunks
+            
+        Returns:
+            Dictionary containing answer, sources, and metadata. The
+            ``cache_hit`` field reports whether the answer was served from
+            the semantic answer cache, ``timings`` holds the seconds spent
+            in each stage and the token fields come from the provider's
+            usage report when it sends one.
+        """
+        start_time = time.time()
+        
+        with self.telemetry.span("rag.query", max_results=max_results):
+            try:
+                state = self._prepare_query(
+                    question, max_results, similarity_threshold, temperature, max_tokens, filters
+                )
+                
+                if state["result"] is not None:
+                    return self._complete(state["result"], state, start_time)
+                
+                # Generate answer
+                with self.telemetry.stage("generate", state["timings"]):
+                    message = state["chain"].invoke({
+                        "context": state["context"],
+                        "question": question
+                    })
+                
+                return self._finalize_query(state, question, message, start_time)
+                
+            except Exception as e:
+                logger.error(f"Error in RAG query: {e}")
+                return self._error_result(e, start_time)
+    
+    async def aquery(
+        self,
+        question: str,
+        max_results: int = 5,
+        similarity_threshold: float = 0.7,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of ``query`` for use behind an async server.
+        
+        Retrieval runs in a worker thread and generation uses the chain's
+        ``ainvoke``, so the event loop stays free while the LLM responds.
+        
+        Args:
+            question: The question to ask
+            max_results: Maximum number of relevant chunks to retrieve
+            similarity_threshold: Minimum similarity score for chunks
+            temperature: LLM temperature for response generation
+            max_tokens: Maximum tokens for response
+            filters: Metadata filter expression restricting the searched chunks
             
         Returns:
             Dictionary containing answer, sources, and metadata
         """
         start_time = time.time()
         
+        with self.telemetry.span("rag.query", max_results=max_results):
+            try:
+                state = await asyncio.to_thread(
+                    self._prepare_query,
+                    question, max_results, similarity_threshold, temperature, max_tokens, filters
+                )
+                
+                if state["result"] is not None:
+                    return self._complete(state["result"], state, start_time)
+                
+                with self.telemetry.stage("generate", state["timings"]):
+                    message = await state["chain"].ainvoke({
+                        "context": state["context"],
+                        "question": question
+                    })
+                
+                return self._finalize_query(state, question, message, start_time)
+                
+            except Exception as e:
+                logger.error(f"Error in async RAG query: {e}")
+                return self._error_result(e, start_time)
+    
+    def batch_query(
+        self,
+        questions: List[str],
+        max_results: int = 5,
+        similarity_threshold: float = 0.7,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer several questions at once.
+        
+        Question embeddings are computed in one request, vector searches run
+        as one batch and LLM calls fan out with at most ``max_concurrency``
+        in flight. A failure in one question does not affect the others.
+        
+        Args:
+            questions: The questions to ask
+            max_results: Maximum number of relevant chunks to retrieve
+            similarity_threshold: Minimum similarity score for chunks
+            temperature: LLM temperature for response generation
+            max_tokens: Maximum tokens for response
+            filters: Metadata filter expression restricting the searched chunks
+            
+        Returns:
+            One response dictionary per question, in order
+        """
+        start_time = time.time()
+        
         try:
-            # Update LLM parameters
-            self.llm.temperature = temperature
-            self.llm.max_tokens = max_tokens
+            states = self._prepare_queries(
+                questions, max_results, similarity_threshold, temperature, max_tokens, filters
+            )
+            pending = [i for i, state in enumerate(states) if state["result"] is None]
+            
+            generate_start = time.perf_counter()
+            answers = self._chain_for(temperature, max_tokens).batch(
+                [{"context": states[i]["context"], "question": questions[i]} for i in pending],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True
+            ) if pending else []
+            generate_time = time.perf_counter() - generate_start
+            
+            return self._finalize_batch(questions, states, pending, answers, start_time, generate_time)
             
-            # Retrieve relevant chunks
-            relevant_chunks = self._retrieve_relevant_chunks(
-                question, max_results, similarity_threshold
+        except Exception as e:
+            logger.error(f"Error in batch RAG query: {e}")
+            return [self._error_result(e, start_time) for _ in questions]
+    
+    async def abatch_query(
+        self,
+        questions: List[str],
+        max_results: int = 5,
+        similarity_threshold: float = 0.7,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of ``batch_query``.
+        
+        Args:
+            questions: The questions to ask
+            max_results: Maximum number of relevant chunks to retrieve
+            similarity_threshold: Minimum similarity score for chunks
+            temperature: LLM temperature for response generation
+            max_tokens: Maximum tokens for response
+            filters: Metadata filter expression restricting the searched chunks
+            
+        Returns:
+            One response dictionary per question, in order
+        """
+        start_time = time.time()
+        
+        try:
+            states = await asyncio.to_thread(
+                self._prepare_queries,
+                questions, max_results, similarity_threshold, temperature, max_tokens, filters
             )
+            pending = [i for i, state in enumerate(states) if state["result"] is None]
+            
+            generate_start = time.perf_counter()
+            answers = await self._chain_for(temperature, max_tokens).abatch(
+                [{"context": states[i]["context"], "question": questions[i]} for i in pending],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True
+            ) if pending else []
+            generate_time = time.perf_counter() - generate_start
             
-            if not relevant_chunks:
-                return {
+            return self._finalize_batch(questions, states, pending, answers, start_time, generate_time)
+            
+        except Exception as e:
+            logger.error(f"Error in async batch RAG query: {e}")
+            return [self._error_result(e, start_time) for _ in questions]
+    
+    def _finalize_batch(
+        self,
+        questions: List[str],
+        states: List[Dict[str, Any]],
+        pending: List[int],
+        answers: List[Any],
+        start_time: float,
+        generate_time: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """Merge generated answers back into the per-question results."""
+        results: List[Optional[Dict[str, Any]]] = [
+            self._complete(state["result"], state, start_time) if state["result"] is not None else None
+            for state in states
+        ]
+        
+        for i, answer in zip(pending, answers):
+            if isinstance(answer, Exception):
+                logger.error(f"Error generating answer for batched question: {answer}")
+                results[i] = self._error_result(answer, start_time)
+            else:
+                # Generations run concurrently, so each one is charged the
+                # wall time of the whole fan-out
+                states[i]["timings"]["generate"] = generate_time
+                results[i] = self._finalize_query(states[i], questions[i], answer, start_time)
+        
+        return results
+    
+    def query_stream(
+        self,
+        question: str,
+        max_results: int = 5,
+        similarity_threshold: float = 0.7,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Query the RAG system and stream the answer as it is generated.
+        
+        Yields a ``sources`` event as soon as retrieval finishes, then one
+        ``token`` event per chunk of generated text, and finally a ``done``
+        event carrying the same fields that ``query`` returns plus
+        ``time_to_first_token``. Failures are reported as an ``error`` event.
+        
+        Args:
+            question: The question to ask
+            max_results: Maximum number of relevant chunks to retrieve
+            similarity_threshold: Minimum similarity score for chunks
+            temperature: LLM temperature for response generation
+            max_tokens: Maximum tokens for response
+            filters: Metadata filter expression restricting the searched chunks
+            
+        Yields:
+            Event dictionaries with a ``type`` key
+        """
+        start_time = time.time()
+        
+        try:
+            state = self._prepare_query(
+                question, max_results, similarity_threshold, temperature, max_tokens, filters
+            )
+            
+            yield self._sources_event(state)
+            
+            if state["result"] is not None:
+                result = state["result"]
+                yield {"type": "token", "content": result["answer"]}
+                result = self._complete(result, state, start_time)
+                result["time_to_first_token"] = result["processing_time"]
+                yield {"type": "done", **result}
+                return
+            
+            message = None
+            first_token_time = None
+            
+            # Timed by hand: a span cannot stay open across yields
+            generate_start = time.perf_counter()
+            for chunk in state["chain"].stream({
+                "context": state["context"],
+                "question": question
+            }):
+                # Chunks add up to the full message, including its usage report
+                message = chunk if message is None else message + chunk
+                token = _message_text(chunk)
+                if not token:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.time() - start_time
+                yield {"type": "token", "content": token}
+            state["timings"]["generate"] = time.perf_counter() - generate_start
+            
+            result = self._finalize_query(state, question, message, start_time)
+            result["time_to_first_token"] = first_token_time
+            yield {"type": "done", **result}
+            
+        except Exception as e:
+            logger.error(f"Error in streaming RAG query: {e}")
+            yield {"type": "error", **self._error_result(e, start_time)}
+    
+    async def aquery_stream(
+        self,
+        question: str,
+        max_results: int = 5,
+        similarity_threshold: float = 0.7,
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of ``query_stream`` built on the chain's ``astream``.
+        
+        Retrieval runs in a worker thread so the event loop is not blocked.
+        Yields the same events as ``query_stream``.
+        """
+        start_time = time.time()
+        
+        try:
+            state = await asyncio.to_thread(
+                self._prepare_query,
+                question, max_results, similarity_threshold, temperature, max_tokens, filters
+            )
+            
+            yield self._sources_event(state)
+            
+            if state["result"] is not None:
+                result = state["result"]
+                yield {"type": "token", "content": result["answer"]}
+                result = self._complete(result, state, start_time)
+                result["time_to_first_token"] = result["processing_time"]
+                yield {"type": "done", **result}
+                return
+            
+            message = None
+            first_token_time = None
+            
+            # Timed by hand: a span cannot stay open across yields
+            generate_start = time.perf_counter()
+            async for chunk in state["chain"].astream({
+                "context": state["context"],
+                "question": question
+            }):
+                # Chunks add up to the full message, including its usage report
+                message = chunk if message is None else message + chunk
+                token = _message_text(chunk)
+                if not token:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.time() - start_time
+                yield {"type": "token", "content": token}
+            state["timings"]["generate"] = time.perf_counter() - generate_start
+            
+            result = self._finalize_query(state, question, message, start_time)
+            result["time_to_first_token"] = first_token_time
+            yield {"type": "done", **result}
+            
+        except Exception as e:
+            logger.error(f"Error in streaming RAG query: {e}")
+            yield {"type": "error", **self._error_result(e, start_time)}
+    
+    def _prepare_query(
+        self,
+        question: str,
+        max_results: int,
+        similarity_threshold: float,
+        temperature: float,
+        max_tokens: int,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the steps shared by every query mode up to answer generation.
+        
+        Args:
+            question: The question to ask
+            max_results: Maximum number of relevant chunks to retrieve
+            similarity_threshold: Minimum similarity score for chunks
+            temperature: LLM temperature for response generation
+            max_tokens: Maximum tokens for response
+            filters: Metadata filter expression restricting the searched chunks
+            
+        Returns:
+            Query state. ``result`` holds a finished response when no
+            generation is needed (cache hit or nothing retrieved), otherwise
+            ``chunks``, ``context`` and ``chain`` are ready for the LLM.
+        """
+        return self._prepare_queries(
+            [question], max_results, similarity_threshold, temperature, max_tokens, filters
+        )[0]
+    
+    def _prepare_queries(
+        self,
+        questions: List[str],
+        max_results: int,
+        similarity_threshold: float,
+        temperature: float,
+        max_tokens: int,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Embed, check the answer cache and retrieve context for many questions.
+        
+        Args:
+            questions: The questions to ask
+            max_results: Maximum number of relevant chunks to retrieve
+            similarity_threshold: Minimum similarity score for chunks
+            temperature: LLM temperature for response generation
+            max_tokens: Maximum tokens for response
+            filters: Metadata filter expression restricting the searched chunks
+            
+        Returns:
+            One query state per question, see ``_prepare_query``
+        """
+        timings: Dict[str, float] = {}
+        
+        # Embed the questions once for both the cache and retrieval
+        with self.telemetry.stage("embed", timings, questions=len(questions)):
+            question_embeddings = self._embed_queries(questions)
+        cache_key = (
+            self._cache_key(max_results, similarity_threshold, temperature, max_tokens),
+            filter_key(filters)
+        )
+        
+        # Resolve filters to the allowed chunks once for the whole batch
+        allowed_ids = self.metadata_index.resolve(filters) if filters else None
+        store_version = self._vector_store_version()
+        chain = self._chain_for(temperature, max_tokens)
+        
+        states = []
+        with self.telemetry.stage("cache", timings):
+            for question_embedding in question_embeddings:
+                state = {
+                    "result": None,
+                    "chunks": [],
+                    "context": "",
+                    "chain": chain,
+                    "question_embedding": question_embedding,
+                    "cache_key": cache_key,
+                    "store_version": store_version,
+                    "timings": {}
+                }
+                
+                # Serve near-duplicate questions from the answer cache
+                if self.answer_cache is not None:
+                    cached = self.answer_cache.lookup(question_embedding, cache_key, store_version)
+                    if cached is not None:
+                        cached.update(cache_hit=True, tokens_used=0, prompt_tokens=0, completion_tokens=0)
+                        state["result"] = cached
+                
+                states.append(state)
+        
+        # Retrieve relevant chunks for everything the cache could not answer
+        misses = [state for state in states if state["result"] is None]
+        miss_questions = [questions[i] for i, state in enumerate(states) if state["result"] is None]
+        # Over-fetch candidates for the re-ranker to choose from
+        fetch_size = max_results * self.rerank_fetch_factor if self.reranker else max_results
+        with self.telemetry.stage("search", timings, questions=len(misses)):
+            if allowed_ids is not None and not allowed_ids:
+                # Nothing matches the filters, so there is nothing to search
+                retrieved = [[] for _ in misses]
+            else:
+                retrieved = self._search_many(
+                    miss_questions,
+                    [state["question_embedding"] for state in misses],
+                    fetch_size, similarity_threshold,
+                    allowed_ids=allowed_ids
+                ) if misses else []
+        
+        # Shared stages are amortized over the questions that went through them
+        for state in states:
+            state["timings"]["embed"] = timings["embed"] / len(states)
+            state["timings"]["cache"] = timings["cache"] / len(states)
+        for state in misses:
+            state["timings"]["search"] = timings["search"] / len(misses)
+        
+        for state, question, chunks in zip(misses, miss_questions, retrieved):
+            if chunks and self.reranker is not None:
+                with self.telemetry.stage("rerank", state["timings"], candidates=len(chunks)):
+                    chunks = self.reranker.rerank(question, chunks, self.rerank_top_n or max_results)
+            
+            if not chunks:
+                state["result"] = {
                     "answer": "I cannot find relevant information in the documents to answer your question.",
                     "sources": [],
-                    "processing_time": time.time() - start_time,
-                    "tokens_used": 0
+                    "tokens_used": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "cache_hit": False
                 }
+                continue
             
-            # Prepare context
-            context = self._prepare_context(relevant_chunks)
+            with self.telemetry.stage("context", state["timings"]):
+                # Fit the best chunks into the context token budget
+                state["chunks"], state["context_stats"] = self.context_packer.pack(chunks)
+                # Prepare context
+                state["context"] = self._prepare_context(state["chunks"])
+        
+        return states
+    
+    def _finalize_query(
+        self,
+        state: Dict[str, Any],
+        question: str,
+        message: Any,
+        start_time: float
+    ) -> Dict[str, Any]:
+        """
+        Build the response for a generated answer and cache it.
+        
+        Args:
+            state: Query state from ``_prepare_query``
+            question: The question that was asked
+            message: The LLM's output message
+            start_time: Time the query started
             
-            # Generate answer
-            answer = self.chain.invoke({
-                "context": context,
-                "question": question
-            })
+        Returns:
+            Response dictionary
+        """
+        answer = _message_text(message)
+        usage = token_usage(message)
+        estimated = usage is None
+        if estimated:
+            prompt_tokens = self._estimate_tokens(question + state["context"])
+            completion_tokens = self._estimate_tokens(answer)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        
+        result = {
+            "answer": answer,
+            "sources": self._prepare_sources(state["chunks"]),
+            "processing_time": time.time() - start_time,
+            "tokens_used": usage["total_tokens"],
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "tokens_estimated": estimated,
+            "context_tokens": state["context_stats"]["context_tokens"],
+            "cache_hit": False
+        }
+        
+        if self.answer_cache is not None:
+            self.answer_cache.store(
+                state["question_embedding"], state["cache_key"], result, state["store_version"]
+            )
+        
+        return self._complete(result, state, start_time)
+    
+    def _complete(self, result: Dict[str, Any], state: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        """Stamp timings on a finished response and record it in the query metrics."""
+        result["processing_time"] = time.time() - start_time
+        result["timings"] = dict(state["timings"])
+        
+        self.telemetry.metrics.record(
+            result["timings"],
+            result["processing_time"],
+            usage={
+                "prompt_tokens": result.get("prompt_tokens", 0),
+                "completion_tokens": result.get("completion_tokens", 0),
+                "total_tokens": result.get("tokens_used", 0)
+            },
+            usage_estimated=result.get("tokens_estimated", False),
+            cache_hit=result.get("cache_hit", False)
+        )
+        
+        return result
+    
+    def _sources_event(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the retrieval event that opens a streamed answer."""
+        if state["result"] is not None:
+            sources = state["result"]["sources"]
+        else:
+            sources = self._prepare_sources(state["chunks"])
+        
+        return {
+            "type": "sources",
+            "sources": sources,
+            "cache_hit": bool(state["result"] and state["result"].get("cache_hit"))
+        }
+    
+    def _error_result(self, error: Exception, start_time: float) -> Dict[str, Any]:
+        """Build the response returned when a query fails."""
+        processing_time = time.time() - start_time
+        self.telemetry.metrics.record({}, processing_time, error=True)
+        
+        return {
+            "answer": f"I encountered an error while processing your question: {str(error)}",
+            "sources": [],
+            "processing_time": processing_time,
+            "tokens_used": 0,
+            "cache_hit": False
+        }
+    
+    def _embed_query(self, question: str) -> List[float]:
+        """
+        Embed a question, reusing the embedding of an identical earlier question.
+        
+        Args:
+            question: The question to embed
             
-            # Prepare sources
-            sources = self._prepare_sources(relevant_chunks)
+        Returns:
+            Question embedding
+        """
+        key = " ".join(question.lower().split())
+        
+        with self._query_embedding_lock:
+            embedding = self._query_embedding_cache.get(key)
+            if embedding is not None:
+                self._query_embedding_cache.move_to_end(key)
+                return embedding
+        
+        embedding = self.embeddings.embed_query(question)
+        
+        with self._query_embedding_lock:
+            self._query_embedding_cache[key] = embedding
+            if len(self._query_embedding_cache) > self._query_embedding_cache_size:
+                self._query_embedding_cache.popitem(last=False)
+        
+        return embedding
+    
+    def _embed_queries(self, questions: List[str]) -> List[List[float]]:
+        """
+        Embed several questions with a single embedding request.
+        
+        Args:
+            questions: The questions to embed
             
-            processing_time = time.time() - start_time
+        Returns:
+            One embedding per question, in order
+        """
+        if len(questions) == 1:
+            return [self._embed_query(questions[0])]
+        
+        keys = [" ".join(q.lower().split()) for q in questions]
+        embeddings: List[Optional[List[float]]] = []
+        
+        with self._query_embedding_lock:
+            for key in keys:
+                embeddings.append(self._query_embedding_cache.get(key))
+        
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # Deduplicate so repeated questions in one batch are embedded once
+            unique_keys = list(dict.fromkeys(keys[i] for i in missing))
+            first_question = {}
+            for i in missing:
+                first_question.setdefault(keys[i], questions[i])
+            vectors = self.embeddings.embed_documents([first_question[k] for k in unique_keys])
+            by_key = dict(zip(unique_keys, vectors))
             
-            return {
-                "answer": answer,
-                "sources": sources,
-                "processing_time": processing_time,
-                "tokens_used": self._estimate_tokens(question + context + answer)
-            }
+            with self._query_embedding_lock:
+                for key, vector in by_key.items():
+                    self._query_embedding_cache[key] = vector
+                while len(self._query_embedding_cache) > self._query_embedding_cache_size:
+                    self._query_embedding_cache.popitem(last=False)
             
+            for i in missing:
+                embeddings[i] = by_key[keys[i]]
+        
+        return embeddings
+    
+    @staticmethod
+    def _cache_key(
+        max_results: int,
+        similarity_threshold: float,
+        temperature: float,
+        max_tokens: int
+    ) -> Hashable:
+        """Build the answer cache partition key from the query parameters."""
+        return (max_results, round(similarity_threshold, 4), round(temperature, 4), max_tokens)
+    
+    def _vector_store_version(self) -> Hashable:
+        """
+        Describe the current vector store contents for cache invalidation.
+        
+        Returns:
+            A hashable snapshot that changes whenever documents are added or removed
+        """
+        try:
+            stats = self.vector_store.get_stats()
         except Exception as e:
-            logger.error(f"Error in RAG query: {e}")
-            return {
-                "answer": f"I encountered an error while processing your question: {str(e)}",
-                "sources": [],
-                "processing_time": time.time() - start_time,
-                "tokens_used": 0
-            }
+            logger.warning(f"Could not read vector store stats: {e}")
+            # Unknown state, so never match a previously stored version
+            return time.time()
+        
+        return (
+            stats.get("total_documents"),
+            stats.get("total_chunks"),
+            str(stats.get("last_updated")),
+            self.index_registry.version if self.index_registry else None
+        )
+    
+    def clear_answer_cache(self):
+        """Drop all cached answers."""
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate()
     
     def _retrieve_relevant_chunks(
         self,
         question: str,
         max_results: int,
-        similarity_threshold: float
+        similarity_threshold: float,
+        question_embedding: Optional[List[float]] = None,
+        allowed_ids: Optional[Set[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant chunks for the question.
@@ -167,27 +919,198 @@ class RAGSystem:
             question: The question to search for
             max_results: Maximum number of results
             similarity_threshold: Minimum similarity score
+            question_embedding: Precomputed embedding of the question
+            allowed_ids: Chunk ids that passed the metadata filters
             
         Returns:
             List of relevant chunks with metadata
         """
         try:
             # Get embedding for the question
-            question_embedding = self.embeddings.embed_query(question)
+            if question_embedding is None:
+                question_embedding = self._embed_query(question)
+            
+            if self.retrieval_mode == "hybrid":
+                return self._hybrid_search(
+                    question, question_embedding, max_results, similarity_threshold,
+                    allowed_ids=allowed_ids
+                )
+            
+            candidate_ids = allowed_ids
+            if self.retrieval_mode == "lexical_prefilter":
+                # Only chunks sharing terms with the question are scored;
+                # fall back to the filtered set when nothing matches
+                candidate_ids = self.lexical_index.candidates(
+                    question, self.prefilter_limit, candidate_ids=allowed_ids
+                ) or allowed_ids
             
             # Search vector store
-            results = self.vector_store.search(
-                query_embedding=question_embedding,
-                top_k=max_results,
-                similarity_threshold=similarity_threshold
+            results = self._dense_search(
+                question_embedding,
+                self._fetch_size(max_results),
+                similarity_threshold,
+                candidate_ids=candidate_ids
             )
             
-            return results
+            return self._live_results(results, max_results)
             
         except Exception as e:
             logger.error(f"Error retrieving chunks: {e}")
             return []
     
+    def _dense_search(
+        self,
+        question_embedding: List[float],
+        top_k: int,
+        similarity_threshold: float,
+        candidate_ids: Optional[Set[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the vector store, optionally restricted to candidate chunks.
+        
+        Args:
+            question_embedding: Embedding of the question
+            top_k: Maximum number of results
+            similarity_threshold: Minimum similarity score
+            candidate_ids: Chunk ids to restrict scoring to
+            
+        Returns:
+            List of matching chunks
+        """
+        if candidate_ids is None:
+            return self.vector_store.search(
+                query_embedding=question_embedding,
+                top_k=top_k,
+                similarity_threshold=similarity_threshold
+            )
+        
+        if self._store_takes_candidates:
+            return self.vector_store.search(
+                query_embedding=question_embedding,
+                top_k=top_k,
+                similarity_threshold=similarity_threshold,
+                candidate_ids=candidate_ids
+            )
+        
+        # The store cannot restrict scoring, so widen the search until enough
+        # candidates are found or the whole store has been ranked
+        wanted = min(top_k, len(candidate_ids))
+        if wanted == 0:
+            return []
+        try:
+            total = int(self.vector_store.get_stats().get("total_chunks") or 0)
+        except Exception as e:
+            logger.warning(f"Could not read vector store stats: {e}")
+            total = 0
+        
+        fetch = top_k * 4
+        while True:
+            results = self.vector_store.search(
+                query_embedding=question_embedding,
+                top_k=fetch,
+                similarity_threshold=similarity_threshold
+            )
+            matches = [r for r in results if r.get("chunk_id") in candidate_ids]
+            # Fewer results than asked for means the store is exhausted
+            if len(matches) >= wanted or len(results) < fetch or (total and fetch >= total):
+                return matches[:top_k]
+            fetch = min(fetch * 4, total) if total else fetch * 4
+    
+    def _hybrid_search(
+        self,
+        question: str,
+        question_embedding: List[float],
+        max_results: int,
+        similarity_threshold: float,
+        allowed_ids: Optional[Set[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fuse dense and BM25 rankings with reciprocal rank fusion.
+        
+        Args:
+            question: The question to search for
+            question_embedding: Embedding of the question
+            max_results: Maximum number of results
+            similarity_threshold: Minimum similarity score for dense results
+            allowed_ids: Chunk ids that passed the metadata filters
+            
+        Returns:
+            Fused list of relevant chunks
+        """
+        pool_size = 2 * max_results
+        
+        dense = self._live_results(
+            self._dense_search(
+                question_embedding, self._fetch_size(pool_size), similarity_threshold,
+                candidate_ids=allowed_ids
+            ),
+            pool_size
+        )
+        lexical = self._live_results(
+            self.lexical_index.search(question, pool_size, candidate_ids=allowed_ids),
+            pool_size
+        )
+        
+        return reciprocal_rank_fusion([dense, lexical], k=self.rrf_k, top_k=max_results)
+    
+    def _search_many(
+        self,
+        questions: List[str],
+        question_embeddings: List[List[float]],
+        max_results: int,
+        similarity_threshold: float,
+        allowed_ids: Optional[Set[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several vector searches as one batch.
+        
+        Uses the vector store's ``search_batch`` for dense retrieval when it
+        provides one and falls back to one search per question otherwise.
+        
+        Args:
+            questions: Questions to search for
+            question_embeddings: Question embeddings to search for
+            max_results: Maximum number of results per question
+            similarity_threshold: Minimum similarity score
+            allowed_ids: Chunk ids that passed the metadata filters
+            
+        Returns:
+            List of relevant chunks for each embedding, in order
+        """
+        search_batch = getattr(self.vector_store, "search_batch", None)
+        if search_batch is not None and self.retrieval_mode == "dense" and allowed_ids is None:
+            try:
+                batches = search_batch(
+                    query_embeddings=question_embeddings,
+                    top_k=self._fetch_size(max_results),
+                    similarity_threshold=similarity_threshold
+                )
+                return [self._live_results(results, max_results) for results in batches]
+            except Exception as e:
+                logger.error(f"Error in batched vector search: {e}")
+                return [[] for _ in question_embeddings]
+        
+        return [
+            self._retrieve_relevant_chunks(
+                question, max_results, similarity_threshold,
+                question_embedding=question_embedding,
+                allowed_ids=allowed_ids
+            )
+            for question, question_embedding in zip(questions, question_embeddings)
+        ]
+    
+    def _fetch_size(self, max_results: int) -> int:
+        """Over-fetch enough results to make up for tombstoned chunks."""
+        if self.index_registry is None or not self.index_registry.tombstone_count:
+            return max_results
+        return max_results + min(self.index_registry.tombstone_count, 3 * max_results)
+    
+    def _live_results(self, results: List[Dict[str, Any]], max_results: int) -> List[Dict[str, Any]]:
+        """Drop tombstoned chunks and trim to the requested size."""
+        if self.index_registry is not None:
+            results = self.index_registry.filter_results(results)
+        return results[:max_results]
+    
     def _prepare_context(self, chunks: List[Dict[str, Any]]) -> str:
         """
         Prepare context from retrieved chunks.
@@ -229,22 +1152,49 @@ class RAGSystem:
                 "metadata": chunk.get('metadata', {}),
                 "chunk_id": chunk.get('chunk_id', '')
             }
+            if "rerank_score" in chunk:
+                source["rerank_score"] = chunk["rerank_score"]
             sources.append(source)
         
         return sources
     
     def _estimate_tokens(self, text: str) -> int:
         """
-        Estimate the number of tokens in text.
+        Count the number of tokens in text.
         
         Args:
             text: Input text
             
         Returns:
-            Estimated token count
+            Token count, exact when tiktoken is installed
+        """
+        return self.token_counter.count(text)
+    
+    def index_documents(
+        self,
+        documents: List[Any],
+        removed_chunk_ids: Optional[List[str]] = None,
+        refreshed_documents: Optional[List[Any]] = None
+    ):
         """
-        # Rough estimation: 1 token ≈ 4 characters
-        return len(text) // 4
+        Keep the lexical and metadata indexes in step with the vector store.
+        
+        Args:
+            documents: Documents just added to the vector store
+            removed_chunk_ids: Chunks removed from the knowledge base
+            refreshed_documents: Unchanged chunks of re-uploaded documents,
+                whose metadata is re-registered
+        """
+        if removed_chunk_ids:
+            self.lexical_index.remove_many(removed_chunk_ids)
+            self.metadata_index.remove_many(removed_chunk_ids)
+        
+        for document in documents:
+            self.lexical_index.add_document(document)
+            self.metadata_index.add_document(document)
+        
+        for document in refreshed_documents or []:
+            self.metadata_index.add_document(document)
     
     def get_system_stats(self) -> Dict[str, Any]:
         """Get system statistics."""
@@ -257,6 +1207,13 @@ class RAGSystem:
                 "embedding_model": self.settings.embedding_model,
                 "temperature": self.llm.temperature,
                 "max_tokens": self.llm.max_tokens,
+                "answer_cache_stats": self.answer_cache.get_stats() if self.answer_cache else None,
+                "retrieval_mode": self.retrieval_mode,
+                "lexical_index_stats": self.lexical_index.get_stats(),
+                "metadata_index_stats": self.metadata_index.get_stats(),
+                "reranker_stats": self.reranker.get_stats() if self.reranker else None,
+                "query_metrics": self.telemetry.metrics.summary(),
+                "tracing_enabled": self.telemetry.tracer is not None,
                 "last_updated": datetime.now().isoformat()
             }
             
@@ -288,6 +1245,10 @@ class RAGSystem:
             self.llm.model = model
             # Recreate the chain with new model
             self.chain = self._create_chain()
+            with self._bound_chains_lock:
+                self._bound_chains.clear()
+            # Cached answers were generated by the previous model
+            self.clear_answer_cache()
         
         logger.info(f"Updated LLM parameters: temp={self.llm.temperature}, max_tokens={self.llm.max_tokens}, model={self.llm.model}")
     
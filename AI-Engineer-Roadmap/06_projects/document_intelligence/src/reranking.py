@@ -0,0 +1,220 @@
+"""
+Re-ranking - Second-stage scoring of retrieved chunks
+
+This module re-scores an over-fetched candidate list against the question
+so only the best few chunks reach the prompt. Scores are computed in
+batches and cached per (question, chunk) pair. A sentence-transformers
+cross-encoder is used when installed, with a cheap lexical scorer as the
+dependency-free fallback.
+"""
+
+from typing import List, Dict, Any, Optional, Tuple, Hashable
+from collections import OrderedDict
+import logging
+import threading
+
+from src.lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or "
+    "the this that to was what when where which who why will with you your".split()
+)
+
+
+def _retrieval_score(chunk: Dict[str, Any]) -> float:
+    return chunk.get("fusion_score", chunk.get("similarity", 0.0))
+
+
+class Reranker:
+    """
+    Base class for re-rankers.
+
+    Subclasses implement ``score_pairs``. ``rerank`` looks up cached pair
+    scores, scores the rest in batches and keeps the best chunks.
+
+    Args:
+        batch_size: Pairs scored per call
+        cache_size: Cached (question, chunk) scores
+        retrieval_weight: Weight of the first-stage score in the final score
+    """
+
+    def __init__(self, batch_size: int = 32, cache_size: int = 10000, retrieval_weight: float = 0.0):
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.retrieval_weight = retrieval_weight
+        self._cache: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def score_pairs(self, question: str, texts: List[str]) -> List[float]:
+        """Score how well each text answers the question, higher is better."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _pair_key(question: str, chunk: Dict[str, Any]) -> Tuple[str, Hashable]:
+        text = chunk.get("chunk_text", "")
+        return " ".join(question.lower().split()), (chunk.get("chunk_id"), hash(text))
+
+    def rerank(self, question: str, chunks: List[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+        """
+        Re-score candidates and keep the best ones.
+
+        Args:
+            question: The question being answered
+            chunks: Retrieved candidates in the vector store result format
+            top_n: Number of chunks to keep
+
+        Returns:
+            Copies of the best chunks with a ``rerank_score``, best first
+        """
+        if not chunks:
+            return []
+
+        keys = [self._pair_key(question, chunk) for chunk in chunks]
+        scores: List[Optional[float]] = []
+        with self._lock:
+            for key in keys:
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                scores.append(score)
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            batch_scores = self.score_pairs(question, [chunks[i].get("chunk_text", "") for i in batch])
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+
+        with self._lock:
+            self._hits += len(chunks) - len(missing)
+            self._misses += len(missing)
+            for i in missing:
+                self._cache[keys[i]] = scores[i]
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        reranked = []
+        for chunk, score in zip(chunks, scores):
+            result = dict(chunk)
+            result["rerank_score"] = score + self.retrieval_weight * _retrieval_score(chunk)
+            reranked.append(result)
+
+        reranked.sort(key=lambda chunk: chunk["rerank_score"], reverse=True)
+        return reranked[:top_n]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "reranker": type(self).__name__,
+                "cached_pairs": len(self._cache),
+                "cache_hits": self._hits,
+                "cache_misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0
+            }
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Re-ranker backed by a sentence-transformers cross-encoder.
+
+    Args:
+        model_name: Cross-encoder model name or path
+        device: Torch device
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        device: str = "cpu",
+        **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, device=device)
+
+    def score_pairs(self, question: str, texts: List[str]) -> List[float]:
+        return self.model.predict(
+            [(question, text) for text in texts],
+            batch_size=self.batch_size,
+            show_progress_bar=False
+        ).tolist()
+
+
+class LexicalReranker(Reranker):
+    """
+    Dependency-free re-ranker based on question term coverage.
+
+    A chunk scores for the share of the question's content words it
+    contains, weighted towards longer words, plus a bonus for question
+    bigrams that appear verbatim. It is blended with the first-stage score
+    since on its own it ignores meaning.
+    """
+
+    def __init__(self, retrieval_weight: float = 0.5, **kwargs: Any):
+        super().__init__(retrieval_weight=retrieval_weight, **kwargs)
+
+    def score_pairs(self, question: str, texts: List[str]) -> List[float]:
+        question_terms = [t for t in tokenize(question) if t not in _STOPWORDS]
+        if not question_terms:
+            return [0.0] * len(texts)
+
+        weights = {term: min(len(term), 10) for term in question_terms}
+        total_weight = sum(weights.values())
+        bigrams = set(zip(question_terms, question_terms[1:]))
+
+        scores = []
+        for text in texts:
+            terms = [t for t in tokenize(text) if t not in _STOPWORDS]
+            present = set(terms)
+            coverage = sum(weight for term, weight in weights.items() if term in present) / total_weight
+            phrase = len(bigrams & set(zip(terms, terms[1:]))) / len(bigrams) if bigrams else 0.0
+            scores.append(0.8 * coverage + 0.2 * phrase)
+        return scores
+
+
+def create_reranker(settings: Any) -> Optional[Reranker]:
+    """
+    Create the re-ranker named by ``settings.reranker``.
+
+    Re-rankers are ``cross_encoder``, ``lexical`` and ``auto``, which uses
+    the cross-encoder when sentence-transformers is installed. Re-ranking is
+    off by default.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        A re-ranker, or None when re-ranking is disabled
+    """
+    name = getattr(settings, "reranker", None)
+    if not name or name == "none":
+        return None
+
+    options = {
+        "batch_size": getattr(settings, "rerank_batch_size", 32),
+        "cache_size": getattr(settings, "rerank_cache_size", 10000)
+    }
+    model_name = getattr(settings, "rerank_model", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+    if name == "cross_encoder":
+        return CrossEncoderReranker(model_name, **options)
+
+    if name == "lexical":
+        return LexicalReranker(**options)
+
+    if name == "auto":
+        try:
+            return CrossEncoderReranker(model_name, **options)
+        except ImportError:
+            logger.warning("sentence-transformers not installed, using the lexical re-ranker")
+            return LexicalReranker(**options)
+
+    raise ValueError(f"Unknown re-ranker: {name}")
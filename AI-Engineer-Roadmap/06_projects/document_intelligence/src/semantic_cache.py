@@ -0,0 +1,200 @@
+"""
+Semantic Cache - Answer cache keyed on question embeddings
+
+This module implements an in-process cache for RAG answers. A lookup hits
+when a previously answered question is close enough in embedding space and
+was asked with the same retrieval parameters.
+"""
+
+from typing import List, Dict, Any, Optional, Hashable, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import threading
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """A cached answer together with the embedding it was stored under."""
+    embedding: np.ndarray
+    response: Dict[str, Any]
+    created_at: float = field(default_factory=time.time)
+
+
+class SemanticCache:
+    """
+    Cosine-similarity answer cache with LRU eviction.
+
+    Entries are partitioned by a parameters key so that a hit is only
+    possible between queries that were retrieved the same way. The cache
+    also tracks the version of the underlying vector store and drops every
+    entry as soon as that version changes.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl_seconds: Optional[float] = None
+    ):
+        if not 0.0 < similarity_threshold <= 1.0:
+            raise ValueError("similarity_threshold must be in (0, 1]")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._partitions: Dict[Hashable, Dict[int, CacheEntry]] = {}
+        self._matrices: Dict[Hashable, Optional[np.ndarray]] = {}
+        self._lru: "OrderedDict[Tuple[Hashable, int], None]" = OrderedDict()
+        self._store_version: Optional[Hashable] = None
+        self._next_id = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Return the embedding as a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _sync_store_version(self, store_version: Optional[Hashable]):
+        """Invalidate all entries if the vector store has changed."""
+        if store_version != self._store_version:
+            if self._lru:
+                logger.info("Vector store changed, invalidating semantic cache")
+            self._clear()
+            self._store_version = store_version
+
+    def _clear(self):
+        """Drop all entries without touching the hit/miss counters."""
+        self._partitions.clear()
+        self._matrices.clear()
+        self._lru.clear()
+
+    def _partition_matrix(self, params_key: Hashable) -> Optional[np.ndarray]:
+        """Stack the partition embeddings, rebuilding only after a write."""
+        matrix = self._matrices.get(params_key)
+        if matrix is None and self._partitions.get(params_key):
+            matrix = np.stack([e.embedding for e in self._partitions[params_key].values()])
+            self._matrices[params_key] = matrix
+        return matrix
+
+    def _expire(self, params_key: Hashable):
+        """Drop entries older than the TTL from one partition."""
+        if self.ttl_seconds is None:
+            return
+        partition = self._partitions.get(params_key)
+        if not partition:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        expired = [k for k, e in partition.items() if e.created_at < cutoff]
+        for entry_id in expired:
+            del partition[entry_id]
+            del self._lru[(params_key, entry_id)]
+        if expired:
+            self._matrices[params_key] = None
+
+    def lookup(
+        self,
+        embedding: List[float],
+        params_key: Hashable,
+        store_version: Optional[Hashable] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a question embedding.
+
+        Args:
+            embedding: Embedding of the incoming question
+            params_key: Hashable key of the retrieval parameters
+            store_version: Current version of the vector store
+
+        Returns:
+            A copy of the cached response with a ``cache_similarity`` field,
+            or None on a miss
+        """
+        query = self._normalize(embedding)
+
+        with self._lock:
+            self._sync_store_version(store_version)
+            self._expire(params_key)
+
+            matrix = self._partition_matrix(params_key)
+            if matrix is None:
+                self._misses += 1
+                return None
+
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            best_similarity = float(similarities[best])
+
+            if best_similarity < self.similarity_threshold:
+                self._misses += 1
+                return None
+
+            partition = self._partitions[params_key]
+            entry_id = list(partition.keys())[best]
+            self._lru.move_to_end((params_key, entry_id))
+            self._hits += 1
+
+            response = dict(partition[entry_id].response)
+            response["cache_similarity"] = best_similarity
+            return response
+
+    def store(
+        self,
+        embedding: List[float],
+        params_key: Hashable,
+        response: Dict[str, Any],
+        store_version: Optional[Hashable] = None
+    ):
+        """
+        Store an answer under a question embedding.
+
+        Args:
+            embedding: Embedding of the answered question
+            params_key: Hashable key of the retrieval parameters
+            response: Response dictionary to cache
+            store_version: Version of the vector store the answer came from
+        """
+        entry = CacheEntry(embedding=self._normalize(embedding), response=dict(response))
+
+        with self._lock:
+            self._sync_store_version(store_version)
+
+            partition = self._partitions.setdefault(params_key, {})
+            partition[self._next_id] = entry
+            self._lru[(params_key, self._next_id)] = None
+            self._next_id += 1
+            self._matrices[params_key] = None
+
+            while len(self._lru) > self.max_entries:
+                (oldest_key, oldest_id), _ = self._lru.popitem(last=False)
+                del self._partitions[oldest_key][oldest_id]
+                self._matrices[oldest_key] = None
+
+    def invalidate(self):
+        """Drop every cached answer."""
+        with self._lock:
+            self._clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._lru),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0.0,
+                "similarity_threshold": self.similarity_threshold
+            }
@@ -0,0 +1,511 @@
+"""
+Sharded Vector Store - Multi-process vector search over memory-mapped shards
+
+This module partitions chunk embeddings across shard files that are memory
+mapped by a pool of worker processes. Each query is scored on every shard
+in parallel and the per-shard top-k lists are merged. Vectors live in the
+operating system's page cache, shared by all workers, rather than in the
+heap of any one process. Payloads are kept in a file per shard as well and
+only the ones returned by a search are read back.
+"""
+
+from typing import List, Dict, Any, Optional, Set, Iterable, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import heapq
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import zlib
+
+import numpy as np
+
+from src.quantization import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+# Memory maps opened by this worker process, keyed by path
+_worker_maps: Dict[str, Tuple[int, np.memmap]] = {}
+
+
+def _open_map(path: str, capacity: int, dimensions: int, dtype: Any) -> np.memmap:
+    """Map a shard file, remapping when the parent has grown it."""
+    cached = _worker_maps.get(path)
+    if cached is None or cached[0] != capacity:
+        shape = (capacity, dimensions) if dimensions else (capacity,)
+        _worker_maps[path] = (capacity, np.memmap(path, dtype=dtype, mode="r", shape=shape))
+    return _worker_maps[path][1]
+
+
+def _search_shard(
+    shard: Dict[str, Any],
+    queries: np.ndarray,
+    top_k: int,
+    similarity_threshold: float,
+    candidate_rows: Optional[np.ndarray] = None
+) -> List[List[Tuple[float, int]]]:
+    """
+    Score queries against one shard and return its best rows.
+
+    Runs in a worker process, or inline for small stores.
+
+    Returns:
+        For each query, a list of (similarity, row) pairs, best first
+    """
+    rows = shard["rows"]
+    if rows == 0:
+        return [[] for _ in queries]
+
+    vectors = _open_map(shard["vector_path"], shard["capacity"], shard["dimensions"], np.float32)
+    live = _open_map(shard["live_path"], shard["capacity"], 0, np.uint8)
+
+    if candidate_rows is None:
+        candidate_rows = np.flatnonzero(live[:rows])
+    else:
+        candidate_rows = candidate_rows[live[candidate_rows] == 1]
+    if len(candidate_rows) == 0:
+        return [[] for _ in queries]
+
+    scores = np.asarray(vectors[candidate_rows]) @ queries.T
+
+    results = []
+    for column in range(len(queries)):
+        column_scores = scores[:, column]
+        count = min(top_k, len(column_scores))
+        best = np.argpartition(-column_scores, count - 1)[:count]
+        best = best[np.argsort(-column_scores[best])]
+        results.append([
+            (float(column_scores[i]), int(candidate_rows[i]))
+            for i in best
+            if column_scores[i] >= similarity_threshold
+        ])
+    return results
+
+
+class _Shard:
+    """Parent-side handle on one shard's vector file, live-row mask and payload file."""
+
+    def __init__(self, directory: str, index: int, dimensions: int, capacity: int = 4096):
+        self.vector_path = os.path.join(directory, f"shard_{index}.f32")
+        self.live_path = os.path.join(directory, f"shard_{index}.live")
+        self.payload_path = os.path.join(directory, f"shard_{index}.payloads")
+        self.dimensions = dimensions
+        self.capacity = 0
+        self.rows = 0
+        self.live_rows = 0
+        # Bumped by every compaction, which moves rows
+        self.generation = 0
+        # Chunk id of each row, None once removed
+        self.ids: List[Optional[str]] = []
+        # Offset and size of each row's pickled payload, and its text length
+        self.payload_index = np.zeros((0, 3), dtype=np.int64)
+        self._payload_file = open(self.payload_path, "w+b")
+        self.payload_bytes = 0
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        # Extend the files in place; workers remap when the capacity changes
+        with open(self.vector_path, "ab") as f:
+            f.truncate(capacity * self.dimensions * 4)
+        with open(self.live_path, "ab") as f:
+            f.truncate(capacity)
+        self.capacity = capacity
+        self.vectors = np.memmap(self.vector_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimensions))
+        self.live = np.memmap(self.live_path, dtype=np.uint8, mode="r+", shape=(capacity,))
+        payload_index = np.zeros((capacity, 3), dtype=np.int64)
+        payload_index[:self.rows] = self.payload_index[:self.rows]
+        self.payload_index = payload_index
+
+    def append(self, vectors: np.ndarray, chunk_ids: List[str], payloads: List[Dict[str, Any]]) -> int:
+        """Write vectors and payloads at the end of the shard and return the first row."""
+        needed = self.rows + len(vectors)
+        if needed > self.capacity:
+            self._grow(max(needed, 2 * self.capacity))
+        first = self.rows
+        self.vectors[first:needed] = vectors
+        self.live[first:needed] = 1
+
+        blobs = [pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL) for payload in payloads]
+        self._payload_file.seek(self.payload_bytes)
+        self._payload_file.write(b"".join(blobs))
+        self._payload_file.flush()
+        offset = self.payload_bytes
+        for row, blob, payload in zip(range(first, needed), blobs, payloads):
+            self.payload_index[row] = (offset, len(blob), len(payload.get("chunk_text", "")))
+            offset += len(blob)
+        self.payload_bytes = offset
+
+        self.ids.extend(chunk_ids)
+        self.rows = needed
+        self.live_rows += len(vectors)
+        return first
+
+    def payload(self, row: int) -> Dict[str, Any]:
+        """Read one row's payload back from the payload file."""
+        offset, size, _ = self.payload_index[row]
+        self._payload_file.seek(offset)
+        return pickle.loads(self._payload_file.read(size))
+
+    def remove(self, row: int) -> int:
+        """Mark a row dead and return the length of its chunk text."""
+        self.live[row] = 0
+        self.ids[row] = None
+        self.live_rows -= 1
+        return int(self.payload_index[row, 2])
+
+    def compact(self, block_size: int = 65536) -> List[str]:
+        """
+        Move the live rows to the front of the shard, dropping the dead ones.
+
+        Returns:
+            Chunk ids of the rows in their new order
+        """
+        keep = np.flatnonzero(self.live[:self.rows])
+        # keep[i] >= i, so each block is read before anything overwrites it
+        for start in range(0, len(keep), block_size):
+            block = keep[start:start + block_size]
+            self.vectors[start:start + len(block)] = self.vectors[block]
+        self.live[:len(keep)] = 1
+        self.live[len(keep):self.rows] = 0
+
+        compacted_path = self.payload_path + ".compact"
+        with open(compacted_path, "wb") as out:
+            offset = 0
+            for new_row, row in enumerate(keep):
+                old_offset, size, text_length = self.payload_index[row]
+                self._payload_file.seek(old_offset)
+                out.write(self._payload_file.read(size))
+                self.payload_index[new_row] = (offset, size, text_length)
+                offset += size
+        self._payload_file.close()
+        os.replace(compacted_path, self.payload_path)
+        self._payload_file = open(self.payload_path, "r+b")
+        self.payload_bytes = offset
+
+        self.ids = [self.ids[row] for row in keep]
+        self.rows = len(keep)
+        self.generation += 1
+        return self.ids
+
+    def close(self):
+        self._payload_file.close()
+
+    def descriptor(self) -> Dict[str, Any]:
+        """Picklable description sent to workers."""
+        return {
+            "vector_path": self.vector_path,
+            "live_path": self.live_path,
+            "capacity": self.capacity,
+            "dimensions": self.dimensions,
+            "rows": self.rows
+        }
+
+
+class ShardedVectorStore:
+    """
+    Vector store whose search fans out over memory-mapped shards.
+
+    Chunks are assigned to shards by a hash of their id. Stores smaller
+    than ``parallel_threshold`` vectors are searched in-process, since
+    the round trip to the workers would cost more than the scan.
+
+    Args:
+        num_shards: Number of shards and worker processes, defaults to the CPU count
+        directory: Where shard files are written, defaults to a temporary directory
+        parallel_threshold: Minimum vector count for multi-process search
+        embedder: Embedding model used by ``add_document``
+        compact_ratio: Fraction of removed rows at which a shard is compacted
+    """
+
+    def __init__(
+        self,
+        num_shards: Optional[int] = None,
+        directory: Optional[str] = None,
+        parallel_threshold: int = 50000,
+        embedder: Any = None,
+        compact_ratio: float = 0.25
+    ):
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self._owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="vector_shards_")
+        os.makedirs(self.directory, exist_ok=True)
+        self.parallel_threshold = parallel_threshold
+        self.embedder = embedder
+        self.compact_ratio = compact_ratio
+
+        self.dimensions: Optional[int] = None
+        self._shards: List[_Shard] = []
+        self._location: Dict[str, Tuple[int, int]] = {}
+        self._document_types: Dict[str, str] = {}
+        # Live chunk count per document and the document of each chunk
+        self._document_chunks: Dict[str, int] = {}
+        self._document_of: Dict[str, str] = {}
+        self._total_chars = 0
+        self._last_updated: Optional[str] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._location)
+
+    def _shard_of(self, chunk_id: str) -> int:
+        return zlib.crc32(chunk_id.encode("utf-8")) % self.num_shards
+
+    def add(self, chunk_ids: List[str], embeddings: Iterable[List[float]], payloads: List[Dict[str, Any]]):
+        """
+        Add vectors, replacing any earlier vectors with the same ids.
+
+        Args:
+            chunk_ids: Chunk identifiers
+            embeddings: One embedding per chunk
+            payloads: Search result fields returned for each chunk
+        """
+        vectors = normalize_rows(np.asarray(list(embeddings), dtype=np.float32))
+        if len(vectors) == 0:
+            return
+
+        with self._lock:
+            if self.dimensions is None:
+                self.dimensions = vectors.shape[1]
+                self._shards = [_Shard(self.directory, i, self.dimensions) for i in range(self.num_shards)]
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(f"Expected {self.dimensions} dimensions, got {vectors.shape[1]}")
+
+            self.remove(chunk_ids)
+
+            assignment = np.array([self._shard_of(chunk_id) for chunk_id in chunk_ids])
+            for shard_index in np.unique(assignment):
+                positions = np.flatnonzero(assignment == shard_index)
+                first_row = self._shards[shard_index].append(
+                    vectors[positions],
+                    [chunk_ids[position] for position in positions],
+                    [payloads[position] for position in positions]
+                )
+                for offset, position in enumerate(positions):
+                    self._location[chunk_ids[position]] = (int(shard_index), first_row + offset)
+                    self._total_chars += len(payloads[position].get("chunk_text", ""))
+
+            self._last_updated = datetime.now().isoformat()
+
+    def add_document(self, document: Any, batch_size: int = 256):
+        """
+        Embed and add every chunk of a processed document.
+
+        Args:
+            document: Document with ``metadata`` and ``chunks``
+            batch_size: Chunks per embedding request
+        """
+        if self.embedder is None:
+            raise RuntimeError("ShardedVectorStore needs an embedder to add documents")
+
+        metadata = getattr(document, "metadata", {}) or {}
+        title = metadata.get("title", "Unknown Document")
+        document_key = metadata.get("document_id", title)
+        chunks = list(document.chunks)
+
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            texts = [getattr(c, "content", None) or getattr(c, "text", "") for c in batch]
+            self.add(
+                [str(c.chunk_id) for c in batch],
+                self.embedder.embed_documents(texts),
+                [
+                    {
+                        "chunk_id": str(c.chunk_id),
+                        "chunk_text": text,
+                        "document_title": title,
+                        "metadata": getattr(c, "metadata", None) or metadata
+                    }
+                    for c, text in zip(batch, texts)
+                ]
+            )
+
+            with self._lock:
+                for c in batch:
+                    chunk_id = str(c.chunk_id)
+                    if chunk_id in self._location and chunk_id not in self._document_of:
+                        self._document_of[chunk_id] = document_key
+                        self._document_chunks[document_key] = self._document_chunks.get(document_key, 0) + 1
+                self._document_types[document_key] = metadata.get("type", "unknown")
+
+    def remove(self, chunk_ids: Iterable[str]):
+        """
+        Remove vectors from search results.
+
+        Rows are only marked dead; once they make up ``compact_ratio`` of
+        a shard the shard is compacted.
+        """
+        with self._lock:
+            touched = set()
+            for chunk_id in chunk_ids:
+                location = self._location.pop(chunk_id, None)
+                if location is None:
+                    continue
+                shard_index, row = location
+                self._total_chars -= self._shards[shard_index].remove(row)
+                self._forget_document_chunk(chunk_id)
+                touched.add(shard_index)
+
+            for shard_index in touched:
+                shard = self._shards[shard_index]
+                if shard.rows - shard.live_rows >= shard.rows * self.compact_ratio:
+                    for row, chunk_id in enumerate(shard.compact()):
+                        self._location[chunk_id] = (shard_index, row)
+
+    def _forget_document_chunk(self, chunk_id: str):
+        document_key = self._document_of.pop(chunk_id, None)
+        if document_key is None:
+            return
+        remaining = self._document_chunks[document_key] - 1
+        if remaining:
+            self._document_chunks[document_key] = remaining
+        else:
+            # The document's last chunk is gone, so it no longer counts
+            del self._document_chunks[document_key]
+            self._document_types.pop(document_key, None)
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        similarity_threshold: float = 0.0,
+        candidate_ids: Optional[Set[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the chunks most similar to a query embedding.
+
+        Args:
+            query_embedding: Query embedding
+            top_k: Maximum number of results
+            similarity_threshold: Minimum cosine similarity
+            candidate_ids: Only score these chunks
+
+        Returns:
+            Result dictionaries with a ``similarity`` field, best first
+        """
+        return self._search([query_embedding], top_k, similarity_threshold, candidate_ids)[0]
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        similarity_threshold: float = 0.0
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search several query embeddings with one pass over every shard.
+
+        Returns:
+            One result list per query, in order
+        """
+        return self._search(query_embeddings, top_k, similarity_threshold)
+
+    def _search(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int,
+        similarity_threshold: float,
+        candidate_ids: Optional[Set[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        while True:
+            with self._lock:
+                if not self._location:
+                    return [[] for _ in query_embeddings]
+
+                queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+                shards = [shard.descriptor() for shard in self._shards]
+                generations = [shard.generation for shard in self._shards]
+
+                candidate_rows: List[Optional[np.ndarray]] = [None] * self.num_shards
+                if candidate_ids is not None:
+                    rows_by_shard: List[List[int]] = [[] for _ in range(self.num_shards)]
+                    for chunk_id in candidate_ids:
+                        location = self._location.get(chunk_id)
+                        if location is not None:
+                            rows_by_shard[location[0]].append(location[1])
+                    candidate_rows = [np.array(rows, dtype=np.int64) for rows in rows_by_shard]
+
+                scanned = len(self._location) if candidate_ids is None else len(candidate_ids)
+
+            if scanned < self.parallel_threshold or self.num_shards == 1:
+                shard_results = [
+                    _search_shard(shard, queries, top_k, similarity_threshold, rows)
+                    for shard, rows in zip(shards, candidate_rows)
+                ]
+            else:
+                executor = self._get_executor()
+                futures = [
+                    executor.submit(_search_shard, shard, queries, top_k, similarity_threshold, rows)
+                    for shard, rows in zip(shards, candidate_rows)
+                ]
+                shard_results = [future.result() for future in futures]
+
+            with self._lock:
+                if [shard.generation for shard in self._shards] != generations:
+                    # A shard was compacted while the search ran, so its rows moved
+                    continue
+
+                results = []
+                for query_index in range(len(queries)):
+                    merged = heapq.nlargest(
+                        top_k,
+                        (
+                            (score, shard_index, row)
+                            for shard_index, per_query in enumerate(shard_results)
+                            for score, row in per_query[query_index]
+                        )
+                    )
+                    hits = []
+                    for score, shard_index, row in merged:
+                        shard = self._shards[shard_index]
+                        if not shard.live[row]:
+                            # Removed while the search was running
+                            continue
+                        result = shard.payload(row)
+                        result["similarity"] = score
+                        hits.append(result)
+                    results.append(hits)
+                return results
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_shards)
+        return self._executor
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics in the same shape as the vector store."""
+        with self._lock:
+            breakdown: Dict[str, int] = {}
+            for doc_type in self._document_types.values():
+                breakdown[doc_type] = breakdown.get(doc_type, 0) + 1
+
+            stored_bytes = sum(
+                shard.capacity * (shard.dimensions * 4 + 1) + shard.payload_bytes for shard in self._shards
+            )
+            return {
+                "total_documents": len(self._document_types),
+                "total_chunks": len(self._location),
+                "vector_dimensions": self.dimensions or 0,
+                "avg_chunk_size": self._total_chars / len(self._location) if self._location else 0,
+                "storage_size": stored_bytes / (1024 * 1024),
+                "num_shards": self.num_shards,
+                "shard_sizes": [shard.rows for shard in self._shards],
+                "last_updated": self._last_updated,
+                "document_breakdown": breakdown
+            }
+
+    def close(self):
+        """Stop the worker processes and delete temporary shard files."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            for shard in self._shards:
+                shard.close()
+            self._shards = []
+            for path in [p for p in _worker_maps if p.startswith(self.directory)]:
+                del _worker_maps[path]
+            if self._owns_directory:
+                shutil.rmtree(self.directory, ignore_errors=True)
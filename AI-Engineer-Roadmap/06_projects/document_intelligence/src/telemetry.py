@@ -0,0 +1,196 @@
+"""
+Telemetry - Stage timing, tracing and query metrics for the RAG pipeline
+
+This module times the stages of a query (embed, cache, search, rerank,
+context, generate), opens OpenTelemetry spans for them when the
+opentelemetry API is installed and tracing is enabled, and aggregates
+latency percentiles and token usage across queries.
+"""
+
+from typing import List, Dict, Any, Optional, Iterator
+from collections import deque
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("embed", "cache", "search", "rerank", "context", "generate")
+
+
+def _load_tracer():
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logger.info("opentelemetry not installed, tracing disabled")
+        return None
+    return trace.get_tracer("document_intelligence.rag")
+
+
+def token_usage(message: Any) -> Optional[Dict[str, int]]:
+    """
+    Read token usage reported by the LLM provider.
+
+    Args:
+        message: Chat model output message
+
+    Returns:
+        Dictionary with prompt_tokens, completion_tokens and total_tokens,
+        or None when the provider did not report usage
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return {
+            "prompt_tokens": usage.get("input_tokens", 0),
+            "completion_tokens": usage.get("output_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0)
+        }
+
+    metadata = getattr(message, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or metadata.get("usage")
+    if usage:
+        return {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0)
+        }
+
+    return None
+
+
+class QueryMetrics:
+    """
+    Rolling aggregate of query latency and token usage.
+
+    Args:
+        window: Number of recent queries kept for latency percentiles
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts = {"queries": 0, "cache_hits": 0, "errors": 0}
+        self._tokens = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "estimated": 0}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        timings: Dict[str, float],
+        total_time: float,
+        usage: Optional[Dict[str, int]] = None,
+        usage_estimated: bool = False,
+        cache_hit: bool = False,
+        error: bool = False
+    ):
+        """
+        Record one finished query.
+
+        Args:
+            timings: Seconds spent in each stage
+            total_time: End-to-end seconds
+            usage: Token usage of the query
+            usage_estimated: Whether usage was estimated rather than reported
+            cache_hit: Whether the answer came from the answer cache
+            error: Whether the query failed
+        """
+        with self._lock:
+            self._counts["queries"] += 1
+            self._counts["cache_hits"] += int(cache_hit)
+            self._counts["errors"] += int(error)
+
+            for stage, seconds in list(timings.items()) + [("total", total_time)]:
+                samples = self._samples.get(stage)
+                if samples is None:
+                    samples = self._samples[stage] = deque(maxlen=self.window)
+                samples.append(seconds)
+
+            if usage:
+                for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                    self._tokens[key] += usage.get(key, 0)
+                self._tokens["estimated"] += int(usage_estimated)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the recorded queries.
+
+        Returns:
+            Counts, token totals and p50/p95/p99/mean latency in milliseconds per stage
+        """
+        with self._lock:
+            latency = {}
+            for stage, samples in self._samples.items():
+                ordered = sorted(samples)
+                latency[stage] = {
+                    "p50": 1000 * _percentile(ordered, 50),
+                    "p95": 1000 * _percentile(ordered, 95),
+                    "p99": 1000 * _percentile(ordered, 99),
+                    "mean": 1000 * sum(ordered) / len(ordered)
+                }
+
+            return {
+                **self._counts,
+                "tokens": dict(self._tokens),
+                "latency_ms": latency
+            }
+
+    def reset(self):
+        """Forget all recorded queries."""
+        with self._lock:
+            self._samples.clear()
+            self._counts = dict.fromkeys(self._counts, 0)
+            self._tokens = dict.fromkeys(self._tokens, 0)
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    """Linearly interpolated percentile of sorted values."""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Telemetry:
+    """
+    Stage timer and optional tracer shared by every query.
+
+    Args:
+        enable_tracing: Emit OpenTelemetry spans when the API is installed
+        metrics_window: Number of recent queries kept for latency percentiles
+    """
+
+    def __init__(self, enable_tracing: bool = False, metrics_window: int = 1000):
+        self.tracer = _load_tracer() if enable_tracing else None
+        self.metrics = QueryMetrics(window=metrics_window)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Open a trace span, or do nothing when tracing is disabled."""
+        if self.tracer is None:
+            yield None
+            return
+
+        with self.tracer.start_as_current_span(name) as span:
+            for key, value in attributes.items():
+                if value is not None:
+                    span.set_attribute(key, value)
+            yield span
+
+    @contextmanager
+    def stage(self, name: str, timings: Dict[str, float], **attributes: Any) -> Iterator[Any]:
+        """
+        Time a pipeline stage into ``timings`` and trace it as a child span.
+
+        Args:
+            name: Stage name
+            timings: Dictionary the elapsed seconds are added to
+            attributes: Span attributes
+        """
+        start = time.perf_counter()
+        try:
+            with self.span(f"rag.{name}", **attributes) as span:
+                yield span
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
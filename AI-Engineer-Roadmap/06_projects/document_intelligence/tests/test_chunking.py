@@ -0,0 +1,82 @@
+"""
+Tests for the streaming chunker.
+"""
+
+import pytest
+
+from src.ingestion.chunking import StreamingChunker, StreamingFingerprint
+from src.ingestion.fingerprints import fingerprint_text
+from src.ingestion.pipeline import process_upload
+
+
+def make_pages(count=4, sentences=20):
+    """Build numbered pages of short sentences."""
+    return [
+        (page, " ".join(f"Page {page} sentence {i} ends here." for i in range(sentences)))
+        for page in range(1, count + 1)
+    ]
+
+
+class TestStreamingChunker:
+    """Test cases for StreamingChunker."""
+
+    def test_sentence_chunks_respect_size_and_overlap(self):
+        """Test chunk bounds, whole sentences and carried overlap."""
+        chunks = list(StreamingChunker(200, 60).chunk(iter(make_pages())))
+
+        assert all(len(chunk.text) <= 200 for chunk in chunks)
+        assert all(chunk.text.endswith(".") for chunk in chunks)
+        last_sentence = chunks[0].text.rsplit(". ", 1)[-1]
+        assert last_sentence in chunks[1].text[:60]
+
+    def test_chunks_track_pages(self):
+        """Test that chunks record the pages they span."""
+        chunks = list(StreamingChunker(300, 50).chunk(iter(make_pages(sentences=5))))
+
+        assert chunks[0].page_start == 1
+        assert any(chunk.page_start != chunk.page_end for chunk in chunks)
+        assert chunks[-1].page_end == 4
+
+    def test_long_sentence_is_cut(self):
+        """Test that a sentence longer than a chunk is split."""
+        chunks = list(StreamingChunker(50, 10).chunk(iter([(None, "x" * 120)])))
+
+        assert [len(chunk.text) for chunk in chunks] == [50, 50, 20]
+
+    def test_token_windows(self):
+        """Test fixed token windows with overlap and no trailing duplicate."""
+        chunker = StreamingChunker(40, 10, strategy="token")
+        chunks = list(chunker.chunk(iter(make_pages(count=2))))
+
+        assert len(chunks) > 2
+        assert chunks[-1].text
+        assert len({chunk.text for chunk in chunks}) == len(chunks)
+
+    def test_streaming_matches_one_shot_fingerprint(self):
+        """Test that incremental fingerprints equal fingerprint_text."""
+        pages = [text for _, text in make_pages()]
+        fingerprint = StreamingFingerprint()
+        for text in pages:
+            fingerprint.update(text)
+
+        assert fingerprint.hexdigest() == fingerprint_text("\n\n".join(pages))
+
+    def test_invalid_strategy(self):
+        """Test that unknown strategies are rejected."""
+        with pytest.raises(ValueError):
+            StreamingChunker(strategy="paragraph")
+
+
+class TestProcessUpload:
+    """Test cases for streaming document processing."""
+
+    def test_content_is_not_kept_by_default(self):
+        """Test that only the fingerprint and a preview of the text are kept."""
+        data = " ".join(f"Line {i} of the notes." for i in range(300)).encode("utf-8")
+
+        doc = process_upload("notes.txt", data, chunk_size=500, chunk_overlap=100)
+        kept = process_upload("notes.txt", data, chunk_size=500, chunk_overlap=100, keep_content=True)
+
+        assert doc.content == ""
+        assert doc.metadata["preview"].startswith("Line 0")
+        assert doc.metadata["content_fingerprint"] == fingerprint_text(kept.content)
@@ -0,0 +1,80 @@
+"""
+Tests for token-budget-aware context packing.
+"""
+
+from src.context_packing import ContextPacker, TokenCounter
+
+
+def make_chunk(chunk_id, text, similarity, document_id="doc", chunk_index=None):
+    """Build a chunk in the vector store result format."""
+    metadata = {"document_id": document_id}
+    if chunk_index is not None:
+        metadata["chunk_index"] = chunk_index
+    return {
+        "chunk_id": chunk_id,
+        "chunk_text": text,
+        "document_title": document_id,
+        "similarity": similarity,
+        "metadata": metadata
+    }
+
+
+class TestTokenCounter:
+    """Test cases for TokenCounter."""
+
+    def test_counts_are_positive_and_cached(self):
+        """Test counting and memoization."""
+        counter = TokenCounter()
+        text = "The quick brown fox jumps over the lazy dog."
+
+        assert counter.count(text) > 0
+        assert counter.count(text) == counter.count(text)
+        assert counter.count("") == 0
+        assert counter.count.cache_info().hits >= 1
+
+
+class TestContextPacker:
+    """Test cases for ContextPacker."""
+
+    def test_respects_token_budget_in_score_order(self):
+        """Test that the best chunks are kept when the budget is tight."""
+        counter = TokenCounter()
+        chunks = [
+            make_chunk("low", "alpha " * 50, 0.5, document_id="a"),
+            make_chunk("high", "beta " * 50, 0.9, document_id="b"),
+            make_chunk("mid", "gamma " * 50, 0.7, document_id="c"),
+        ]
+        budget = counter.count("beta " * 50) + counter.count("gamma " * 50)
+
+        packed, stats = ContextPacker(counter, token_budget=budget).pack(chunks)
+
+        assert [c["chunk_id"] for c in packed] == ["high", "mid"]
+        assert stats["context_tokens"] <= budget
+
+    def test_drops_near_duplicates(self):
+        """Test that a near-copy of a better chunk is removed."""
+        text = "The warranty covers parts and labour for two years from purchase date"
+        chunks = [
+            make_chunk("a", text, 0.9, document_id="x"),
+            make_chunk("b", text + " only", 0.8, document_id="y"),
+            make_chunk("c", "Shipping takes five business days", 0.7, document_id="z"),
+        ]
+
+        packed, stats = ContextPacker(TokenCounter(), duplicate_threshold=0.8).pack(chunks)
+
+        assert [c["chunk_id"] for c in packed] == ["a", "c"]
+        assert stats["duplicates_removed"] == 1
+
+    def test_merges_adjacent_chunks(self):
+        """Test that neighbouring chunks are merged without their overlap."""
+        chunks = [
+            make_chunk("d-1", "second part. third part.", 0.8, chunk_index=1),
+            make_chunk("d-0", "first part. second part.", 0.9, chunk_index=0),
+            make_chunk("e-0", "unrelated text", 0.7, document_id="e", chunk_index=0),
+        ]
+
+        packed, _ = ContextPacker(TokenCounter()).pack(chunks)
+
+        assert packed[0]["chunk_text"] == "first part. second part. third part."
+        assert packed[0]["merged_chunk_ids"] == ["d-0", "d-1"]
+        assert packed[1]["chunk_id"] == "e-0"
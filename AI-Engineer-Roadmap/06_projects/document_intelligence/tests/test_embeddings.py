@@ -0,0 +1,71 @@
+"""
+Tests for the pluggable embedding providers.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.embeddings import HashingEmbeddings, create_embeddings
+
+
+class TestHashingEmbeddings:
+    """Test cases for HashingEmbeddings."""
+
+    def test_vectors_are_normalized_and_deterministic(self):
+        """Test output size, unit length and stable hashing."""
+        embeddings = HashingEmbeddings(dimensions=64)
+
+        vector = embeddings.embed_query("Invoice total due in thirty days")
+
+        assert len(vector) == 64
+        assert np.linalg.norm(vector) == pytest.approx(1.0, abs=1e-5)
+        assert HashingEmbeddings(dimensions=64).embed_query("Invoice total due in thirty days") == vector
+
+    def test_related_texts_are_closer(self):
+        """Test that shared vocabulary gives higher similarity."""
+        embeddings = HashingEmbeddings()
+        query, related, unrelated = np.array(embeddings.embed_documents([
+            "refund policy for damaged items",
+            "our refund policy covers damaged items",
+            "the quarterly revenue grew by ten percent"
+        ]))
+
+        assert query @ related > query @ unrelated
+
+    def test_batches_keep_input_order(self):
+        """Test that threaded batches match embedding texts one by one."""
+        texts = [f"document number {i}" for i in range(25)]
+        embeddings = HashingEmbeddings(dimensions=32, batch_size=4, max_workers=3)
+
+        assert embeddings.embed_documents(texts) == [embeddings.embed_query(t) for t in texts]
+        embeddings.close()
+
+
+class TestCreateEmbeddings:
+    """Test cases for provider selection."""
+
+    def test_hashing_provider(self):
+        """Test selecting the hashing provider explicitly."""
+        settings = SimpleNamespace(embedding_provider="hashing", embedding_dimensions=128)
+
+        embeddings = create_embeddings(settings)
+
+        assert isinstance(embeddings, HashingEmbeddings)
+        assert embeddings.dimensions == 128
+
+    def test_local_falls_back_to_hashing(self):
+        """Test the fallback when no local model is installed."""
+        try:
+            import sentence_transformers  # noqa: F401
+            pytest.skip("sentence-transformers is installed")
+        except ImportError:
+            pass
+
+        assert isinstance(create_embeddings(SimpleNamespace(embedding_provider="local")), HashingEmbeddings)
+
+    def test_unknown_provider(self):
+        """Test that an unknown provider name is rejected."""
+        with pytest.raises(ValueError):
+            create_embeddings(SimpleNamespace(embedding_provider="bogus"))
@@ -0,0 +1,129 @@
+"""
+Tests for incremental re-indexing fingerprints.
+"""
+
+from src.embeddings import HashingEmbeddings
+from src.ingestion.fingerprints import FingerprintRegistry, apply_index_plan
+from src.ingestion.pipeline import IngestedChunk, IngestedDocument
+from src.metadata_index import MetadataIndex
+from src.quantization import QuantizedVectorIndex
+
+
+def make_document(name, chunk_texts):
+    """Build a document whose chunk ids are derived from its name."""
+    return IngestedDocument(
+        content=" ".join(chunk_texts),
+        metadata={"file_name": name},
+        chunks=[IngestedChunk(chunk_id=f"{name}-{t}", content=t) for t in chunk_texts]
+    )
+
+
+class TestFingerprintRegistry:
+    """Test cases for FingerprintRegistry."""
+
+    def test_first_build_adds_everything(self):
+        """Test that an empty registry indexes every chunk."""
+        registry = FingerprintRegistry()
+        plan = registry.plan([make_document("a.txt", ["one", "two"])])
+
+        assert plan.chunks_to_add == 2
+        assert plan.chunk_ids_to_remove == []
+
+    def test_rebuild_is_a_no_op(self):
+        """Test that re-adding the same documents embeds nothing."""
+        registry = FingerprintRegistry()
+        docs = [make_document("a.txt", ["one", "two"])]
+        registry.commit(registry.plan(docs))
+
+        plan = registry.plan(docs)
+
+        assert not plan.has_changes
+        assert plan.unchanged_documents == ["a.txt"]
+
+    def test_changed_document_only_adds_new_chunks(self):
+        """Test that a changed document adds new chunks and tombstones old ones."""
+        registry = FingerprintRegistry()
+        registry.commit(registry.plan([make_document("a.txt", ["one", "two"])]))
+
+        plan = registry.plan([make_document("a.txt", ["one", "three"])])
+        registry.commit(plan)
+
+        assert [c.content for c in plan.documents_to_add[0].chunks] == ["three"]
+        assert plan.chunk_ids_to_remove == ["a.txt-two"]
+        assert registry.is_tombstoned("a.txt-two")
+        assert not registry.is_tombstoned("a.txt-one")
+
+    def test_remove_missing_documents(self):
+        """Test that documents absent from the set are removed on request."""
+        registry = FingerprintRegistry()
+        registry.commit(registry.plan([
+            make_document("a.txt", ["one"]),
+            make_document("b.txt", ["two"]),
+        ]))
+
+        kept = registry.plan([make_document("a.txt", ["one"])])
+        assert kept.chunk_ids_to_remove == []
+
+        plan = registry.plan([make_document("a.txt", ["one"])], remove_missing=True)
+        registry.commit(plan)
+
+        assert plan.removed_documents == ["b.txt"]
+        assert registry.get_stats()["indexed_documents"] == 1
+
+    def test_filter_results_and_version(self):
+        """Test result filtering and the change counter."""
+        registry = FingerprintRegistry()
+        registry.commit(registry.plan([make_document("a.txt", ["one", "two"])]))
+        version = registry.version
+        registry.commit(registry.plan([make_document("a.txt", ["one"])]))
+
+        results = [{"chunk_id": "a.txt-one"}, {"chunk_id": "a.txt-two"}]
+
+        assert registry.filter_results(results) == [{"chunk_id": "a.txt-one"}]
+        assert registry.version == version + 1
+
+
+class TestApplyIndexPlan:
+    """Test cases for apply_index_plan."""
+
+    def test_reupload_deletes_old_chunks_from_vector_store(self):
+        """Test that dense search stops returning changed chunks and tombstones are cleared."""
+        registry = FingerprintRegistry()
+        embedder = HashingEmbeddings(dimensions=64)
+        store = QuantizedVectorIndex(embedder=embedder)
+        indexed = []
+
+        apply_index_plan(registry.plan([make_document("a.txt", ["red apples", "green pears"])]), registry, store)
+        plan = registry.plan([make_document("a.txt", ["red apples", "yellow bananas"])])
+        apply_index_plan(plan, registry, store, on_indexed=lambda docs, removed, refreshed: indexed.append(removed))
+
+        results = store.search(embedder.embed_query("green pears"), top_k=5, similarity_threshold=-1.0)
+
+        assert "a.txt-green pears" not in {r["chunk_id"] for r in results}
+        assert len(store) == 2
+        assert indexed == [["a.txt-green pears"]]
+        assert registry.tombstone_count == 0
+
+    def test_reupload_refreshes_metadata_of_kept_chunks(self):
+        """Test that every live chunk of a changed document carries the new document_id."""
+        registry = FingerprintRegistry()
+        store = QuantizedVectorIndex(embedder=HashingEmbeddings(dimensions=64))
+        index = MetadataIndex()
+
+        def on_indexed(added, removed, refreshed):
+            index.remove_many(removed)
+            for document in added + refreshed:
+                index.add_document(document)
+
+        def upload(document_id, texts):
+            document = make_document("a.txt", texts)
+            document.metadata["document_id"] = document_id
+            for chunk in document.chunks:
+                chunk.metadata = {"document_id": document_id}
+            apply_index_plan(registry.plan([document]), registry, store, on_indexed=on_indexed)
+
+        upload("v1", ["one", "two", "three", "four"])
+        upload("v2", ["one", "two", "three", "five"])
+
+        assert index.resolve({"document_id": "v2"}) == {"a.txt-one", "a.txt-two", "a.txt-three", "a.txt-five"}
+        assert index.resolve({"document_id": "v1"}) == set()
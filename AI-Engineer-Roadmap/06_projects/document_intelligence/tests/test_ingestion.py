@@ -0,0 +1,100 @@
+"""
+Tests for the parallel ingestion pipeline.
+"""
+
+import pytest
+
+from src.ingestion.extractors import iter_pages, UnsupportedDocumentError
+from src.ingestion.pipeline import process_upload, ingest_uploads
+
+
+class TestProcessUploadChunking:
+    """Test cases for chunking an upload through the streaming path."""
+
+    def test_short_text_single_chunk(self):
+        """Test that text shorter than a chunk is returned whole."""
+        doc = process_upload("note.txt", b"Hello world.", chunk_size=100, chunk_overlap=10)
+
+        assert [chunk.content for chunk in doc.chunks] == ["Hello world."]
+
+    def test_chunks_respect_size_and_sentences(self):
+        """Test chunk length bounds and sentence boundaries."""
+        text = " ".join(f"Sentence number {i}." for i in range(200))
+        doc = process_upload("long.txt", text.encode("utf-8"), chunk_size=200, chunk_overlap=50)
+
+        assert len(doc.chunks) > 1
+        assert all(len(chunk.content) <= 200 for chunk in doc.chunks)
+        assert all(chunk.content.endswith(".") for chunk in doc.chunks)
+
+    def test_invalid_overlap(self):
+        """Test that an overlap as large as the chunk is rejected."""
+        with pytest.raises(ValueError):
+            process_upload("note.txt", b"text", chunk_size=10, chunk_overlap=10)
+
+
+class TestIterPages:
+    """Test cases for in-memory extraction."""
+
+    def test_text_file(self):
+        """Test plain text decoding and metadata."""
+        metadata, pages = iter_pages("notes.txt", "héllo\n\nwörld".encode("utf-8"))
+
+        assert [text.strip() for _, text in pages] == ["héllo", "wörld"]
+        assert metadata["title"] == "notes"
+        assert metadata["type"] == "txt"
+
+    def test_unsupported_type(self):
+        """Test that unknown extensions are rejected."""
+        with pytest.raises(UnsupportedDocumentError):
+            iter_pages("image.png", b"\x89PNG")
+
+
+class TestIngestUploads:
+    """Test cases for ingest_uploads."""
+
+    def test_process_upload_chunks(self):
+        """Test that one upload produces identified chunks."""
+        doc = process_upload("readme.md", b"# Title\n\nSome content here.", chunk_size=100, chunk_overlap=10)
+
+        assert doc.metadata["type"] == "md"
+        assert doc.chunks[0].chunk_id.startswith(doc.metadata["document_id"])
+
+    def test_same_bytes_under_two_names(self):
+        """Test that identical bytes uploaded under different names get distinct ids."""
+        first = process_upload("a.txt", b"same content", chunk_size=100, chunk_overlap=10)
+        second = process_upload("b.txt", b"same content", chunk_size=100, chunk_overlap=10)
+        again = process_upload("a.txt", b"same content", chunk_size=100, chunk_overlap=10)
+
+        assert first.metadata["document_id"] != second.metadata["document_id"]
+        assert not {c.chunk_id for c in first.chunks} & {c.chunk_id for c in second.chunks}
+        assert again.metadata["document_id"] == first.metadata["document_id"]
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_errors_for_duplicate_names(self, max_workers):
+        """Test that failed uploads sharing a name each keep their error."""
+        uploads = [("bad.xyz", b"one"), ("ok.txt", b"fine"), ("bad.xyz", b"two")]
+
+        result = ingest_uploads(uploads, max_workers=max_workers)
+
+        assert sorted(result.errors) == [0, 2]
+        assert len(result.documents) == 1
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_results_in_upload_order(self, max_workers):
+        """Test ordering, error collection and progress reporting."""
+        uploads = [
+            ("a.txt", b"first document"),
+            ("bad.xyz", b"???"),
+            ("b.md", b"second document"),
+        ]
+        progress = []
+
+        result = ingest_uploads(
+            uploads,
+            max_workers=max_workers,
+            progress_callback=lambda done, total, name: progress.append((done, total))
+        )
+
+        assert [doc.metadata["file_name"] for doc in result.documents] == ["a.txt", "b.md"]
+        assert list(result.errors) == [1]
+        assert sorted(progress) == [(1, 3), (2, 3), (3, 3)]
@@ -0,0 +1,77 @@
+"""
+Tests for the BM25 lexical index and rank fusion.
+"""
+
+from src.lexical_index import BM25Index, tokenize, reciprocal_rank_fusion
+
+
+class TestTokenize:
+    """Test cases for tokenize."""
+
+    def test_identifiers_kept_whole_and_split(self):
+        """Test that compound identifiers are indexed whole and by part."""
+        tokens = tokenize("Error ERR-404 in v2.1")
+
+        assert "err-404" in tokens
+        assert "404" in tokens
+        assert "v2.1" in tokens
+
+
+class TestBM25Index:
+    """Test cases for BM25Index."""
+
+    def build_index(self):
+        index = BM25Index()
+        index.add("c1", "The pump failed with error code ERR-404 during startup.")
+        index.add("c2", "Routine maintenance schedule for the cooling pump.")
+        index.add("c3", "Part number PN-7731 replaces the old valve assembly.")
+        return index
+
+    def test_exact_identifier_ranks_first(self):
+        """Test that an exact code finds its chunk."""
+        results = self.build_index().search("what does ERR-404 mean", top_k=2)
+
+        assert results[0]["chunk_id"] == "c1"
+        assert results[0]["bm25_score"] > 0
+
+    def test_no_match(self):
+        """Test that unrelated queries return nothing."""
+        assert self.build_index().search("banana", top_k=5) == []
+
+    def test_remove_and_replace(self):
+        """Test tombstoning and re-adding a chunk."""
+        index = self.build_index()
+        index.remove("c3")
+
+        assert index.search("PN-7731") == []
+        assert len(index) == 2
+
+        index.add("c1", "New text about PN-7731")
+        assert [r["chunk_id"] for r in index.search("PN-7731")] == ["c1"]
+        assert index.search("ERR-404") == []
+
+    def test_compaction_preserves_results(self):
+        """Test that compaction keeps live chunks searchable."""
+        index = self.build_index()
+        index.remove("c2")
+        index.compact()
+
+        assert index.get_stats()["tombstoned_chunks"] == 0
+        assert index.search("ERR-404")[0]["chunk_id"] == "c1"
+        assert index.candidates("valve", limit=5) == {"c3"}
+
+
+class TestReciprocalRankFusion:
+    """Test cases for reciprocal_rank_fusion."""
+
+    def test_items_in_both_lists_rank_first(self):
+        """Test that agreement between rankings wins."""
+        dense = [{"chunk_id": "a", "similarity": 0.9}, {"chunk_id": "b", "similarity": 0.8}]
+        lexical = [{"chunk_id": "b", "bm25_score": 3.0}, {"chunk_id": "c", "bm25_score": 1.0}]
+
+        fused = reciprocal_rank_fusion([dense, lexical], top_k=3)
+
+        assert [r["chunk_id"] for r in fused] == ["b", "a", "c"]
+        assert fused[0]["similarity"] == 0.8
+        assert fused[0]["bm25_score"] == 3.0
+        assert fused[2]["similarity"] == 0.0
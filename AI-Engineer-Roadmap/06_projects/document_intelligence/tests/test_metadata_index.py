@@ -0,0 +1,82 @@
+"""
+Tests for the metadata pre-filter index.
+"""
+
+import pytest
+
+from src.metadata_index import MetadataIndex, FilterError, filter_key
+
+
+@pytest.fixture
+def index():
+    """Index with three documents of mixed types and dates."""
+    index = MetadataIndex()
+    index.add("a-0", {"document_id": "a", "type": "pdf", "ingested_at": "2024-01-05", "pages": 3})
+    index.add("a-1", {"document_id": "a", "type": "pdf", "ingested_at": "2024-01-05", "pages": 3})
+    index.add("b-0", {"document_id": "b", "type": "docx", "ingested_at": "2024-02-10"})
+    index.add("c-0", {"document_id": "c", "type": "md", "ingested_at": "2024-03-15"})
+    return index
+
+
+class TestMetadataIndex:
+    """Test cases for MetadataIndex."""
+
+    def test_equality(self, index):
+        """Test a plain equality filter."""
+        assert index.resolve({"document_id": "a"}) == {"a-0", "a-1"}
+
+    def test_in_and_ne(self, index):
+        """Test set membership and negation."""
+        assert index.resolve({"type": {"$in": ["docx", "md"]}}) == {"b-0", "c-0"}
+        assert index.resolve({"type": {"$ne": "pdf"}}) == {"b-0", "c-0"}
+
+    def test_date_range(self, index):
+        """Test range operators on an ISO date field."""
+        result = index.resolve({"ingested_at": {"$gte": "2024-02-01", "$lt": "2024-03-01"}})
+
+        assert result == {"b-0"}
+
+    def test_range_bounds_are_inclusive_or_exclusive(self, index):
+        """Test inclusive and exclusive bounds on the same value."""
+        assert index.resolve({"ingested_at": {"$gte": "2024-01-05"}}) == {"a-0", "a-1", "b-0", "c-0"}
+        assert index.resolve({"ingested_at": {"$gt": "2024-01-05"}}) == {"b-0", "c-0"}
+        assert index.resolve({"pages": 3}) == {"a-0", "a-1"}
+
+    def test_boolean_combinators(self, index):
+        """Test $and, $or and $not."""
+        assert index.resolve({"$or": [{"document_id": "b"}, {"type": "md"}]}) == {"b-0", "c-0"}
+        assert index.resolve({"$and": [{"type": "pdf"}, {"document_id": "b"}]}) == set()
+        assert index.resolve({"$not": {"type": "pdf"}}) == {"b-0", "c-0"}
+
+    def test_removed_chunks_do_not_match(self, index):
+        """Test that removal clears a chunk from every bitmap."""
+        index.remove("a-0")
+
+        assert index.resolve({"document_id": "a"}) == {"a-1"}
+        assert index.resolve({"ingested_at": {"$lte": "2024-01-31"}}) == {"a-1"}
+        assert index.count({"type": {"$ne": "md"}}) == 2
+
+    def test_unindexed_field(self, index):
+        """Test that filtering on an unindexed field is rejected."""
+        with pytest.raises(FilterError):
+            index.resolve({"author": "someone"})
+
+    def test_unknown_operator(self, index):
+        """Test that unknown operators are rejected."""
+        with pytest.raises(FilterError):
+            index.resolve({"type": {"$regex": "p.*"}})
+
+    def test_filter_key_is_canonical(self):
+        """Test that key order does not change the cache key."""
+        assert filter_key({"a": 1, "b": 2}) == filter_key({"b": 2, "a": 1})
+        assert filter_key(None) is None
+
+    def test_removed_slots_are_reused(self, index):
+        """Test that re-adding after removals keeps bitmaps as wide as the live index."""
+        for round_ in range(50):
+            index.remove("c-0")
+            index.add("c-0", {"document_id": "c", "type": "md", "ingested_at": f"2024-03-{round_ % 28 + 1:02d}"})
+
+        assert index.resolve({"document_id": "c"}) == {"c-0"}
+        assert index.count({"type": {"$in": ["pdf", "md"]}}) == 3
+        assert index._live.bit_length() == 4
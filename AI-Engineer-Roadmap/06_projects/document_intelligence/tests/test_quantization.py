@@ -0,0 +1,180 @@
+"""
+Tests for quantized vector storage.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.embeddings import HashingEmbeddings
+from src.quantization import (
+    ScalarQuantizer,
+    ProductQuantizer,
+    QuantizedVectorIndex,
+    normalize_rows
+)
+
+
+def make_vectors(count=600, dimensions=32, seed=0):
+    """Build clustered unit vectors that resemble text embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(12, dimensions))
+    labels = rng.integers(len(centers), size=count)
+    return normalize_rows(centers[labels] + 0.4 * rng.normal(size=(count, dimensions))).astype(np.float32)
+
+
+def build_index(vectors, **kwargs):
+    """Fill an index with one payload per vector."""
+    index = QuantizedVectorIndex(**kwargs)
+    ids = [f"c{i}" for i in range(len(vectors))]
+    index.add(ids, vectors, [{"chunk_id": cid, "chunk_text": cid} for cid in ids])
+    return index
+
+
+def make_document(document_id, texts, doc_type="txt"):
+    """Build a processed document with one chunk per text."""
+    metadata = {"document_id": document_id, "title": document_id, "type": doc_type}
+    chunks = [
+        SimpleNamespace(chunk_id=f"{document_id}-{i}", content=text, metadata=metadata)
+        for i, text in enumerate(texts)
+    ]
+    return SimpleNamespace(metadata=metadata, chunks=chunks)
+
+
+class TestQuantizers:
+    """Test cases for the quantizers."""
+
+    def test_scalar_round_trip(self):
+        """Test that int8 reconstruction error is small."""
+        vectors = make_vectors()
+        quantizer = ScalarQuantizer()
+        quantizer.fit(vectors)
+
+        codes = quantizer.encode(vectors)
+
+        assert codes.dtype == np.uint8
+        assert np.abs(quantizer.decode(codes) - vectors).max() < 0.01
+
+    def test_product_scores_match_decoded_vectors(self):
+        """Test that lookup-table scoring equals scoring the reconstructions."""
+        vectors = make_vectors()
+        quantizer = ProductQuantizer(subspaces=8, iterations=5)
+        quantizer.fit(vectors)
+        codes = quantizer.encode(vectors)
+
+        assert codes.shape == (len(vectors), 8)
+        np.testing.assert_allclose(
+            quantizer.score(codes, vectors[0]),
+            quantizer.decode(codes) @ vectors[0],
+            atol=1e-4
+        )
+
+
+class TestQuantizedVectorIndex:
+    """Test cases for QuantizedVectorIndex."""
+
+    @pytest.mark.parametrize("method", ["int8", "pq"])
+    def test_recall_against_exact_search(self, method):
+        """Test that re-ranked results match exact float32 search."""
+        vectors = make_vectors()
+        index = build_index(vectors, method=method, pq_subspaces=8, train_size=256)
+        queries = make_vectors(count=20, seed=1)
+
+        hits = 0
+        for query in queries:
+            exact = {f"c{i}" for i in np.argsort(-(vectors @ query))[:5]}
+            found = {r["chunk_id"] for r in index.search(query, top_k=5)}
+            hits += len(exact & found)
+
+        assert index.quantizer.trained
+        assert hits / (5 * len(queries)) >= 0.9
+
+    def test_memory_is_reduced(self):
+        """Test that resident memory shrinks by the code size."""
+        index = build_index(make_vectors(), method="int8", train_size=100)
+
+        assert index.memory_usage()["compression_ratio"] == pytest.approx(4.0)
+        assert index.get_stats()["total_chunks"] == 600
+
+    def test_candidates_and_removal(self):
+        """Test candidate restriction, removal and the similarity threshold."""
+        vectors = make_vectors(count=50)
+        index = build_index(vectors, method="int8", train_size=10)
+        index.remove(["c0"])
+
+        results = index.search(vectors[0], top_k=5, candidate_ids={"c0", "c1", "c2"})
+        assert {r["chunk_id"] for r in results} <= {"c1", "c2"}
+
+        assert index.search(vectors[1], top_k=5, similarity_threshold=1.1) == []
+
+    def test_exact_search_before_training(self):
+        """Test that search works before the quantizer has enough data."""
+        vectors = make_vectors(count=10)
+        index = build_index(vectors, method="pq", pq_subspaces=8)
+
+        assert not index.quantizer.trained
+        assert index.search(vectors[3], top_k=1)[0]["chunk_id"] == "c3"
+
+    def test_file_backed_store_grows_in_place(self, tmp_path):
+        """Test that growing a memory-mapped float store keeps earlier rows."""
+        path = tmp_path / "floats.bin"
+        vectors = make_vectors(count=3000)
+        index = QuantizedVectorIndex(method="int8", train_size=100, float_store_path=str(path))
+        for start in range(0, len(vectors), 500):
+            ids = [f"c{i}" for i in range(start, start + 500)]
+            index.add(ids, vectors[start:start + 500], [{"chunk_id": cid} for cid in ids])
+
+        stored = index._floats.all()
+        assert len(stored) == 3000
+        assert np.allclose(stored[:1000], vectors[:1000], atol=1e-6)
+        assert path.stat().st_size >= 3000 * 32 * 4
+
+    @pytest.mark.parametrize("train_size", [100, 10000])
+    def test_removal_compacts_storage(self, tmp_path, train_size):
+        """Test that removed rows are reclaimed and search still finds the survivors."""
+        vectors = make_vectors(count=400)
+        index = QuantizedVectorIndex(
+            method="int8", train_size=train_size, float_store_path=str(tmp_path / "floats.bin")
+        )
+        ids = [f"c{i}" for i in range(len(vectors))]
+        index.add(ids, vectors, [{"chunk_id": cid, "chunk_text": cid} for cid in ids])
+
+        index.remove(ids[:300:2])
+        assert len(index._ids) == 250
+        assert len(index._floats) == 250
+        if index.quantizer.trained:
+            assert len(index._codes) == 250
+        assert len(index) == 250
+
+        assert index.search(vectors[1], top_k=1)[0]["chunk_id"] == "c1"
+        assert index.search(vectors[399], top_k=1)[0]["chunk_id"] == "c399"
+        assert index.search(vectors[0], top_k=1, candidate_ids={"c0"}) == []
+        assert np.allclose(index._floats.all()[0], vectors[1], atol=1e-6)
+
+    def test_few_removals_do_not_compact(self):
+        """Test that compaction waits until enough rows are dead."""
+        index = build_index(make_vectors(count=100), method="int8", train_size=10000)
+
+        index.remove(["c0", "c1"])
+
+        assert len(index._ids) == 100
+        assert len(index) == 98
+
+    def test_document_counts_follow_live_chunks(self):
+        """Test that documents stop counting once their last chunk is removed."""
+        index = QuantizedVectorIndex(embedder=HashingEmbeddings(dimensions=32))
+        index.add_document(make_document("a", ["alpha one", "alpha two"]))
+        index.add_document(make_document("b", ["beta one"], doc_type="pdf"))
+        assert index.get_stats()["total_documents"] == 2
+
+        index.remove(["a-0"])
+        assert index.get_stats()["total_documents"] == 2
+
+        # A re-upload gets a new document id and replaces every old chunk
+        index.remove(["a-1"])
+        index.add_document(make_document("a2", ["alpha one", "alpha two"]))
+        stats = index.get_stats()
+        assert stats["total_documents"] == 2
+        assert stats["document_breakdown"] == {"txt": 1, "pdf": 1}
+        assert stats["total_chunks"] == 3
@@ -0,0 +1,232 @@
+"""
+Tests for RAGSystem query modes with offline embedding and LLM backends.
+"""
+
+import asyncio
+import re
+import threading
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+pytest.importorskip("langchain_openai")
+rag_system = pytest.importorskip("src.rag_system")
+
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from src.embeddings import HashingEmbeddings
+from src.ingestion.pipeline import process_upload
+from src.quantization import QuantizedVectorIndex
+
+
+ANSWER = "Refunds are issued within 14 days."
+
+DOCUMENTS = {
+    "refunds.txt": "Refunds are issued within 14 days of a return reaching our warehouse.",
+    "shipping.txt": "Shipping to Europe takes five to seven business days.",
+    "passwords.txt": "Passwords must be at least twelve characters long."
+}
+
+SETTINGS = {
+    "openai_model": "gpt-3.5-turbo",
+    "openai_api_key": "unused",
+    "embedding_provider": "hashing",
+    "temperature": 0.0,
+    "max_tokens": 500,
+    "retrieval_mode": "dense",
+    "enable_answer_cache": True,
+    "cache_similarity_threshold": 0.95
+}
+
+
+def build_system(llm):
+    """Index the test documents behind a RAGSystem using the given chat model."""
+    embeddings = HashingEmbeddings()
+    vector_store = QuantizedVectorIndex(embedder=embeddings)
+    system = rag_system.RAGSystem(
+        SimpleNamespace(**SETTINGS), vector_store, embeddings=embeddings, llm=llm
+    )
+
+    documents = [process_upload(name, text.encode("utf-8"), 200, 0) for name, text in DOCUMENTS.items()]
+    for document in documents:
+        vector_store.add_document(document)
+    system.index_documents(documents)
+    return system
+
+
+class EchoChatModel(SimpleChatModel):
+    """Chat model that answers by repeating the question in its prompt."""
+
+    fail_on: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def _call(self, messages: Any, *args: Any, **kwargs: Any) -> str:
+        question = re.search(r"Question: (.*)", messages[-1].content).group(1).strip()
+        if self.fail_on and self.fail_on in question:
+            raise RuntimeError(f"cannot answer {question}")
+        return f"Answer to: {question}"
+
+
+async def collect(events):
+    """Drain an async event stream into a list."""
+    return [event async for event in events]
+
+
+@pytest.fixture
+def system():
+    """RAGSystem answering every question with ANSWER."""
+    return build_system(FakeListChatModel(responses=[ANSWER]))
+
+
+class TestQueryStream:
+    """Test cases for query_stream and aquery_stream."""
+
+    @pytest.mark.parametrize("mode", ["sync", "async"])
+    def test_event_order(self, system, mode):
+        """Test that sources come first, tokens spell the answer in order and done comes last."""
+        question = "when are refunds issued"
+        if mode == "sync":
+            events = list(system.query_stream(question, similarity_threshold=0.0))
+        else:
+            events = asyncio.run(collect(system.aquery_stream(question, similarity_threshold=0.0)))
+
+        types = [event["type"] for event in events]
+        assert types[0] == "sources"
+        assert types[-1] == "done"
+        assert set(types[1:-1]) == {"token"}
+        assert len(types) > 3
+
+        tokens = "".join(event["content"] for event in events[1:-1])
+        assert tokens == ANSWER
+        assert events[-1]["answer"] == ANSWER
+        assert events[-1]["cache_hit"] is False
+        assert events[-1]["time_to_first_token"] is not None
+
+    @pytest.mark.parametrize("mode", ["sync", "async"])
+    def test_final_sources_match_retrieval(self, system, mode):
+        """Test that the done event carries the sources announced up front."""
+        question = "when are refunds issued"
+        if mode == "sync":
+            events = list(system.query_stream(question, max_results=2, similarity_threshold=0.0))
+        else:
+            events = asyncio.run(collect(
+                system.aquery_stream(question, max_results=2, similarity_threshold=0.0)
+            ))
+
+        sources, done = events[0]["sources"], events[-1]["sources"]
+        assert sources
+        assert len(done) <= 2
+        assert [s["chunk_id"] for s in done] == [s["chunk_id"] for s in sources]
+        assert done[0]["metadata"]["file_name"] == "refunds.txt"
+
+    @pytest.mark.parametrize("mode", ["sync", "async"])
+    def test_stream_fills_answer_cache(self, system, mode):
+        """Test that a streamed answer is cached and replayed as a single token."""
+        question = "when are refunds issued"
+        if mode == "sync":
+            list(system.query_stream(question, similarity_threshold=0.0))
+            replay = list(system.query_stream(question, similarity_threshold=0.0))
+        else:
+            asyncio.run(collect(system.aquery_stream(question, similarity_threshold=0.0)))
+            replay = asyncio.run(collect(system.aquery_stream(question, similarity_threshold=0.0)))
+
+        assert system.answer_cache.get_stats()["entries"] == 1
+        assert [event["type"] for event in replay] == ["sources", "token", "done"]
+        assert replay[0]["cache_hit"] is True
+        assert replay[1]["content"] == ANSWER
+        assert replay[-1]["cache_hit"] is True
+
+    def test_generation_failure_is_an_error_event(self):
+        """Test that an LLM failure mid-stream ends with an error event."""
+        system = build_system(FakeListChatModel(responses=[ANSWER], error_on_chunk_number=3))
+
+        events = list(system.query_stream("when are refunds issued", similarity_threshold=0.0))
+
+        assert events[0]["type"] == "sources"
+        assert events[-1]["type"] == "error"
+        assert system.answer_cache.get_stats()["entries"] == 0
+
+
+class TestQueryModes:
+    """Test cases for aquery, batch_query, abatch_query and _chain_for."""
+
+    QUESTIONS = ["when are refunds issued", "shipping to europe", "passwords characters"]
+
+    def test_aquery_matches_query(self):
+        """Test that aquery answers like query and fills the answer cache."""
+        system = build_system(EchoChatModel())
+
+        result = asyncio.run(system.aquery("when are refunds issued", similarity_threshold=0.0))
+
+        assert result["answer"] == "Answer to: when are refunds issued"
+        assert result["sources"][0]["metadata"]["file_name"] == "refunds.txt"
+        assert result["cache_hit"] is False
+        assert system.query("when are refunds issued", similarity_threshold=0.0)["cache_hit"] is True
+
+    @pytest.mark.parametrize("mode", ["sync", "async"])
+    def test_batch_keeps_question_order(self, mode):
+        """Test that batched answers come back in question order."""
+        system = build_system(EchoChatModel())
+        system.max_concurrency = 3
+
+        if mode == "sync":
+            results = system.batch_query(self.QUESTIONS, similarity_threshold=0.0)
+        else:
+            results = asyncio.run(system.abatch_query(self.QUESTIONS, similarity_threshold=0.0))
+
+        assert [r["answer"] for r in results] == [f"Answer to: {q}" for q in self.QUESTIONS]
+        assert [r["sources"][0]["metadata"]["file_name"] for r in results] == [
+            "refunds.txt", "shipping.txt", "passwords.txt"
+        ]
+
+    @pytest.mark.parametrize("mode", ["sync", "async"])
+    def test_batch_isolates_failures(self, mode):
+        """Test that one failed generation does not affect the rest of the batch."""
+        system = build_system(EchoChatModel(fail_on="shipping"))
+
+        if mode == "sync":
+            results = system.batch_query(self.QUESTIONS, similarity_threshold=0.0)
+        else:
+            results = asyncio.run(system.abatch_query(self.QUESTIONS, similarity_threshold=0.0))
+
+        assert results[0]["answer"] == "Answer to: when are refunds issued"
+        assert results[1]["answer"].startswith("I encountered an error while processing your question")
+        assert "cannot answer shipping to europe" in results[1]["answer"]
+        assert results[2]["answer"] == "Answer to: passwords characters"
+        # Only the successful answers are cached
+        assert system.answer_cache.get_stats()["entries"] == 2
+
+    def test_batch_serves_cached_questions(self):
+        """Test that a batch mixes cached and generated answers."""
+        system = build_system(EchoChatModel())
+        system.query(self.QUESTIONS[1], similarity_threshold=0.0)
+
+        results = system.batch_query(self.QUESTIONS, similarity_threshold=0.0)
+
+        assert [r["cache_hit"] for r in results] == [False, True, False]
+        assert results[1]["answer"] == "Answer to: shipping to europe"
+
+    def test_concurrent_chain_for_shares_one_chain(self):
+        """Test that threads asking for the same parameters get the same cached chain."""
+        system = build_system(EchoChatModel())
+        barrier = threading.Barrier(8)
+        chains = []
+
+        def worker():
+            barrier.wait()
+            chains.append(system._chain_for(0.3, 200))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(chains) == 8
+        assert all(chain is chains[0] for chain in chains)
+        assert system._chain_for(0.3, 100) is not chains[0]
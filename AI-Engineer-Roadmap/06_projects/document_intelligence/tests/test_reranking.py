@@ -0,0 +1,84 @@
+"""
+Tests for second-stage re-ranking.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.reranking import Reranker, LexicalReranker, create_reranker
+
+
+class CountingReranker(Reranker):
+    """Re-ranker that scores by text length and records its batches."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def score_pairs(self, question, texts):
+        self.batches.append(len(texts))
+        return [float(len(text)) for text in texts]
+
+
+def make_chunk(chunk_id, text, similarity=0.5):
+    """Build a chunk in the vector store result format."""
+    return {"chunk_id": chunk_id, "chunk_text": text, "similarity": similarity}
+
+
+class TestReranker:
+    """Test cases for the Reranker base class."""
+
+    def test_keeps_best_in_batches(self):
+        """Test batching, ordering and truncation."""
+        reranker = CountingReranker(batch_size=2)
+        chunks = [make_chunk(str(i), "x" * i) for i in range(1, 6)]
+
+        result = reranker.rerank("question", chunks, top_n=2)
+
+        assert [c["chunk_id"] for c in result] == ["5", "4"]
+        assert reranker.batches == [2, 2, 1]
+        assert "rerank_score" not in chunks[0]
+
+    def test_pairs_are_cached(self):
+        """Test that repeated (question, chunk) pairs are not rescored."""
+        reranker = CountingReranker()
+        chunks = [make_chunk("a", "alpha"), make_chunk("b", "beta")]
+
+        reranker.rerank("What is it?", chunks, top_n=2)
+        reranker.rerank("what is  it?", chunks + [make_chunk("c", "gamma")], top_n=2)
+
+        assert reranker.batches == [2, 1]
+        assert reranker.get_stats()["cache_hits"] == 2
+
+
+class TestLexicalReranker:
+    """Test cases for LexicalReranker."""
+
+    def test_prefers_chunks_covering_the_question(self):
+        """Test that coverage of the question's content words wins."""
+        chunks = [
+            make_chunk("off", "Shipping is free for orders over fifty dollars.", similarity=0.8),
+            make_chunk("on", "Refunds are issued within five business days of the return.", similarity=0.7),
+        ]
+
+        result = LexicalReranker().rerank("When are refunds issued?", chunks, top_n=1)
+
+        assert result[0]["chunk_id"] == "on"
+
+
+class TestCreateReranker:
+    """Test cases for create_reranker."""
+
+    def test_disabled_by_default(self):
+        """Test that no re-ranker is created unless configured."""
+        assert create_reranker(SimpleNamespace()) is None
+
+    def test_lexical(self):
+        """Test selecting the lexical re-ranker."""
+        assert isinstance(create_reranker(SimpleNamespace(reranker="lexical")), LexicalReranker)
+
+    def test_unknown(self):
+        """Test that an unknown re-ranker is rejected."""
+        with pytest.raises(ValueError):
+            create_reranker(SimpleNamespace(reranker="bogus"))
@@ -0,0 +1,79 @@
+"""
+Tests for the semantic answer cache.
+"""
+
+import pytest
+
+from src.semantic_cache import SemanticCache
+
+
+PARAMS = (5, 0.7, 0.7, 500)
+
+
+class TestSemanticCache:
+    """Test cases for SemanticCache."""
+
+    def test_hit_on_near_duplicate(self):
+        """Test that a close embedding with the same parameters hits."""
+        cache = SemanticCache(similarity_threshold=0.95)
+        cache.store([1.0, 0.0, 0.0], PARAMS, {"answer": "42"}, store_version=1)
+
+        result = cache.lookup([0.99, 0.05, 0.0], PARAMS, store_version=1)
+
+        assert result is not None
+        assert result["answer"] == "42"
+        assert result["cache_similarity"] > 0.95
+
+    def test_miss_below_threshold(self):
+        """Test that a dissimilar embedding misses."""
+        cache = SemanticCache(similarity_threshold=0.95)
+        cache.store([1.0, 0.0, 0.0], PARAMS, {"answer": "42"}, store_version=1)
+
+        assert cache.lookup([0.0, 1.0, 0.0], PARAMS, store_version=1) is None
+
+    def test_miss_on_different_parameters(self):
+        """Test that retrieval parameters partition the cache."""
+        cache = SemanticCache()
+        cache.store([1.0, 0.0], PARAMS, {"answer": "42"}, store_version=1)
+
+        assert cache.lookup([1.0, 0.0], (3, 0.7, 0.7, 500), store_version=1) is None
+
+    def test_store_version_change_invalidates(self):
+        """Test that a vector store change drops every entry."""
+        cache = SemanticCache()
+        cache.store([1.0, 0.0], PARAMS, {"answer": "42"}, store_version=1)
+
+        assert cache.lookup([1.0, 0.0], PARAMS, store_version=2) is None
+        assert cache.get_stats()["entries"] == 0
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        cache = SemanticCache(max_entries=2)
+        cache.store([1.0, 0.0, 0.0], PARAMS, {"answer": "a"})
+        cache.store([0.0, 1.0, 0.0], PARAMS, {"answer": "b"})
+
+        # Touch "a" so "b" becomes the eviction candidate
+        assert cache.lookup([1.0, 0.0, 0.0], PARAMS) is not None
+        cache.store([0.0, 0.0, 1.0], PARAMS, {"answer": "c"})
+
+        assert cache.lookup([1.0, 0.0, 0.0], PARAMS)["answer"] == "a"
+        assert cache.lookup([0.0, 1.0, 0.0], PARAMS) is None
+        assert cache.lookup([0.0, 0.0, 1.0], PARAMS)["answer"] == "c"
+
+    def test_stats_track_hits_and_misses(self):
+        """Test hit and miss accounting."""
+        cache = SemanticCache()
+        cache.store([1.0, 0.0], PARAMS, {"answer": "42"})
+        cache.lookup([1.0, 0.0], PARAMS)
+        cache.lookup([0.0, 1.0], PARAMS)
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(0.5)
+
+    @pytest.mark.parametrize("threshold", [0.0, 1.5])
+    def test_invalid_threshold(self, threshold):
+        """Test that out-of-range thresholds are rejected."""
+        with pytest.raises(ValueError):
+            SemanticCache(similarity_threshold=threshold)
@@ -0,0 +1,110 @@
+"""
+Tests for the sharded multi-process vector store.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.embeddings import HashingEmbeddings
+from src.quantization import normalize_rows
+from src.sharded_store import ShardedVectorStore
+
+
+@pytest.fixture
+def vectors():
+    """Random unit vectors."""
+    return normalize_rows(np.random.default_rng(0).normal(size=(300, 16))).astype(np.float32)
+
+
+@pytest.fixture(params=[10 ** 9, 0], ids=["inline", "processes"])
+def store(request, vectors):
+    """Store with three shards, searched inline or in worker processes."""
+    store = ShardedVectorStore(num_shards=3, parallel_threshold=request.param)
+    ids = [f"c{i}" for i in range(len(vectors))]
+    store.add(ids, vectors, [{"chunk_id": cid, "chunk_text": cid} for cid in ids])
+    yield store
+    store.close()
+
+
+class TestShardedVectorStore:
+    """Test cases for ShardedVectorStore."""
+
+    def test_matches_exact_search(self, store, vectors):
+        """Test that merged shard results equal a single exact scan."""
+        query = vectors[7] + 0.1
+        expected = [f"c{i}" for i in np.argsort(-(vectors @ normalize_rows(query[None])[0]))[:5]]
+
+        results = store.search(query, top_k=5)
+
+        assert [r["chunk_id"] for r in results] == expected
+        assert all(size > 0 for size in store.get_stats()["shard_sizes"])
+
+    def test_batch_search(self, store, vectors):
+        """Test that batched queries match single searches."""
+        batches = store.search_batch([vectors[1], vectors[2]], top_k=3)
+
+        assert [r["chunk_id"] for r in batches[0]] == [r["chunk_id"] for r in store.search(vectors[1], top_k=3)]
+        assert batches[1][0]["chunk_id"] == "c2"
+
+    def test_removal_and_candidates(self, store, vectors):
+        """Test that removed chunks disappear and candidates restrict scoring."""
+        store.remove(["c5"])
+
+        assert store.search(vectors[5], top_k=1)[0]["chunk_id"] != "c5"
+        assert {r["chunk_id"] for r in store.search(vectors[5], top_k=5, similarity_threshold=-1.0, candidate_ids={"c5", "c6", "c7"})} == {"c6", "c7"}
+        assert store.get_stats()["total_chunks"] == 299
+
+    def test_grows_past_initial_capacity(self):
+        """Test that shards remap after their files grow."""
+        vectors = normalize_rows(np.random.default_rng(1).normal(size=(12000, 8))).astype(np.float32)
+        store = ShardedVectorStore(num_shards=2)
+
+        for start in range(0, len(vectors), 4000):
+            ids = [f"g{i}" for i in range(start, start + 4000)]
+            store.add(ids, vectors[start:start + 4000], [{"chunk_id": cid} for cid in ids])
+            assert store.search(vectors[start + 50], top_k=1)[0]["chunk_id"] == f"g{start + 50}"
+
+        assert store.search(vectors[10], top_k=1)[0]["chunk_id"] == "g10"
+        store.close()
+
+    def test_removal_compacts_shards(self, store, vectors):
+        """Test that removed rows are reclaimed and payloads follow their moved rows."""
+        store.remove([f"c{i}" for i in range(0, 200, 2)])
+
+        stats = store.get_stats()
+        assert stats["total_chunks"] == 200
+        assert sum(stats["shard_sizes"]) == 200
+        for i in (1, 201, 299):
+            hit = store.search(vectors[i], top_k=1)[0]
+            assert hit["chunk_id"] == hit["chunk_text"] == f"c{i}"
+        assert store.search(vectors[0], top_k=5, candidate_ids={"c0", "c2"}) == []
+
+        # Replacing a chunk after compaction appends it to the end of its shard
+        store.add(["c1"], [vectors[1]], [{"chunk_id": "c1", "chunk_text": "new"}])
+        assert store.search(vectors[1], top_k=1)[0]["chunk_text"] == "new"
+        assert len(store) == 200
+
+    def test_document_counts_follow_live_chunks(self):
+        """Test that documents stop counting once their last chunk is removed."""
+        store = ShardedVectorStore(num_shards=2, embedder=HashingEmbeddings(dimensions=32))
+
+        def document(document_id, texts):
+            metadata = {"document_id": document_id, "title": document_id, "type": "txt"}
+            chunks = [
+                SimpleNamespace(chunk_id=f"{document_id}-{i}", content=text, metadata=metadata)
+                for i, text in enumerate(texts)
+            ]
+            return SimpleNamespace(metadata=metadata, chunks=chunks)
+
+        store.add_document(document("a", ["alpha one", "alpha two"]))
+        store.add_document(document("b", ["beta one"]))
+        store.remove(["a-0", "a-1"])
+        store.add_document(document("a2", ["alpha one", "alpha two"]))
+
+        stats = store.get_stats()
+        assert stats["total_documents"] == 2
+        assert stats["document_breakdown"] == {"txt": 2}
+        assert stats["total_chunks"] == 3
+        store.close()
@@ -0,0 +1,76 @@
+"""
+Tests for stage timing and query metrics.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.telemetry import QueryMetrics, Telemetry, token_usage
+
+
+class TestTokenUsage:
+    """Test cases for token_usage."""
+
+    def test_reads_usage_metadata(self):
+        """Test the standard LangChain usage fields."""
+        message = SimpleNamespace(usage_metadata={"input_tokens": 90, "output_tokens": 10, "total_tokens": 100})
+
+        assert token_usage(message) == {"prompt_tokens": 90, "completion_tokens": 10, "total_tokens": 100}
+
+    def test_reads_response_metadata(self):
+        """Test the provider's raw token_usage block."""
+        message = SimpleNamespace(
+            usage_metadata=None,
+            response_metadata={"token_usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}}
+        )
+
+        assert token_usage(message)["total_tokens"] == 7
+
+    def test_missing_usage(self):
+        """Test that messages without usage return None."""
+        assert token_usage("plain text") is None
+
+
+class TestQueryMetrics:
+    """Test cases for QueryMetrics."""
+
+    def test_percentiles_and_totals(self):
+        """Test latency percentiles, counters and token totals."""
+        metrics = QueryMetrics()
+        for i in range(1, 101):
+            metrics.record({"search": i / 1000}, i / 100, usage={"total_tokens": 10}, cache_hit=i % 2 == 0)
+
+        summary = metrics.summary()
+
+        assert summary["queries"] == 100
+        assert summary["cache_hits"] == 50
+        assert summary["tokens"]["total_tokens"] == 1000
+        assert summary["latency_ms"]["search"]["p50"] == pytest.approx(50.5)
+        assert summary["latency_ms"]["search"]["p99"] == pytest.approx(99.01)
+
+    def test_window_keeps_recent_queries(self):
+        """Test that only the most recent samples feed the percentiles."""
+        metrics = QueryMetrics(window=10)
+        for seconds in [10.0] * 10 + [1.0] * 10:
+            metrics.record({}, seconds)
+
+        assert metrics.summary()["latency_ms"]["total"]["p99"] == pytest.approx(1000.0)
+
+
+class TestTelemetry:
+    """Test cases for Telemetry."""
+
+    def test_stage_accumulates_time(self):
+        """Test that repeated stages add up and tracing is off by default."""
+        telemetry = Telemetry()
+        timings = {}
+
+        with telemetry.stage("search", timings):
+            pass
+        first = timings["search"]
+        with telemetry.stage("search", timings):
+            pass
+
+        assert telemetry.tracer is None
+        assert timings["search"] >= first > 0